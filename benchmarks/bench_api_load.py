@@ -0,0 +1,82 @@
+"""
+HTTP load generator for comparing API deployment modes (e.g. API_DB_MODE=sync
+vs API_DB_MODE=async).
+
+Start the API in the mode you want to measure, then run:
+
+    python benchmarks/bench_api_load.py --url http://localhost:8000 \
+        --concurrency 200 --requests 5000 \
+        --path "/ingredients/search?query=кур" --path /dishes/remaining
+
+Every `--path` is requested round-robin; the script prints throughput and
+latency percentiles per path and overall.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+async def run(url, paths, concurrency, total, timeout):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    counter = iter(range(total))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        async def worker():
+            for i in counter:
+                path = paths[i % len(paths)]
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 400:
+                        errors[path] += 1
+                except httpx.HTTPError:
+                    errors[path] += 1
+                latencies[path].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", action="append", dest="paths", help="Path to request (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    paths = args.paths or ["/ingredients/search?query=кур"]
+
+    latencies, errors, elapsed = asyncio.run(run(args.url, paths, args.concurrency, args.requests, args.timeout))
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    print(f"{args.requests} requests, concurrency {args.concurrency}: {elapsed:.2f} s, {len(all_latencies) / elapsed:.0f} req/s")
+    print(f"{'path':50} {'n':>6} {'err':>5} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)")
+    for path in paths + ["(all)"]:
+        values = all_latencies if path == "(all)" else latencies[path]
+        err = sum(errors.values()) if path == "(all)" else errors[path]
+        print(
+            f"{path[:50]:50} {len(values):6d} {err:5d} {statistics.mean(values) if values else 0:8.1f} "
+            f"{percentile(values, 50):8.1f} {percentile(values, 95):8.1f} {percentile(values, 99):8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
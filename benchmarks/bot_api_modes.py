@@ -0,0 +1,89 @@
+"""
+Latency of the bot's API client (telegram_bot/api.py) in its two modes: HTTP
+requests to a running API (NUTRITION_API_MODE=http) against the service layer
+called in the bot's process (NUTRITION_API_MODE=embedded). The first result
+of every call is checked to be the same in both modes.
+
+The bot's list cache is turned off, so every call reaches the API or the
+database. Only reads are measured. The same database serves both modes: start
+the API first, then run from the repository root with the API's environment
+(POSTGRES_* and the pool settings):
+
+    uvicorn fastapi_app.main:app --port 8000 --workers 1
+    python benchmarks/bot_api_modes.py --api-url http://127.0.0.1:8000 --repeat 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "telegram_bot"))
+
+import api  # noqa: E402
+
+CALLS = [
+    ("get_recipes", api.get_recipes),
+    ("search_recipes", lambda: api.search_recipes("омлет")),
+    ("get_remaining_dishes", api.get_remaining_dishes),
+    ("get_today_summary", api.get_today_summary),
+]
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def sequential(call, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - started) * 1e3)
+    timings.sort()
+    return percentile(timings, 0.5), percentile(timings, 0.95)
+
+
+async def concurrent(call, repeat, concurrency):
+    async def worker(calls):
+        for _ in range(calls):
+            await call()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(repeat // concurrency) for _ in range(concurrency)))
+    return (repeat // concurrency) * concurrency / (time.perf_counter() - started)
+
+
+async def run(mode, args):
+    api.API_MODE = mode
+    # Also warms up the connections and the imports
+    results = [await call() for _, call in CALLS]
+    for name, call in CALLS:
+        p50, p95 = await sequential(call, args.repeat)
+        rate = await concurrent(call, args.repeat, args.concurrency)
+        print(f"{name:<22} {mode:<9} {p50:>8.2f} {p95:>8.2f} {rate:>9.0f}")
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    api.API_URL = args.api_url
+    api.cache.ttl = 0
+    print(f"{'call':<22} {'mode':<9} {'p50 ms':>8} {'p95 ms':>8} {'calls/s':>9}")
+    try:
+        http_results = await run("http", args)
+        embedded_results = await run("embedded", args)
+    finally:
+        await api.close()
+    for (name, _), http_result, embedded_result in zip(CALLS, http_results, embedded_results):
+        if http_result != embedded_result:
+            raise SystemExit(f"{name}: the modes returned different values")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
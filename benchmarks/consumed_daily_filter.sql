@@ -0,0 +1,107 @@
+--
+-- benchmarks/consumed_daily_filter.sql
+--
+-- Фильтр потребления за один день на 2 годах истории (≈ 700 тыс. строк в consumed):
+-- прежнее условие consumed_at::date = d против полуинтервала по local_day_start(d).
+-- Всё выполняется в одной транзакции и откатывается.
+--
+-- Запуск: psql -d nutrition -f benchmarks/consumed_daily_filter.sql
+--
+
+SET search_path = nutrition, public;
+SET client_min_messages TO WARNING;
+
+BEGIN;
+
+-- 1. Месячные секции за 2 года и ~1000 порций в день (триггеры consumed отключены,
+--    КБЖУ порций задано явно)
+SELECT ensure_consumed_partitions((CURRENT_DATE - INTERVAL '23 months')::date, 24) AS partitions_created;
+
+INSERT INTO cooked_dishes (recipe_id, initial_weight, final_weight, remaining_weight, total_calories, total_proteins, total_fats, total_carbs)
+VALUES ((SELECT MIN(id) FROM recipes), 1000, 1000, 1000, 0, 0, 0, 0);
+
+ALTER TABLE consumed DISABLE TRIGGER USER;
+INSERT INTO consumed (cooked_dish_id, consumed_at, meal_type, weight_grams, calories, proteins, fats, carbs)
+SELECT
+    currval(pg_get_serial_sequence('cooked_dishes', 'id')),
+    NOW() - g * INTERVAL '90 seconds',
+    (ARRAY['breakfast', 'lunch', 'dinner', 'snack'])[1 + g % 4],
+    100, 150, 10, 5, 20
+FROM generate_series(1, 700000) g;
+ALTER TABLE consumed ENABLE TRIGGER USER;
+ANALYZE consumed;
+
+
+-- 2. Замер: 50 запусков каждого варианта на дне месячной давности
+CREATE TEMP TABLE bench_results (query TEXT, variant TEXT, avg_ms NUMERIC, result NUMERIC);
+
+DO $$
+DECLARE
+    v_day CONSTANT DATE := CURRENT_DATE - 30;
+    v_started TIMESTAMPTZ;
+    v_result NUMERIC;
+    v_iterations CONSTANT INT := 50;
+BEGIN
+    -- Список порций за день (как GET /consumed/?consumed_date=)
+    v_started := clock_timestamp();
+    FOR i IN 1..v_iterations LOOP
+        SELECT COUNT(*) INTO v_result FROM (
+            SELECT * FROM nutrition.consumed
+            WHERE consumed_at::date = v_day
+            ORDER BY consumed_at DESC LIMIT 100
+        ) q;
+    END LOOP;
+    INSERT INTO bench_results VALUES ('consumed list', 'consumed_at::date = d',
+        EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000 / v_iterations, v_result);
+
+    v_started := clock_timestamp();
+    FOR i IN 1..v_iterations LOOP
+        SELECT COUNT(*) INTO v_result FROM (
+            SELECT * FROM nutrition.consumed
+            WHERE consumed_at >= nutrition.local_day_start(v_day)
+              AND consumed_at < nutrition.local_day_start(v_day + 1)
+            ORDER BY consumed_at DESC LIMIT 100
+        ) q;
+    END LOOP;
+    INSERT INTO bench_results VALUES ('consumed list', 'half-open range',
+        EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000 / v_iterations, v_result);
+
+    -- Сумма калорий за день (как get_daily_summary)
+    v_started := clock_timestamp();
+    FOR i IN 1..v_iterations LOOP
+        SELECT SUM(calories) INTO v_result FROM nutrition.consumed WHERE consumed_at::date = v_day;
+    END LOOP;
+    INSERT INTO bench_results VALUES ('daily summary', 'consumed_at::date = d',
+        EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000 / v_iterations, v_result);
+
+    v_started := clock_timestamp();
+    FOR i IN 1..v_iterations LOOP
+        SELECT (nutrition.get_daily_summary(v_day)->'total_nutrition'->>'calories')::NUMERIC INTO v_result;
+    END LOOP;
+    INSERT INTO bench_results VALUES ('daily summary', 'half-open range',
+        EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000 / v_iterations, v_result);
+END;
+$$;
+
+
+-- 3. Результат (результаты вариантов должны совпадать)
+\echo '--- Фильтр за день, ms (среднее по 50) ---'
+SELECT
+    o.query,
+    ROUND(o.avg_ms, 3) AS cast_to_date_ms,
+    ROUND(n.avg_ms, 3) AS half_open_range_ms,
+    ROUND(o.avg_ms / n.avg_ms, 1) AS speedup,
+    o.result = n.result AS same_result
+FROM bench_results o
+JOIN bench_results n ON n.query = o.query AND n.variant = 'half-open range'
+WHERE o.variant = 'consumed_at::date = d'
+ORDER BY o.query;
+
+-- 4. План нового фильтра: одна секция, Index Scan
+EXPLAIN (COSTS OFF)
+SELECT * FROM consumed
+WHERE consumed_at >= local_day_start(CURRENT_DATE - 30)
+  AND consumed_at < local_day_start(CURRENT_DATE - 29)
+ORDER BY consumed_at DESC LIMIT 100;
+
+ROLLBACK;
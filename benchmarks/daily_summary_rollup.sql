@@ -0,0 +1,138 @@
+--
+-- benchmarks/daily_summary_rollup.sql
+--
+-- Дневная статистика на 2 годах истории (≈ 700 тыс. строк в consumed): агрегация по consumed
+-- (как прежние get_daily_summary и daily_stats) против чтения daily_meal_rollup.
+-- Всё выполняется в одной транзакции и откатывается.
+--
+-- Запуск: psql -d nutrition -f benchmarks/daily_summary_rollup.sql
+--
+
+SET search_path = nutrition, public;
+SET client_min_messages TO WARNING;
+
+BEGIN;
+
+-- 1. Данные: ~1000 порций в день (триггеры consumed отключены, КБЖУ задано явно),
+--    daily_meal_rollup строится rebuild_daily_meal_rollup()
+SELECT ensure_consumed_partitions((CURRENT_DATE - INTERVAL '23 months')::date, 24) AS partitions_created;
+
+INSERT INTO cooked_dishes (recipe_id, initial_weight, final_weight, remaining_weight, total_calories, total_proteins, total_fats, total_carbs)
+VALUES ((SELECT MIN(id) FROM recipes), 1000, 1000, 1000, 0, 0, 0, 0);
+
+ALTER TABLE consumed DISABLE TRIGGER USER;
+INSERT INTO consumed (cooked_dish_id, consumed_at, meal_type, weight_grams, calories, proteins, fats, carbs)
+SELECT
+    currval(pg_get_serial_sequence('cooked_dishes', 'id')),
+    NOW() - g * INTERVAL '90 seconds',
+    (ARRAY['breakfast', 'lunch', 'dinner', 'snack'])[1 + g % 4],
+    100, 150, 10, 5, 20
+FROM generate_series(1, 700000) g;
+ALTER TABLE consumed ENABLE TRIGGER USER;
+
+\timing on
+SELECT rebuild_daily_meal_rollup() AS rollup_rows;
+\timing off
+ANALYZE consumed;
+ANALYZE daily_meal_rollup;
+
+
+-- 2. Прежняя реализация get_daily_summary (по consumed, фильтр полуинтервалом)
+CREATE FUNCTION pg_temp.get_daily_summary_from_consumed(p_date DATE)
+RETURNS JSONB
+LANGUAGE sql
+AS $$
+    WITH daily_totals AS (
+        SELECT
+            COALESCE(SUM(calories), 0) AS total_calories,
+            COALESCE(SUM(proteins), 0) AS total_proteins,
+            COALESCE(SUM(fats), 0) AS total_fats,
+            COALESCE(SUM(carbs), 0) AS total_carbs
+        FROM nutrition.consumed
+        WHERE consumed_at >= nutrition.local_day_start(p_date)
+          AND consumed_at < nutrition.local_day_start(p_date + 1)
+    ),
+    meal_data AS (
+        SELECT meal_type, SUM(calories) AS calories, SUM(proteins) AS proteins, SUM(fats) AS fats,
+               SUM(carbs) AS carbs, COUNT(id) AS portions_count
+        FROM nutrition.consumed
+        WHERE consumed_at >= nutrition.local_day_start(p_date)
+          AND consumed_at < nutrition.local_day_start(p_date + 1)
+        GROUP BY meal_type
+    )
+    SELECT jsonb_build_object(
+        'date', p_date,
+        'total_nutrition', jsonb_build_object(
+            'calories', (SELECT total_calories FROM daily_totals),
+            'proteins', (SELECT total_proteins FROM daily_totals),
+            'fats', (SELECT total_fats FROM daily_totals),
+            'carbs', (SELECT total_carbs FROM daily_totals)
+        ),
+        'meals', (SELECT jsonb_agg(meal_data ORDER BY meal_type) FROM meal_data)
+    );
+$$;
+
+
+-- 3. Замер: 50 запусков каждого варианта
+CREATE TEMP TABLE bench_results (query TEXT, variant TEXT, avg_ms NUMERIC, result NUMERIC);
+
+DO $$
+DECLARE
+    v_day CONSTANT DATE := CURRENT_DATE - 30;
+    v_started TIMESTAMPTZ;
+    v_result NUMERIC;
+    v_iterations CONSTANT INT := 50;
+BEGIN
+    -- Сводка за день: прежний get_daily_summary (две агрегации по consumed) против daily_meal_rollup
+    v_started := clock_timestamp();
+    FOR i IN 1..v_iterations LOOP
+        SELECT (pg_temp.get_daily_summary_from_consumed(v_day)->'total_nutrition'->>'calories')::NUMERIC INTO v_result;
+    END LOOP;
+    INSERT INTO bench_results VALUES ('get_daily_summary', 'consumed',
+        EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000 / v_iterations, v_result);
+
+    v_started := clock_timestamp();
+    FOR i IN 1..v_iterations LOOP
+        SELECT (nutrition.get_daily_summary(v_day)->'total_nutrition'->>'calories')::NUMERIC INTO v_result;
+    END LOOP;
+    INSERT INTO bench_results VALUES ('get_daily_summary', 'daily_meal_rollup',
+        EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000 / v_iterations, v_result);
+
+    -- Вся статистика по дням (прежний VIEW daily_stats) против daily_meal_rollup
+    v_started := clock_timestamp();
+    FOR i IN 1..v_iterations LOOP
+        SELECT SUM(total_calories) INTO v_result FROM (
+            SELECT (consumed_at AT TIME ZONE nutrition.app_timezone())::date, meal_type, SUM(calories) AS total_calories
+            FROM nutrition.consumed
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        ) s;
+    END LOOP;
+    INSERT INTO bench_results VALUES ('daily_stats', 'consumed',
+        EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000 / v_iterations, v_result);
+
+    v_started := clock_timestamp();
+    FOR i IN 1..v_iterations LOOP
+        SELECT SUM(total_calories) INTO v_result FROM nutrition.daily_stats;
+    END LOOP;
+    INSERT INTO bench_results VALUES ('daily_stats', 'daily_meal_rollup',
+        EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000 / v_iterations, v_result);
+END;
+$$;
+
+
+-- 4. Результат (результаты вариантов должны совпадать)
+\echo '--- Дневная статистика, ms (среднее по 50) ---'
+SELECT
+    c.query,
+    ROUND(c.avg_ms, 3) AS consumed_ms,
+    ROUND(r.avg_ms, 3) AS rollup_ms,
+    ROUND(c.avg_ms / r.avg_ms, 1) AS speedup,
+    c.result = r.result AS same_result
+FROM bench_results c
+JOIN bench_results r ON r.query = c.query AND r.variant = 'daily_meal_rollup'
+WHERE c.variant = 'consumed'
+ORDER BY c.query;
+
+
+ROLLBACK;
@@ -0,0 +1,138 @@
+--
+-- benchmarks/dish_creation_by_recipe_size.sql
+--
+-- Время создания приготовленного блюда (как в create_cooked_dish: INSERT cooked_dishes +
+-- копирование состава рецепта в cooked_dish_ingredients) в зависимости от числа ингредиентов рецепта.
+-- Сравнивает текущие триггеры уровня оператора trg_recalculate_dish_nutrition_* с прежним
+-- построчным триггером (FOR EACH ROW, пересчёт всего блюда на каждую строку).
+-- Всё выполняется в одной транзакции и откатывается.
+--
+-- Запуск: psql -d nutrition -f benchmarks/dish_creation_by_recipe_size.sql
+--
+
+SET search_path = nutrition, public;
+SET client_min_messages TO WARNING;
+
+BEGIN;
+
+-- 1. Синтетические ингредиенты и рецепты на 1, 5, 10, 20, 50, 100 ингредиентов
+INSERT INTO ingredients (category_id, name, name_normalized, calories, proteins, fats, carbs)
+SELECT (SELECT MIN(id) FROM ingredient_categories), 'Бенчмарк ингредиент ' || g, '', 100 + g, 10, 5, 20
+FROM generate_series(1, 100) g;
+
+CREATE TEMP TABLE bench_recipes (size INT PRIMARY KEY, recipe_id INT);
+
+DO $$
+DECLARE
+    v_size INT;
+    v_recipe_id INT;
+BEGIN
+    FOREACH v_size IN ARRAY ARRAY[1, 5, 10, 20, 50, 100] LOOP
+        INSERT INTO nutrition.recipes (name, category_id)
+        VALUES ('Бенчмарк рецепт ' || v_size, (SELECT MIN(id) FROM nutrition.recipe_categories))
+        RETURNING id INTO v_recipe_id;
+
+        INSERT INTO nutrition.recipe_ingredients (recipe_id, ingredient_id, weight_grams)
+        SELECT v_recipe_id, i.id, 10
+        FROM nutrition.ingredients i
+        WHERE i.name LIKE 'Бенчмарк ингредиент %'
+        ORDER BY i.id
+        LIMIT v_size;
+
+        INSERT INTO bench_recipes VALUES (v_size, v_recipe_id);
+    END LOOP;
+END;
+$$;
+
+
+-- 2. Прежний построчный триггер (для сравнения, отключен)
+CREATE FUNCTION nutrition.bench_recalculate_dish_nutrition_row()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_cooked_dish_id BIGINT := CASE WHEN TG_OP = 'DELETE' THEN OLD.cooked_dish_id ELSE NEW.cooked_dish_id END;
+BEGIN
+  UPDATE nutrition.cooked_dishes cd
+  SET
+    initial_weight = COALESCE(t.initial_weight, 0),
+    total_calories = COALESCE(t.total_calories, 0),
+    total_proteins = COALESCE(t.total_proteins, 0),
+    total_fats     = COALESCE(t.total_fats, 0),
+    total_carbs    = COALESCE(t.total_carbs, 0)
+  FROM (
+    SELECT
+      SUM(cdi.weight_grams) AS initial_weight,
+      SUM(cdi.calories / 100 * cdi.weight_grams) AS total_calories,
+      SUM(cdi.proteins / 100 * cdi.weight_grams) AS total_proteins,
+      SUM(cdi.fats / 100 * cdi.weight_grams) AS total_fats,
+      SUM(cdi.carbs / 100 * cdi.weight_grams) AS total_carbs
+    FROM nutrition.cooked_dish_ingredients cdi
+    WHERE cdi.cooked_dish_id = v_cooked_dish_id
+  ) t
+  WHERE cd.id = v_cooked_dish_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER bench_trg_recalculate_dish_nutrition_row
+AFTER INSERT OR UPDATE OR DELETE ON cooked_dish_ingredients
+FOR EACH ROW EXECUTE FUNCTION nutrition.bench_recalculate_dish_nutrition_row();
+ALTER TABLE cooked_dish_ingredients DISABLE TRIGGER bench_trg_recalculate_dish_nutrition_row;
+
+
+-- 3. Замер: 200 блюд на каждый размер рецепта и вариант триггера
+CREATE TEMP TABLE bench_results (size INT, variant TEXT, avg_ms NUMERIC, total_calories NUMERIC);
+
+DO $$
+DECLARE
+    v_recipe RECORD;
+    v_variant TEXT;
+    v_dish_id BIGINT;
+    v_started TIMESTAMPTZ;
+    v_iterations CONSTANT INT := 200;
+BEGIN
+    FOREACH v_variant IN ARRAY ARRAY['statement', 'row'] LOOP
+        IF v_variant = 'row' THEN
+            ALTER TABLE nutrition.cooked_dish_ingredients DISABLE TRIGGER trg_recalculate_dish_nutrition_insert;
+            ALTER TABLE nutrition.cooked_dish_ingredients ENABLE TRIGGER bench_trg_recalculate_dish_nutrition_row;
+        END IF;
+
+        FOR v_recipe IN SELECT * FROM bench_recipes ORDER BY size LOOP
+            v_started := clock_timestamp();
+            FOR i IN 1..v_iterations LOOP
+                INSERT INTO nutrition.cooked_dishes
+                    (recipe_id, initial_weight, final_weight, remaining_weight, total_calories, total_proteins, total_fats, total_carbs)
+                VALUES (v_recipe.recipe_id, 0, 100, 100, 0, 0, 0, 0)
+                RETURNING id INTO v_dish_id;
+
+                INSERT INTO nutrition.cooked_dish_ingredients
+                    (cooked_dish_id, ingredient_id, weight_grams, calories, proteins, fats, carbs)
+                SELECT v_dish_id, ri.ingredient_id, ri.weight_grams, i.calories, i.proteins, i.fats, i.carbs
+                FROM nutrition.recipe_ingredients ri
+                JOIN nutrition.ingredients i ON ri.ingredient_id = i.id
+                WHERE ri.recipe_id = v_recipe.recipe_id;
+            END LOOP;
+
+            INSERT INTO bench_results
+            SELECT v_recipe.size, v_variant,
+                   EXTRACT(EPOCH FROM clock_timestamp() - v_started) * 1000 / v_iterations,
+                   (SELECT total_calories FROM nutrition.cooked_dishes WHERE id = v_dish_id);
+        END LOOP;
+    END LOOP;
+END;
+$$;
+
+
+-- 4. Результат (итоговое КБЖУ должно совпадать у обоих вариантов)
+\echo '--- Создание блюда, ms (среднее по 200) ---'
+SELECT
+    s.size AS ingredients,
+    ROUND(r.avg_ms, 3) AS row_trigger_ms,
+    ROUND(s.avg_ms, 3) AS statement_trigger_ms,
+    ROUND(r.avg_ms / s.avg_ms, 1) AS speedup,
+    s.total_calories = r.total_calories AS same_totals
+FROM bench_results s
+JOIN bench_results r ON r.size = s.size AND r.variant = 'row'
+WHERE s.variant = 'statement'
+ORDER BY s.size;
+
+ROLLBACK;
@@ -0,0 +1,158 @@
+"""
+Concurrent portions of one cooked dish: the row mode (trg_calculate_consumed_nutrition
+locks and rewrites cooked_dishes.remaining_weight) against the ledger mode
+(trg_calculate_consumed_nutrition_ledger appends to dish_weight_ledger under an
+advisory lock), see nutrition.set_dish_weight_mode.
+
+Every worker inserts 1 g portions, one transaction each, as POST /consumed does.
+The dish holds 90% of what the workers try to eat, so the run also checks that
+neither mode lets the portions exceed the dish. Run against a database you may
+write to; the benchmark dish and its portions are deleted afterwards:
+
+    python benchmarks/dish_weight_ledger_concurrency.py \
+        --dsn postgresql://postgres@localhost:5432/nutrition --workers 32 --portions 200
+"""
+import argparse
+import statistics
+import threading
+import time
+
+import psycopg2
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def admin_query(dsn, query, params=None):
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchone() if cursor.description else None
+    finally:
+        conn.close()
+
+
+def cooked_dishes_updates(dsn):
+    # Statistics are flushed when the worker sessions end; give the collector a moment
+    time.sleep(1.5)
+    return admin_query(
+        dsn,
+        "SELECT pg_stat_clear_snapshot(), n_tup_upd FROM pg_stat_user_tables "
+        "WHERE schemaname = 'nutrition' AND relname = 'cooked_dishes'",
+    )[1]
+
+
+def run_mode(dsn, mode, workers, portions):
+    admin_query(dsn, "SELECT nutrition.set_dish_weight_mode(%s)", (mode,))
+    dish_weight = workers * portions * 0.9
+    dish_id = admin_query(
+        dsn,
+        """
+        INSERT INTO nutrition.cooked_dishes
+            (recipe_id, initial_weight, final_weight, remaining_weight, total_calories, total_proteins, total_fats, total_carbs)
+        VALUES ((SELECT MIN(id) FROM nutrition.recipes), %s, %s, %s, %s, 0, 0, 0)
+        RETURNING id
+        """,
+        (dish_weight, dish_weight, dish_weight, dish_weight),
+    )[0]
+    updates_before = cooked_dishes_updates(dsn)
+    wal_before = admin_query(dsn, "SELECT pg_current_wal_lsn()")[0]
+
+    latencies, rejected = [], [0]
+    lock = threading.Lock()
+    connections = [psycopg2.connect(dsn) for _ in range(workers)]
+    start = threading.Barrier(workers + 1)
+
+    def worker(conn):
+        local_latencies, local_rejected = [], 0
+        start.wait()
+        with conn.cursor() as cursor:
+            for _ in range(portions):
+                started = time.perf_counter()
+                try:
+                    cursor.execute(
+                        "INSERT INTO nutrition.consumed (cooked_dish_id, meal_type, weight_grams) VALUES (%s, 'snack', 1)",
+                        (dish_id,),
+                    )
+                    conn.commit()
+                except psycopg2.Error:
+                    conn.rollback()
+                    local_rejected += 1
+                local_latencies.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(local_latencies)
+            rejected[0] += local_rejected
+
+    threads = [threading.Thread(target=worker, args=(conn,)) for conn in connections]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    for conn in connections:
+        conn.close()
+
+    wal_bytes = admin_query(dsn, "SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s)", (wal_before,))[0]
+    dish_row_updates = cooked_dishes_updates(dsn) - updates_before
+    compact_started = time.perf_counter()
+    admin_query(dsn, "SELECT nutrition.compact_dish_weight_ledger()")
+    compact_ms = (time.perf_counter() - compact_started) * 1000
+    eaten, remaining = admin_query(
+        dsn,
+        """
+        SELECT
+            (SELECT SUM(weight_grams) FROM nutrition.consumed WHERE cooked_dish_id = %s),
+            (SELECT remaining_weight FROM nutrition.cooked_dishes WHERE id = %s)
+        """,
+        (dish_id, dish_id),
+    )
+
+    # Deleting the portions in the row mode gives the weight back to the dish row directly
+    admin_query(dsn, "SELECT nutrition.set_dish_weight_mode('row')")
+    admin_query(dsn, "DELETE FROM nutrition.consumed WHERE cooked_dish_id = %s", (dish_id,))
+    admin_query(dsn, "DELETE FROM nutrition.cooked_dishes WHERE id = %s", (dish_id,))
+
+    return {
+        "mode": mode,
+        "portions_per_s": len(latencies) / elapsed,
+        "mean": statistics.mean(latencies),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "rejected": rejected[0],
+        "dish_row_updates": dish_row_updates,
+        "wal_kb": float(wal_bytes) / 1024,
+        "compact_ms": compact_ms,
+        "within_dish": float(eaten) == dish_weight and float(remaining) == 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default="postgresql://postgres@localhost:5432/nutrition")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--portions", type=int, default=200, help="Portions per worker")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    results = [run_mode(args.dsn, mode, args.workers, args.portions) for _ in range(args.rounds) for mode in ("row", "ledger")]
+
+    print(f"{args.workers} workers x {args.portions} portions of 1 g on one dish, {args.rounds} rounds (latency in ms)")
+    print(f"{'mode':8} {'portions/s':>10} {'mean':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'rejected':>9} {'row upd':>8} {'WAL KB':>8} {'compact':>8} {'ok':>3}")
+    for row in results:
+        print(
+            f"{row['mode']:8} {row['portions_per_s']:10.0f} {row['mean']:7.2f} {row['p50']:7.2f} {row['p95']:7.2f} "
+            f"{row['p99']:7.2f} {row['rejected']:9d} {row['dish_row_updates']:8d} {row['wal_kb']:8.0f} "
+            f"{row['compact_ms']:8.1f} {'yes' if row['within_dish'] else 'NO':>3}"
+        )
+
+
+if __name__ == "__main__":
+    main()
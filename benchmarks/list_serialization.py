@@ -0,0 +1,164 @@
+"""
+CPU cost of 100-row list responses: the previous pipeline (RealDictCursor rows
+with Decimal values, validated and dumped by FastAPI into JSON-compatible
+Python objects, then json.dumps as JSONResponse does) against the current one
+(NUMERIC read as float by the driver, dicts built from tuples by DictRowCursor,
+rows validated and encoded to bytes by pydantic-core in
+app.services.serialization).
+
+Both pipelines call the same service functions on the same rows in one
+transaction, and their JSON is checked to be equal. The benchmark rows are
+rolled back at the end:
+
+    python benchmarks/list_serialization.py \
+        --dsn postgresql://postgres@localhost:5432/nutrition --rows 100 --repeat 300
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import date, timedelta
+from typing import List
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fastapi_app"))
+
+from app.database.rows import DictRowCursor, register_numeric_as_float  # noqa: E402
+from app.schemas.schemas import Consumed, CookedDish, NutritionBucket, Recipe, RemainingDish  # noqa: E402
+from app.services import consumed, dishes, recipes, serialization, stats  # noqa: E402
+
+SERVICE_MODULES = (consumed, dishes, recipes, stats)
+
+
+def endpoints(rows):
+    today = date.today()
+    return [
+        ("GET /dishes/remaining", List[RemainingDish], lambda conn: dishes.get_remaining_dishes(conn, rows)),
+        ("GET /dishes/", List[CookedDish], lambda conn: dishes.get_cooked_dishes(conn, rows)),
+        ("GET /consumed/", List[Consumed], lambda conn: consumed.get_consumed_items(conn, rows)),
+        ("GET /recipes/", List[Recipe], lambda conn: recipes.get_recipes(conn, None, rows)),
+        ("GET /stats/range", List[NutritionBucket],
+         lambda conn: stats.get_nutrition_range(conn, today - timedelta(days=rows - 1), today, "day")),
+    ]
+
+
+def insert_rows(conn, rows):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO nutrition.recipes (category_id, name, description)
+            SELECT (SELECT MIN(id) FROM nutrition.recipe_categories), 'Бенчмарк сериализации ' || n, 'Описание ' || n
+            FROM generate_series(1, %s) n
+            """,
+            (rows,),
+        )
+        cursor.execute(
+            """
+            INSERT INTO nutrition.recipe_ingredients (recipe_id, ingredient_id, weight_grams)
+            SELECT r.id, i.id, 100
+            FROM nutrition.recipes r
+            CROSS JOIN (SELECT id FROM nutrition.ingredients ORDER BY id LIMIT 3) i
+            WHERE r.name LIKE 'Бенчмарк сериализации %%'
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO nutrition.cooked_dishes
+                (recipe_id, initial_weight, final_weight, remaining_weight, total_calories, total_proteins, total_fats, total_carbs)
+            SELECT (SELECT MIN(id) FROM nutrition.recipes), 1000, 1000, 1000, 1234.56, 78.9, 45.67, 123.45
+            FROM generate_series(1, %s)
+            """,
+            (rows,),
+        )
+        # One portion a day over the last `rows` days, so the day buckets are not empty
+        cursor.execute(
+            """
+            INSERT INTO nutrition.consumed (cooked_dish_id, meal_type, weight_grams, consumed_at)
+            SELECT (SELECT MAX(id) FROM nutrition.cooked_dishes), 'lunch', 2.5, now() - n * INTERVAL '1 day'
+            FROM generate_series(0, %s - 1) n
+            """,
+            (rows,),
+        )
+
+
+@contextmanager
+def previous_rows(conn):
+    """
+    Makes the list services fetch Decimal values through RealDictCursor again.
+    """
+    psycopg2.extensions.register_type(psycopg2.extensions.DECIMAL, conn)
+    for module in SERVICE_MODULES:
+        module.DictRowCursor = RealDictCursor
+    try:
+        yield
+    finally:
+        for module in SERVICE_MODULES:
+            module.DictRowCursor = DictRowCursor
+        register_numeric_as_float(conn)
+
+
+@lru_cache(maxsize=None)
+def previous_adapter(response_type):
+    # FastAPI builds the response field once per route
+    return TypeAdapter(response_type)
+
+
+def previous_encode(content, response_type):
+    # fastapi.routing.serialize_response + JSONResponse.render
+    adapter = previous_adapter(response_type)
+    value = adapter.dump_python(adapter.validate_python(content), mode="json")
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def measure(fetch, encode, conn, repeat):
+    fetch_us, encode_us = [], []
+    body = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        content = fetch(conn)
+        fetched = time.perf_counter()
+        body = encode(content)
+        fetch_us.append((fetched - started) * 1e6)
+        encode_us.append((time.perf_counter() - fetched) * 1e6)
+    fetch_us.sort()
+    encode_us.sort()
+    return fetch_us[len(fetch_us) // 2], encode_us[len(encode_us) // 2], body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default="postgresql://postgres@localhost:5432/nutrition")
+    parser.add_argument("--rows", type=int, default=100, help="Rows per list")
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    register_numeric_as_float(conn)
+    try:
+        insert_rows(conn, args.rows)
+
+        print(f"{'endpoint':<22} {'pipeline':<9} {'fetch µs':>9} {'encode µs':>10} {'total µs':>9}")
+        for name, response_type, fetch in endpoints(args.rows):
+            with previous_rows(conn):
+                previous = measure(fetch, lambda content: previous_encode(content, response_type), conn, args.repeat)
+            current = measure(fetch, lambda content: serialization.encode(content, response_type), conn, args.repeat)
+            if json.loads(previous[2]) != json.loads(current[2]):
+                raise SystemExit(f"{name}: the pipelines returned different JSON")
+            for label, (fetch_us, encode_us, _) in (("previous", previous), ("current", current)):
+                print(f"{name:<22} {label:<9} {fetch_us:>9.0f} {encode_us:>10.0f} {fetch_us + encode_us:>9.0f}")
+            print(f"{'':<22} {'speedup':<9} {previous[0] / current[0]:>8.2f}x {previous[1] / current[1]:>9.2f}x "
+                  f"{(previous[0] + previous[1]) / (current[0] + current[1]):>8.2f}x")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
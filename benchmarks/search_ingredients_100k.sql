@@ -0,0 +1,126 @@
+--
+-- benchmarks/search_ingredients_100k.sql
+--
+-- Планы поиска ингредиентов на синтетическом справочнике (~100 000 ингредиентов, ~33 000 синонимов).
+-- Сравнивает исходный однофазный запрос search_ingredients с двухфазным (текущая функция).
+-- Данные фиксируются (иначе GIN-индексы остаются в pending list и без статистики),
+-- поэтому запускать только на тестовой базе; в конце синтетические строки удаляются.
+--
+-- Запуск: psql -d nutrition -f benchmarks/search_ingredients_100k.sql
+--
+
+SET search_path = nutrition, public;
+SET client_min_messages TO WARNING;
+
+-- 1. Генерация справочника
+\echo '--- 1. Генерация 100 000 ингредиентов ---'
+INSERT INTO ingredients (category_id, name, name_normalized, calories, proteins, fats, carbs)
+SELECT
+    (SELECT MIN(id) FROM ingredient_categories) + (g % 10),
+    base.word || ' ' || adj.word || ' №' || g,
+    '',
+    (g % 500), (g % 30), (g % 40), (g % 80)
+FROM generate_series(1, 100000) g
+CROSS JOIN LATERAL (
+    SELECT (ARRAY['курица', 'говядина', 'свинина', 'индейка', 'баранина', 'лосось', 'треска', 'тунец',
+                  'творог', 'сыр', 'молоко', 'кефир', 'йогурт', 'рис', 'гречка', 'овсянка', 'макароны',
+                  'хлеб', 'картофель', 'морковь', 'капуста', 'огурец', 'помидор', 'перец', 'лук',
+                  'яблоко', 'груша', 'банан', 'апельсин', 'клубника', 'малина', 'орех', 'фасоль',
+                  'чечевица', 'горох', 'масло', 'соус', 'сок', 'чай', 'кофе'])[1 + g % 40] AS word
+) base
+CROSS JOIN LATERAL (
+    SELECT (ARRAY['свежий', 'замороженный', 'вареный', 'жареный', 'копченый', 'сушеный', 'консервированный',
+                  'домашний', 'фермерский', 'органический', 'обезжиренный', 'цельный', 'рубленый',
+                  'запеченый', 'маринованный', 'соленый', 'сладкий', 'острый', 'диетический', 'молотый',
+                  'отборный', 'крупный', 'мелкий', 'тертый', 'очищенный', 'нарезанный', 'бланшированный',
+                  'тушеный', 'печеный', 'охлажденный', 'пряный'])[1 + (g / 40) % 31] AS word
+) adj;
+
+INSERT INTO ingredient_synonyms (ingredient_id, synonym, synonym_normalized)
+SELECT id, split_part(name, ' ', 2) || ' ' || split_part(name, ' ', 1) || ' ' || id, ''
+FROM ingredients
+WHERE id % 3 = 0 AND name LIKE '%№%';
+
+VACUUM ANALYZE ingredients;
+VACUUM ANALYZE ingredient_synonyms;
+
+SELECT COUNT(*) AS ingredients, (SELECT COUNT(*) FROM ingredient_synonyms) AS synonyms FROM ingredients;
+
+
+-- 2. Исходный запрос (до переписывания): LIKE по сырому имени, коррелированные similarity() по синонимам
+\echo '--- 2. Исходный однофазный запрос, "кур" ---'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT
+    i.id,
+    i.name,
+    ic.name AS category_name,
+    (
+        CASE WHEN LOWER(i.name) = LOWER('кур') THEN 10.0 ELSE 0.0 END +
+        CASE WHEN LOWER(i.name_normalized) = LOWER('кур') THEN 9.0 ELSE 0.0 END +
+        ts_rank(to_tsvector('russian', i.name), websearch_to_tsquery('russian', 'кур')) * 5.0 +
+        similarity(i.name_normalized, 'кур') * 3.0 +
+        COALESCE((SELECT MAX(similarity(s.synonym_normalized, 'кур')) FROM ingredient_synonyms s WHERE s.ingredient_id = i.id), 0) * 2.0
+    )::NUMERIC AS score
+FROM ingredients i
+JOIN ingredient_categories ic ON i.category_id = ic.id
+WHERE
+    i.deleted_at IS NULL AND (
+        LOWER(i.name) LIKE '%' || LOWER('кур') || '%' OR
+        LOWER(i.name_normalized) LIKE '%' || LOWER('кур') || '%' OR
+        to_tsvector('russian', i.name) @@ websearch_to_tsquery('russian', 'кур') OR
+        similarity(i.name_normalized, 'кур') > 0.1 OR
+        EXISTS (SELECT 1 FROM ingredient_synonyms s WHERE s.ingredient_id = i.id AND similarity(s.synonym_normalized, 'кур') > 0.1)
+    )
+ORDER BY score DESC
+LIMIT 10;
+
+
+-- 3. Двухфазный запрос (тело текущей функции search_ingredients)
+\echo '--- 3. Двухфазный запрос, "кур" ---'
+SET pg_trgm.word_similarity_threshold = 0.3;
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+WITH candidates AS (
+    SELECT i.id, i.name, i.name_normalized, i.category_id
+    FROM ingredients i
+    WHERE
+        i.deleted_at IS NULL AND (
+            i.search_document LIKE '%' || 'кур' || '%' OR
+            'кур' <% i.search_document OR
+            i.search_vector @@ websearch_to_tsquery('russian', 'кур')
+        )
+    ORDER BY word_similarity('кур', i.search_document) DESC, i.id
+    LIMIT 100
+)
+SELECT
+    c.id,
+    c.name,
+    ic.name AS category_name,
+    (
+        CASE WHEN LOWER(c.name) = LOWER('кур') THEN 10.0 ELSE 0.0 END +
+        CASE WHEN c.name_normalized = 'кур' THEN 9.0 ELSE 0.0 END +
+        ts_rank(to_tsvector('russian', c.name), websearch_to_tsquery('russian', 'кур')) * 5.0 +
+        similarity(c.name_normalized, 'кур') * 3.0 +
+        COALESCE((SELECT MAX(similarity(s.synonym_normalized, 'кур')) FROM ingredient_synonyms s WHERE s.ingredient_id = c.id), 0) * 2.0
+    )::NUMERIC AS score
+FROM candidates c
+JOIN ingredient_categories ic ON c.category_id = ic.id
+ORDER BY score DESC, c.id
+LIMIT 10;
+
+
+-- 4. Время вызова функции на разных запросах
+\echo '--- 4. search_ingredients(): "кур", "гречкаа", "филе говядины", "лосось копченый 300" ---'
+\timing on
+SELECT COUNT(*) FROM nutrition.search_ingredients('кур', 10);
+SELECT COUNT(*) FROM nutrition.search_ingredients('гречкаа', 10);
+SELECT COUNT(*) FROM nutrition.search_ingredients('филе говядины', 10);
+SELECT COUNT(*) FROM nutrition.search_ingredients('лосось копченый 300', 10);
+\timing off
+RESET pg_trgm.word_similarity_threshold;
+
+
+-- 5. Очистка
+\echo '--- 5. Удаление синтетических данных ---'
+DELETE FROM ingredients WHERE name LIKE '% №%';
+VACUUM ANALYZE ingredients;
+VACUUM ANALYZE ingredient_synonyms;
@@ -0,0 +1,121 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from psycopg import AsyncConnection
+from psycopg.pq import TransactionStatus
+from psycopg.types.numeric import FloatLoader
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from app.database.session import get_database_url
+from app.services import reference_cache
+
+load_dotenv()
+
+_pool = None
+_pool_loop = None
+
+async def _configure(conn: AsyncConnection) -> None:
+    # NUMERIC is read as float, as in the sync pool (app/database/rows.py)
+    conn.adapters.register_loader("numeric", FloatLoader)
+
+async def _reset_session(conn: AsyncConnection) -> None:
+    # RESET is transactional, so it has to be committed to stick.
+    await conn.execute("RESET ALL")
+    await conn.commit()
+
+async def open_async_pool() -> AsyncConnectionPool:
+    """
+    Opens the process-wide asyncio connection pool. Must be called from the
+    event loop that serves requests (the application lifespan does this).
+    """
+    global _pool, _pool_loop
+    if _pool is None:
+        pool = AsyncConnectionPool(
+            get_database_url(),
+            min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+            max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+            max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "600")),
+            check=AsyncConnectionPool.check_connection,
+            configure=_configure,
+            reset=_reset_session,
+            open=False,
+        )
+        await pool.open()
+        _pool = pool
+        _pool_loop = asyncio.get_running_loop()
+    return _pool
+
+def get_async_pool() -> AsyncConnectionPool:
+    """
+    Returns the pool opened by open_async_pool(). Its connections belong to the
+    event loop it was opened in: used from another loop (e.g. a TestClient whose
+    lifespan did not run) they would hang, so that is an error instead.
+    """
+    if _pool is None or _pool_loop is not asyncio.get_running_loop():
+        raise RuntimeError("The asyncio connection pool is not open in this event loop; it is opened by the application lifespan")
+    return _pool
+
+async def close_async_pool() -> None:
+    global _pool, _pool_loop
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+        _pool_loop = None
+
+@asynccontextmanager
+async def async_db_connection():
+    """
+    Checks an AsyncConnection out of the pool for the duration of the block and
+    rolls back what it left uncommitted. The pool is not opened here: that is
+    the lifespan's job (503 without it).
+    """
+    try:
+        pool = get_async_pool()
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Database unavailable: {e}")
+    try:
+        conn = await pool.getconn()
+    except PoolTimeout as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Database busy: {e}")
+    try:
+        yield conn
+    finally:
+        reference_cache.discard_pending(conn)
+        if conn.info.transaction_status != TransactionStatus.IDLE:
+            await conn.rollback()
+        await pool.putconn(conn)
+
+async def get_async_db_connection():
+    """
+    Checks an AsyncConnection out of the pool for the duration of a request.
+    """
+    async with async_db_connection() as conn:
+        yield conn
+
+def get_async_pool_stats() -> Dict[str, Any]:
+    """
+    Pool statistics in the same shape as ConnectionPool.get_stats().
+    """
+    if _pool is None:
+        return {}
+    stats = _pool.get_stats()
+    size = stats.get("pool_size", 0)
+    idle = stats.get("pool_available", 0)
+    return {
+        "min_size": stats.get("pool_min", 0),
+        "max_size": stats.get("pool_max", 0),
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+        "connections_created": stats.get("connections_num", 0),
+        "checkouts": stats.get("requests_num", 0),
+        "checkout_waits": stats.get("requests_queued", 0),
+        "checkout_timeouts": stats.get("requests_errors", 0),
+        "checkout_wait_ms": float(stats.get("requests_wait_ms", 0)),
+        "health_check_failures": stats.get("connections_lost", 0),
+        "reset_failures": stats.get("returns_bad", 0),
+    }
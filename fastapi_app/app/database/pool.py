@@ -0,0 +1,239 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """
+    Raised when no connection becomes available within the checkout timeout.
+    """
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    - keeps between `min_size` and `max_size` connections open;
+    - runs a `SELECT 1` health check on checkout for connections that have been
+      idle longer than `check_idle_after` seconds, and replaces broken ones;
+    - closes connections older than `max_lifetime` seconds or idle longer than
+      `max_idle` seconds (while staying above `min_size`);
+    - resets the session state (pending transaction, SET variables) when a
+      connection is returned;
+    - passes every new connection to `configure` (type casters and the like).
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        max_lifetime: float = 3600.0,
+        max_idle: float = 600.0,
+        check_idle_after: float = 5.0,
+        configure: Optional[Callable[[psycopg2.extensions.connection], None]] = None,
+        **connect_kwargs: Any,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size: min_size=%s, max_size=%s" % (min_size, max_size))
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_idle_after = check_idle_after
+        self.configure = configure
+        self.connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        # Idle connections as (connection, returned_at); most recently used on the right.
+        self._idle: Deque[Tuple[psycopg2.extensions.connection, float]] = deque()
+        self._created_at: Dict[int, float] = {}
+        self._in_use = 0
+        self._closed = False
+        self._stats = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "checkout_waits": 0,
+            "checkout_timeouts": 0,
+            "checkout_wait_ms": 0.0,
+            "health_check_failures": 0,
+            "lifetime_expirations": 0,
+            "idle_expirations": 0,
+            "reset_failures": 0,
+        }
+
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + self._in_use
+
+    def _connect(self) -> psycopg2.extensions.connection:
+        conn = psycopg2.connect(self.dsn, **self.connect_kwargs)
+        if self.configure is not None:
+            try:
+                self.configure(conn)
+            except Exception:
+                conn.close()
+                raise
+        with self._cond:
+            self._created_at[id(conn)] = time.monotonic()
+            self._stats["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn: psycopg2.extensions.connection) -> None:
+        self._created_at.pop(id(conn), None)
+        self._stats["connections_closed"] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _expired(self, conn: psycopg2.extensions.connection, now: float) -> bool:
+        created_at = self._created_at.get(id(conn), now)
+        return self.max_lifetime > 0 and now - created_at > self.max_lifetime
+
+    def _healthy(self, conn: psycopg2.extensions.connection, idle_since: float, now: float) -> bool:
+        if conn.closed:
+            return False
+        if now - idle_since < self.check_idle_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, timeout: Optional[float] = None) -> psycopg2.extensions.connection:
+        """
+        Checks a connection out of the pool, waiting up to `timeout` seconds.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self.size < self.max_size:
+                    self._in_use += 1
+                    conn, idle_since = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["checkout_timeouts"] += 1
+                    raise PoolTimeout("couldn't get a connection after %.2f sec" % timeout)
+                waited = True
+                self._cond.wait(remaining)
+
+        # Connecting and health checks happen outside the lock.
+        try:
+            now = time.monotonic()
+            if conn is not None and self._expired(conn, now):
+                with self._cond:
+                    self._stats["lifetime_expirations"] += 1
+                    self._discard(conn)
+                conn = None
+            if conn is not None and not self._healthy(conn, idle_since, now):
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+                    self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except BaseException:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["checkout_waits"] += 1
+                self._stats["checkout_wait_ms"] += (time.monotonic() - started) * 1000
+        return conn
+
+    def putconn(self, conn: psycopg2.extensions.connection) -> None:
+        """
+        Returns a connection to the pool, resetting its session state.
+        """
+        keep = not conn.closed and not self._closed
+        if keep:
+            try:
+                # Rolls back any pending transaction and runs RESET ALL.
+                conn.reset()
+            except psycopg2.Error:
+                keep = False
+                with self._cond:
+                    self._stats["reset_failures"] += 1
+
+        with self._cond:
+            self._in_use -= 1
+            now = time.monotonic()
+            if keep and self._expired(conn, now):
+                self._stats["lifetime_expirations"] += 1
+                keep = False
+            if keep:
+                self._idle.append((conn, now))
+                self._prune_idle(now)
+            else:
+                self._discard(conn)
+            self._cond.notify()
+
+    def _prune_idle(self, now: float) -> None:
+        # The least recently used connections sit on the left.
+        while self._idle and self.size > self.min_size and self.max_idle > 0:
+            conn, idle_since = self._idle[0]
+            if now - idle_since <= self.max_idle:
+                break
+            self._idle.popleft()
+            self._stats["idle_expirations"] += 1
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[psycopg2.extensions.connection]:
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self) -> None:
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                min_size=self.min_size,
+                max_size=self.max_size,
+                size=self.size,
+                idle=len(self._idle),
+                in_use=self._in_use,
+            )
+        stats["checkout_wait_ms"] = round(stats["checkout_wait_ms"], 3)
+        return stats
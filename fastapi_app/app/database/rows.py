@@ -0,0 +1,58 @@
+"""
+How rows come back from psycopg2.
+
+NUMERIC_AS_FLOAT makes the driver parse NUMERIC columns into float instead of
+Decimal: every numeric field of the API schemas is a float, and Decimals were
+only converted again for every row of every response. The API pool registers
+it on each of its connections (see session.get_pool).
+
+DictRowCursor returns rows as plain dicts built from the tuples psycopg2
+fetches in C. RealDictCursor fills every row key by key in Python, which costs
+more than the query itself on 100-row lists.
+"""
+from typing import Any, Dict, List, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+
+def _cast_numeric(value: Optional[str], cursor: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+NUMERIC_AS_FLOAT = psycopg2.extensions.new_type(psycopg2.extensions.DECIMAL.values, "NUMERIC_AS_FLOAT", _cast_numeric)
+NUMERIC_ARRAY_AS_FLOAT = psycopg2.extensions.new_array_type((1231,), "NUMERIC_ARRAY_AS_FLOAT", NUMERIC_AS_FLOAT)
+
+
+def register_numeric_as_float(conn: psycopg2.extensions.connection) -> None:
+    psycopg2.extensions.register_type(NUMERIC_AS_FLOAT, conn)
+    psycopg2.extensions.register_type(NUMERIC_ARRAY_AS_FLOAT, conn)
+
+
+class DictRowCursor(psycopg2.extensions.cursor):
+    """
+    Cursor whose fetch methods return plain dicts (column name -> value).
+    """
+
+    def _to_dict(self, row: Optional[tuple]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        return dict(zip([column.name for column in self.description], row))
+
+    def _to_dicts(self, rows: List[tuple]) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+        names = [column.name for column in self.description]
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        return self._to_dict(super().fetchone())
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self._to_dicts(super().fetchmany(self.arraysize if size is None else size))
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        return self._to_dicts(super().fetchall())
+
+    def __next__(self) -> Dict[str, Any]:
+        return self._to_dict(super().__next__())
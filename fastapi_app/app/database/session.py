@@ -1,20 +1,87 @@
 import os
-import psycopg2
+import threading
+from contextlib import asynccontextmanager
+from urllib.parse import quote
+import anyio
 from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from app.database.pool import ConnectionPool, PoolTimeout
+from app.database.rows import register_numeric_as_float
+from app.services import reference_cache
 
 load_dotenv()
 
-def get_db_connection():
+_pool = None
+_pool_lock = threading.Lock()
+
+# Checkouts and returns run on their own thread limiters. If a request waiting
+# for a free connection occupied a slot of the endpoint threadpool, requests
+# that already hold a connection could be starved of threads and never give it
+# back.
+_checkout_limiter = anyio.CapacityLimiter(int(os.getenv("DB_POOL_MAX_SIZE", "10")))
+_return_limiter = anyio.CapacityLimiter(int(os.getenv("DB_POOL_MAX_SIZE", "10")))
+
+def get_database_url() -> str:
+    """
+    Builds the PostgreSQL DSN from the environment. APP_TIMEZONE, when set, becomes
+    the session's nutrition.timezone, the zone in which daily filters and stats count days,
+    and its TimeZone, so that timestamps come back in the same zone.
+    """
+    url = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}"
+    timezone = os.getenv("APP_TIMEZONE")
+    if timezone:
+        url += "?options=" + quote(f"-c TimeZone={timezone} -c nutrition.timezone={timezone}")
+    return url
+
+def get_pool() -> ConnectionPool:
+    """
+    Returns the process-wide connection pool, creating it on first use.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_database_url(),
+                    min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+                    max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+                    max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "600")),
+                    check_idle_after=float(os.getenv("DB_POOL_CHECK_IDLE_AFTER", "5")),
+                    configure=register_numeric_as_float,
+                )
+    return _pool
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+@asynccontextmanager
+async def db_connection():
     """
-    Establishes a connection to the PostgreSQL database.
+    Checks a connection out of the pool for the duration of the block (503 if none is free in time).
     """
-    load_dotenv()
-    DATABASE_URL = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}"
-    conn = psycopg2.connect(DATABASE_URL)
+    pool = get_pool()
+    try:
+        conn = await anyio.to_thread.run_sync(pool.getconn, limiter=_checkout_limiter)
+    except PoolTimeout as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Database busy: {e}")
     try:
         yield conn
     finally:
-        conn.close()
+        reference_cache.discard_pending(conn)
+        await anyio.to_thread.run_sync(pool.putconn, conn, limiter=_return_limiter)
+
+async def get_db_connection():
+    """
+    Checks a connection out of the pool for the duration of a request.
+    """
+    async with db_connection() as conn:
+        yield conn
 
 def get_db_cursor(conn):
     """
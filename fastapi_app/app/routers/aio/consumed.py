@@ -0,0 +1,121 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from datetime import date
+import psycopg
+from app.database.async_session import get_async_db_connection
+from app.schemas.schemas import Consumed, ConsumedCreate, ConsumedUpdate
+from app.services.aio import consumed as consumed_service, diary_export
+from app.services.diary_export import MEDIA_TYPES
+from app.services.pagination import decode_cursor, next_cursor
+from app.services import serialization
+
+router = APIRouter()
+
+@router.get("/", response_model=List[Consumed])
+async def get_consumed_items(
+    response: Response,
+    consumed_date: Optional[date] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    meal_type: Optional[Literal["breakfast", "lunch", "dinner", "snack"]] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    conn: psycopg.AsyncConnection = Depends(get_async_db_connection),
+):
+    """
+    Portions, newest first, optionally between the days `from` and `to` inclusive
+    (`consumed_date` is a shortcut for a single day). When a page is full, the
+    X-Next-Cursor header holds the `cursor` of the next page.
+    """
+    if consumed_date:
+        date_from = date_to = consumed_date
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must not be earlier than 'from'.")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+    try:
+        items = await consumed_service.get_consumed_items(conn, limit, date_from, date_to, meal_type, after)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+    cursor_value = next_cursor(items, limit, "consumed_at")
+    if cursor_value:
+        response.headers["X-Next-Cursor"] = cursor_value
+    return serialization.json_response(items, List[Consumed], response)
+
+@router.post("/", response_model=Consumed, status_code=status.HTTP_201_CREATED)
+async def create_consumed_item(consumed_item: ConsumedCreate, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        new_consumed_item = await consumed_service.create_consumed_item(conn, consumed_item)
+        await conn.commit()
+        return new_consumed_item
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.post("/batch", response_model=List[Consumed], status_code=status.HTTP_201_CREATED)
+async def create_consumed_items(items: List[ConsumedCreate], conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        new_items = await consumed_service.create_consumed_items(conn, items) if items else []
+        await conn.commit()
+        return new_items
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_consumed_items(
+    export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    conn: psycopg.AsyncConnection = Depends(get_async_db_connection),
+):
+    """
+    Streams the whole consumption diary (optionally between the days `from` and `to`), oldest first,
+    with dish and recipe names, as CSV or NDJSON. Rows are read from a server-side cursor in chunks.
+    """
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must not be earlier than 'from'.")
+    try:
+        cursor = await diary_export.open_export(conn, date_from, date_to)
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+    return StreamingResponse(
+        diary_export.iter_export(conn, cursor, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="consumed.{export_format}"'},
+    )
+
+@router.get("/{consumed_id}", response_model=Consumed)
+async def get_consumed_item(consumed_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    item = await consumed_service.get_consumed_item_by_id(conn, consumed_id)
+    if not item:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Consumed item not found")
+    return item
+
+@router.put("/{consumed_id}", response_model=Consumed)
+async def update_consumed_item(consumed_id: int, item: ConsumedUpdate, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        updated_item = await consumed_service.update_consumed_item(conn, consumed_id, item)
+        if not updated_item:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Consumed item not found")
+        await conn.commit()
+        return updated_item
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.delete("/{consumed_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_consumed_item(consumed_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        deleted_count = await consumed_service.delete_consumed_item(conn, consumed_id)
+        if deleted_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Consumed item not found")
+        await conn.commit()
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+    return
\ No newline at end of file
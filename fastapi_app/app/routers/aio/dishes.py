@@ -0,0 +1,117 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Optional
+from datetime import date
+import psycopg
+from app.database.async_session import get_async_db_connection
+from app.schemas.schemas import CookedDish, CookedDishCreate, RemainingDish, RemainingDishBrief
+from app.services.aio import dishes as dish_service
+from app.services.pagination import decode_cursor, next_cursor
+from app.services.aio import change_versions
+from app.services import serialization
+from app.services.aio import reference_cache
+
+router = APIRouter()
+
+@router.get("/remaining", response_model=List[RemainingDish])
+async def get_remaining_dishes(request: Request, response: Response, limit: int = 100, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        headers = await change_versions.get_validators(conn, "dishes")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return serialization.json_response(await dish_service.get_remaining_dishes(conn, limit), List[RemainingDish], response)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.get("/remaining/brief", response_model=List[RemainingDishBrief])
+async def get_remaining_dish_briefs(request: Request, response: Response, limit: int = 100, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    """
+    Id, recipe name and remaining weight of the same dishes as GET /dishes/remaining, for pickers.
+    """
+    try:
+        headers = await change_versions.get_validators(conn, "dishes")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return serialization.json_response(await dish_service.get_remaining_dish_briefs(conn, limit), List[RemainingDishBrief], response)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.get("/", response_model=List[CookedDish])
+async def get_cooked_dishes(
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    conn: psycopg.AsyncConnection = Depends(get_async_db_connection),
+):
+    """
+    Active dishes, newest first, optionally cooked between the days `from` and `to` inclusive.
+    When a page is full, the X-Next-Cursor header holds the `cursor` of the next page.
+    """
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must not be earlier than 'from'.")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+    try:
+        headers = await change_versions.get_validators(conn, "dishes")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        dishes = await dish_service.get_cooked_dishes(conn, limit, date_from, date_to, after)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+    response.headers.update(headers)
+    cursor_value = next_cursor(dishes, limit, "cooked_at")
+    if cursor_value:
+        response.headers["X-Next-Cursor"] = cursor_value
+    return serialization.json_response(dishes, List[CookedDish], response)
+
+@router.post("/", response_model=CookedDish, status_code=status.HTTP_201_CREATED)
+async def create_cooked_dish(dish: CookedDishCreate, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        new_dish = await dish_service.create_cooked_dish(conn, dish)
+        await conn.commit()
+        reference_cache.after_commit(conn)
+        return new_dish
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.post("/batch", response_model=List[CookedDish], status_code=status.HTTP_201_CREATED)
+async def create_cooked_dishes(dishes: List[CookedDishCreate], conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        new_dishes = await dish_service.create_cooked_dishes(conn, dishes) if dishes else []
+        await conn.commit()
+        reference_cache.after_commit(conn)
+        return new_dishes
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.get("/{dish_id}", response_model=CookedDish)
+async def get_cooked_dish(dish_id: int, request: Request, response: Response, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        headers = await change_versions.get_validators(conn, "dishes")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        dish = await dish_service.get_cooked_dish_by_id(conn, dish_id)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+    if not dish:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cooked dish not found")
+    response.headers.update(headers)
+    return dish
+
+@router.delete("/{dish_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_cooked_dish(dish_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        await dish_service.delete_cooked_dish(conn, dish_id)
+        await conn.commit()
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return
\ No newline at end of file
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+import psycopg
+from app.database.async_session import get_async_db_connection
+from app.schemas.schemas import IngredientCategory, IngredientCategoryCreate, IngredientCategoryUpdate
+from app.services.aio import ingredient_categories as ingredient_category_service
+from app.services.aio import ingredient_search_index
+from app.services.aio import reference_cache
+
+router = APIRouter()
+
+@router.get("/", response_model=List[IngredientCategory])
+async def get_ingredient_categories(limit: int = 100, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        return await ingredient_category_service.get_ingredient_categories(conn, limit)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.post("/", response_model=IngredientCategory, status_code=status.HTTP_201_CREATED)
+async def create_ingredient_category(category: IngredientCategoryCreate, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        new_category = await ingredient_category_service.create_ingredient_category(conn, category)
+        await conn.commit()
+        reference_cache.after_commit(conn)
+        return new_category
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.get("/{category_id}", response_model=IngredientCategory)
+async def get_ingredient_category(category_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    category = await ingredient_category_service.get_ingredient_category_by_id(conn, category_id)
+    if not category:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient category not found")
+    return category
+
+@router.put("/{category_id}", response_model=IngredientCategory)
+async def update_ingredient_category(category_id: int, category: IngredientCategoryUpdate, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        updated_category = await ingredient_category_service.update_ingredient_category(conn, category_id, category)
+        if not updated_category:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient category not found")
+        await conn.commit()
+        reference_cache.after_commit(conn)
+        await ingredient_search_index.refresh_category(conn, category_id)
+        return updated_category
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_ingredient_category(category_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        deleted_count = await ingredient_category_service.delete_ingredient_category(conn, category_id)
+        if deleted_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient category not found")
+        await conn.commit()
+        reference_cache.after_commit(conn)
+    except psycopg.Error as e:
+        await conn.rollback()
+        if e.sqlstate == '23503':
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete category that is in use by an ingredient.")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+    return
\ No newline at end of file
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+import psycopg
+from app.database.async_session import get_async_db_connection
+from app.schemas.schemas import IngredientSynonym, IngredientSynonymCreate
+from app.services.aio import ingredient_synonyms as ingredient_synonym_service
+from app.services.aio import ingredient_search_index
+
+router = APIRouter()
+
+@router.get("/ingredients/{ingredient_id}/synonyms", response_model=List[IngredientSynonym], tags=["ingredient-synonyms"])
+async def get_ingredient_synonyms(ingredient_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        return await ingredient_synonym_service.get_ingredient_synonyms(conn, ingredient_id)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.post("/ingredients/{ingredient_id}/synonyms", response_model=IngredientSynonym, status_code=status.HTTP_201_CREATED, tags=["ingredient-synonyms"])
+async def create_ingredient_synonym(ingredient_id: int, synonym: IngredientSynonymCreate, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        new_synonym = await ingredient_synonym_service.create_ingredient_synonym(conn, ingredient_id, synonym)
+        await conn.commit()
+        await ingredient_search_index.refresh_ingredients(conn, [ingredient_id])
+        return new_synonym
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.delete("/ingredients/{ingredient_id}/synonyms/{synonym_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["ingredient-synonyms"])
+async def delete_ingredient_synonym(ingredient_id: int, synonym_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        deleted_count = await ingredient_synonym_service.delete_ingredient_synonym(conn, ingredient_id, synonym_id)
+        if deleted_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient synonym not found")
+        await conn.commit()
+        await ingredient_search_index.refresh_ingredients(conn, [ingredient_id])
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+    return
\ No newline at end of file
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import List
+import psycopg
+from app.database.async_session import get_async_db_connection
+from app.schemas.schemas import Ingredient, IngredientCreate, IngredientUpdate, IngredientSearchBatch, IngredientSearchBatchResult
+from app.services.aio import ingredients as ingredient_service
+from app.services.aio import ingredient_search_index
+from app.services import serialization
+from app.services.aio import reference_cache
+
+router = APIRouter()
+
+@router.get("/search", response_model=List[Ingredient])
+async def search_ingredients(response: Response, query: str, limit: int = 10, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        ingredients = await ingredient_service.search_ingredients(conn, query, limit)
+        return serialization.json_response(ingredients, List[Ingredient], response)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.post("/search/batch", response_model=List[IngredientSearchBatchResult])
+async def search_ingredients_batch(batch: IngredientSearchBatch, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        return await ingredient_service.search_ingredients_batch(conn, batch.queries, batch.limit)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.post("/", response_model=Ingredient, status_code=status.HTTP_201_CREATED)
+async def create_ingredient(ingredient: IngredientCreate, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        new_ingredient = await ingredient_service.create_ingredient(conn, ingredient)
+        await conn.commit()
+        reference_cache.after_commit(conn)
+        await ingredient_search_index.refresh_ingredients(conn, [new_ingredient["id"]])
+        return new_ingredient
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.get("/{ingredient_id}", response_model=Ingredient)
+async def get_ingredient(ingredient_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    ingredient = await ingredient_service.get_ingredient_by_id(conn, ingredient_id)
+    if not ingredient:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient not found")
+    return ingredient
+
+@router.put("/{ingredient_id}", response_model=Ingredient)
+async def update_ingredient(ingredient_id: int, ingredient: IngredientUpdate, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        updated_ingredient = await ingredient_service.update_ingredient(conn, ingredient_id, ingredient)
+        if not updated_ingredient:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient not found")
+        await conn.commit()
+        reference_cache.after_commit(conn)
+        await ingredient_search_index.refresh_ingredients(conn, [ingredient_id])
+        return updated_ingredient
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.delete("/{ingredient_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_ingredient(ingredient_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        await ingredient_service.delete_ingredient(conn, ingredient_id)
+        await conn.commit()
+        reference_cache.after_commit(conn)
+        await ingredient_search_index.refresh_ingredients(conn, [ingredient_id])
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return
\ No newline at end of file
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+import psycopg
+from app.database.async_session import get_async_db_connection
+from app.schemas.schemas import RecipeCategory, RecipeCategoryCreate, RecipeCategoryUpdate
+from app.services.aio import recipe_categories as recipe_category_service
+from app.services.aio import reference_cache
+
+router = APIRouter()
+
+@router.get("/", response_model=List[RecipeCategory])
+async def get_recipe_categories(limit: int = 100, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        return await recipe_category_service.get_recipe_categories(conn, limit)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.post("/", response_model=RecipeCategory, status_code=status.HTTP_201_CREATED)
+async def create_recipe_category(category: RecipeCategoryCreate, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        new_category = await recipe_category_service.create_recipe_category(conn, category)
+        await conn.commit()
+        reference_cache.after_commit(conn)
+        return new_category
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.get("/{category_id}", response_model=RecipeCategory)
+async def get_recipe_category(category_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    category = await recipe_category_service.get_recipe_category_by_id(conn, category_id)
+    if not category:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe category not found")
+    return category
+
+@router.put("/{category_id}", response_model=RecipeCategory)
+async def update_recipe_category(category_id: int, category: RecipeCategoryUpdate, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        updated_category = await recipe_category_service.update_recipe_category(conn, category_id, category)
+        if not updated_category:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe category not found")
+        await conn.commit()
+        reference_cache.after_commit(conn)
+        return updated_category
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_recipe_category(category_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        deleted_count = await recipe_category_service.delete_recipe_category(conn, category_id)
+        if deleted_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe category not found")
+        await conn.commit()
+        reference_cache.after_commit(conn)
+    except psycopg.Error as e:
+        await conn.rollback()
+        if e.sqlstate == '23503':
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot delete category that is in use by a recipe.")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+    return
\ No newline at end of file
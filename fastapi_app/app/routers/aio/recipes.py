@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Optional
+import psycopg
+from app.database.async_session import async_db_connection, get_async_db_connection
+from app.schemas.schemas import Recipe, RecipeBrief, RecipeCreate, RecipeNutrition, PopularRecipe, RecipeImportResult
+from app.services import recipe_import
+from app.services.aio import recipes as recipe_service
+from app.services.aio import change_versions
+from app.services import serialization
+from app.services.aio import recipe_import as aio_recipe_import
+from app.services.aio import reference_cache
+
+router = APIRouter()
+
+@router.get("/popular", response_model=List[PopularRecipe])
+async def get_popular_recipes(response: Response, limit: int = 10, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        return serialization.json_response(await recipe_service.get_popular_recipes(conn, limit), List[PopularRecipe], response)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.get("/brief", response_model=List[RecipeBrief])
+async def get_recipe_briefs(request: Request, response: Response, search: Optional[str] = None, limit: int = 100, after_id: Optional[int] = None, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    """
+    Ids and names of the same pages as GET /recipes/, for pickers.
+    """
+    try:
+        headers = await change_versions.get_validators(conn, "recipes")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        recipes = await recipe_service.get_recipe_briefs(conn, search, limit, after_id)
+        if limit > 0 and len(recipes) == limit:
+            response.headers["X-Next-Cursor"] = str(recipes[-1]["id"])
+        return serialization.json_response(recipes, List[RecipeBrief], response)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.get("/", response_model=List[Recipe])
+async def get_recipes(request: Request, response: Response, search: Optional[str] = None, limit: int = 100, after_id: Optional[int] = None, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        headers = await change_versions.get_validators(conn, "recipes")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        recipes = await recipe_service.get_recipes(conn, search, limit, after_id)
+        # A full page means there may be more: the client passes this value back as after_id
+        if limit > 0 and len(recipes) == limit:
+            response.headers["X-Next-Cursor"] = str(recipes[-1]["id"])
+        return serialization.json_response(recipes, List[Recipe], response)
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.post("/", response_model=Recipe, status_code=status.HTTP_201_CREATED)
+async def create_recipe(recipe: RecipeCreate, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        new_recipe = await recipe_service.create_recipe(conn, recipe)
+        await conn.commit()
+        return new_recipe
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
+@router.post("/import", response_model=RecipeImportResult)
+async def import_recipes(request: Request, batch_size: int = Query(recipe_import.IMPORT_BATCH_SIZE, ge=1, le=5000)):
+    csv_format = request.headers.get("content-type", "").startswith("text/csv")
+    result = {"imported": 0, "failed": 0, "batches": 0, "recipe_ids": [], "errors": []}
+    try:
+        async for batch in recipe_import.read_batches(recipe_import.read_records(request.stream(), csv_format), batch_size):
+            # A connection per batch, checked out once the batch is read; rolled back on errors when returned
+            async with async_db_connection() as conn:
+                imported, errors = await aio_recipe_import.import_batch(conn, batch)
+                await conn.commit()
+            result["batches"] += 1
+            result["imported"] += len(imported)
+            result["failed"] += len(errors)
+            result["recipe_ids"] += [recipe_id for _, recipe_id in imported]
+            result["errors"] += [{"line": line, "error": error} for line, error in errors]
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except psycopg.Error as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error after {result['imported']} imported recipes: {e}")
+    return result
+
+@router.get("/{recipe_id}", response_model=Recipe)
+async def get_recipe(recipe_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    recipe = await recipe_service.get_recipe_by_id(conn, recipe_id)
+    if not recipe:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
+    return recipe
+
+@router.get("/{recipe_id}/nutrition", response_model=RecipeNutrition)
+async def get_recipe_nutrition(recipe_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    nutrition = await recipe_service.get_recipe_nutrition(conn, recipe_id)
+    if not nutrition:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
+    return nutrition
+
+@router.delete("/{recipe_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_recipe(recipe_id: int, conn: psycopg.AsyncConnection = Depends(get_async_db_connection)):
+    try:
+        await recipe_service.delete_recipe(conn, recipe_id)
+        await conn.commit()
+        reference_cache.after_commit(conn)
+    except psycopg.Error as e:
+        await conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return
\ No newline at end of file
@@ -1,41 +1,109 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Optional
+from datetime import date
 import psycopg2
 from app.database.session import get_db_connection
-from app.schemas.schemas import CookedDish, CookedDishCreate, RemainingDish
+from app.schemas.schemas import CookedDish, CookedDishCreate, RemainingDish, RemainingDishBrief
 from app.services import dishes as dish_service
+from app.services.pagination import decode_cursor, next_cursor
+from app.services import change_versions
+from app.services import serialization
+from app.services import reference_cache
 
 router = APIRouter()
 
 @router.get("/remaining", response_model=List[RemainingDish])
-def get_remaining_dishes(limit: int = 100, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
+def get_remaining_dishes(request: Request, response: Response, limit: int = 100, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
     try:
-        return dish_service.get_remaining_dishes(conn, limit)
+        headers = change_versions.get_validators(conn, "dishes")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return serialization.json_response(dish_service.get_remaining_dishes(conn, limit), List[RemainingDish], response)
+    except psycopg2.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.get("/remaining/brief", response_model=List[RemainingDishBrief])
+def get_remaining_dish_briefs(request: Request, response: Response, limit: int = 100, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
+    """
+    Id, recipe name and remaining weight of the same dishes as GET /dishes/remaining, for pickers.
+    """
+    try:
+        headers = change_versions.get_validators(conn, "dishes")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return serialization.json_response(dish_service.get_remaining_dish_briefs(conn, limit), List[RemainingDishBrief], response)
     except psycopg2.Error as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
 
 @router.get("/", response_model=List[CookedDish])
-def get_cooked_dishes(limit: int = 100, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
+def get_cooked_dishes(
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    conn: psycopg2.extensions.connection = Depends(get_db_connection),
+):
+    """
+    Active dishes, newest first, optionally cooked between the days `from` and `to` inclusive.
+    When a page is full, the X-Next-Cursor header holds the `cursor` of the next page.
+    """
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must not be earlier than 'from'.")
     try:
-        return dish_service.get_cooked_dishes(conn, limit)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+    try:
+        headers = change_versions.get_validators(conn, "dishes")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        dishes = dish_service.get_cooked_dishes(conn, limit, date_from, date_to, after)
     except psycopg2.Error as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+    response.headers.update(headers)
+    cursor_value = next_cursor(dishes, limit, "cooked_at")
+    if cursor_value:
+        response.headers["X-Next-Cursor"] = cursor_value
+    return serialization.json_response(dishes, List[CookedDish], response)
 
 @router.post("/", response_model=CookedDish, status_code=status.HTTP_201_CREATED)
 def create_cooked_dish(dish: CookedDishCreate, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
     try:
         new_dish = dish_service.create_cooked_dish(conn, dish)
         conn.commit()
+        reference_cache.after_commit(conn)
         return new_dish
     except psycopg2.Error as e:
         conn.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
 
+@router.post("/batch", response_model=List[CookedDish], status_code=status.HTTP_201_CREATED)
+def create_cooked_dishes(dishes: List[CookedDishCreate], conn: psycopg2.extensions.connection = Depends(get_db_connection)):
+    try:
+        new_dishes = dish_service.create_cooked_dishes(conn, dishes) if dishes else []
+        conn.commit()
+        reference_cache.after_commit(conn)
+        return new_dishes
+    except psycopg2.Error as e:
+        conn.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
+
 @router.get("/{dish_id}", response_model=CookedDish)
-def get_cooked_dish(dish_id: int, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
-    dish = dish_service.get_cooked_dish_by_id(conn, dish_id)
+def get_cooked_dish(dish_id: int, request: Request, response: Response, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
+    try:
+        headers = change_versions.get_validators(conn, "dishes")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        dish = dish_service.get_cooked_dish_by_id(conn, dish_id)
+    except psycopg2.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
     if not dish:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cooked dish not found")
+    response.headers.update(headers)
     return dish
 
 @router.delete("/{dish_id}", status_code=status.HTTP_204_NO_CONTENT)
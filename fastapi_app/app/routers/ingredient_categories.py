@@ -4,6 +4,8 @@ import psycopg2
 from app.database.session import get_db_connection
 from app.schemas.schemas import IngredientCategory, IngredientCategoryCreate, IngredientCategoryUpdate
 from app.services import ingredient_categories as ingredient_category_service
+from app.services import ingredient_search_index
+from app.services import reference_cache
 
 router = APIRouter()
 
@@ -19,6 +21,7 @@ def create_ingredient_category(category: IngredientCategoryCreate, conn: psycopg
     try:
         new_category = ingredient_category_service.create_ingredient_category(conn, category)
         conn.commit()
+        reference_cache.after_commit(conn)
         return new_category
     except psycopg2.Error as e:
         conn.rollback()
@@ -38,6 +41,8 @@ def update_ingredient_category(category_id: int, category: IngredientCategoryUpd
         if not updated_category:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient category not found")
         conn.commit()
+        reference_cache.after_commit(conn)
+        ingredient_search_index.refresh_category(conn, category_id)
         return updated_category
     except psycopg2.Error as e:
         conn.rollback()
@@ -50,6 +55,7 @@ def delete_ingredient_category(category_id: int, conn: psycopg2.extensions.conne
         if deleted_count == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient category not found")
         conn.commit()
+        reference_cache.after_commit(conn)
     except psycopg2.Error as e:
         conn.rollback()
         if e.pgcode == '23503':
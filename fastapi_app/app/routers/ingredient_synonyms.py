@@ -4,6 +4,7 @@ import psycopg2
 from app.database.session import get_db_connection
 from app.schemas.schemas import IngredientSynonym, IngredientSynonymCreate
 from app.services import ingredient_synonyms as ingredient_synonym_service
+from app.services import ingredient_search_index
 
 router = APIRouter()
 
@@ -19,6 +20,7 @@ def create_ingredient_synonym(ingredient_id: int, synonym: IngredientSynonymCrea
     try:
         new_synonym = ingredient_synonym_service.create_ingredient_synonym(conn, ingredient_id, synonym)
         conn.commit()
+        ingredient_search_index.refresh_ingredients(conn, [ingredient_id])
         return new_synonym
     except psycopg2.Error as e:
         conn.rollback()
@@ -31,6 +33,7 @@ def delete_ingredient_synonym(ingredient_id: int, synonym_id: int, conn: psycopg
         if deleted_count == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient synonym not found")
         conn.commit()
+        ingredient_search_index.refresh_ingredients(conn, [ingredient_id])
     except psycopg2.Error as e:
         conn.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
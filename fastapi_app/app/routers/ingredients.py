@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from typing import List
 import psycopg2
 from app.database.session import get_db_connection
-from app.schemas.schemas import Ingredient, IngredientCreate, IngredientUpdate
+from app.schemas.schemas import Ingredient, IngredientCreate, IngredientUpdate, IngredientSearchBatch, IngredientSearchBatchResult
 from app.services import ingredients as ingredient_service
+from app.services import ingredient_search_index
+from app.services import serialization
+from app.services import reference_cache
 
 router = APIRouter()
 
 @router.get("/search", response_model=List[Ingredient])
-def search_ingredients(query: str, limit: int = 10, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
+def search_ingredients(response: Response, query: str, limit: int = 10, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
     try:
         ingredients = ingredient_service.search_ingredients(conn, query, limit)
-        return ingredients
+        return serialization.json_response(ingredients, List[Ingredient], response)
+    except psycopg2.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.post("/search/batch", response_model=List[IngredientSearchBatchResult])
+def search_ingredients_batch(batch: IngredientSearchBatch, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
+    try:
+        return ingredient_service.search_ingredients_batch(conn, batch.queries, batch.limit)
     except psycopg2.Error as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
 
@@ -20,6 +30,8 @@ def create_ingredient(ingredient: IngredientCreate, conn: psycopg2.extensions.co
     try:
         new_ingredient = ingredient_service.create_ingredient(conn, ingredient)
         conn.commit()
+        reference_cache.after_commit(conn)
+        ingredient_search_index.refresh_ingredients(conn, [new_ingredient["id"]])
         return new_ingredient
     except psycopg2.Error as e:
         conn.rollback()
@@ -39,6 +51,8 @@ def update_ingredient(ingredient_id: int, ingredient: IngredientUpdate, conn: ps
         if not updated_ingredient:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingredient not found")
         conn.commit()
+        reference_cache.after_commit(conn)
+        ingredient_search_index.refresh_ingredients(conn, [ingredient_id])
         return updated_ingredient
     except psycopg2.Error as e:
         conn.rollback()
@@ -49,6 +63,8 @@ def delete_ingredient(ingredient_id: int, conn: psycopg2.extensions.connection =
     try:
         ingredient_service.delete_ingredient(conn, ingredient_id)
         conn.commit()
+        reference_cache.after_commit(conn)
+        ingredient_search_index.refresh_ingredients(conn, [ingredient_id])
     except psycopg2.Error as e:
         conn.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -4,6 +4,7 @@ import psycopg2
 from app.database.session import get_db_connection
 from app.schemas.schemas import RecipeCategory, RecipeCategoryCreate, RecipeCategoryUpdate
 from app.services import recipe_categories as recipe_category_service
+from app.services import reference_cache
 
 router = APIRouter()
 
@@ -19,6 +20,7 @@ def create_recipe_category(category: RecipeCategoryCreate, conn: psycopg2.extens
     try:
         new_category = recipe_category_service.create_recipe_category(conn, category)
         conn.commit()
+        reference_cache.after_commit(conn)
         return new_category
     except psycopg2.Error as e:
         conn.rollback()
@@ -38,6 +40,7 @@ def update_recipe_category(category_id: int, category: RecipeCategoryUpdate, con
         if not updated_category:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe category not found")
         conn.commit()
+        reference_cache.after_commit(conn)
         return updated_category
     except psycopg2.Error as e:
         conn.rollback()
@@ -50,6 +53,7 @@ def delete_recipe_category(category_id: int, conn: psycopg2.extensions.connectio
         if deleted_count == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe category not found")
         conn.commit()
+        reference_cache.after_commit(conn)
     except psycopg2.Error as e:
         conn.rollback()
         if e.pgcode == '23503':
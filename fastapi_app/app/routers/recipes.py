@@ -1,23 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from typing import List, Optional
+import anyio
 import psycopg2
-from app.database.session import get_db_connection
-from app.schemas.schemas import Recipe, RecipeCreate, RecipeNutrition, PopularRecipe
+from app.database.session import db_connection, get_db_connection
+from app.schemas.schemas import Recipe, RecipeBrief, RecipeCreate, RecipeNutrition, PopularRecipe, RecipeImportResult
 from app.services import recipes as recipe_service
+from app.services import change_versions
+from app.services import serialization
+from app.services import recipe_import
+from app.services import reference_cache
 
 router = APIRouter()
 
 @router.get("/popular", response_model=List[PopularRecipe])
-def get_popular_recipes(limit: int = 10, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
+def get_popular_recipes(response: Response, limit: int = 10, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
     try:
-        return recipe_service.get_popular_recipes(conn, limit)
+        return serialization.json_response(recipe_service.get_popular_recipes(conn, limit), List[PopularRecipe], response)
+    except psycopg2.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.get("/brief", response_model=List[RecipeBrief])
+def get_recipe_briefs(request: Request, response: Response, search: Optional[str] = None, limit: int = 100, after_id: Optional[int] = None, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
+    """
+    Ids and names of the same pages as GET /recipes/, for pickers.
+    """
+    try:
+        headers = change_versions.get_validators(conn, "recipes")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        recipes = recipe_service.get_recipe_briefs(conn, search, limit, after_id)
+        if limit > 0 and len(recipes) == limit:
+            response.headers["X-Next-Cursor"] = str(recipes[-1]["id"])
+        return serialization.json_response(recipes, List[RecipeBrief], response)
     except psycopg2.Error as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
 
 @router.get("/", response_model=List[Recipe])
-def get_recipes(search: Optional[str] = None, limit: int = 100, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
+def get_recipes(request: Request, response: Response, search: Optional[str] = None, limit: int = 100, after_id: Optional[int] = None, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
     try:
-        return recipe_service.get_recipes(conn, search, limit)
+        headers = change_versions.get_validators(conn, "recipes")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        recipes = recipe_service.get_recipes(conn, search, limit, after_id)
+        # A full page means there may be more: the client passes this value back as after_id
+        if limit > 0 and len(recipes) == limit:
+            response.headers["X-Next-Cursor"] = str(recipes[-1]["id"])
+        return serialization.json_response(recipes, List[Recipe], response)
     except psycopg2.Error as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
 
@@ -31,6 +61,34 @@ def create_recipe(recipe: RecipeCreate, conn: psycopg2.extensions.connection = D
         conn.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error: {e}")
 
+@router.post("/import", response_model=RecipeImportResult)
+async def import_recipes(request: Request, batch_size: int = Query(recipe_import.IMPORT_BATCH_SIZE, ge=1, le=5000)):
+    """
+    Bulk import from an NDJSON (default) or CSV (`Content-Type: text/csv`) body, one transaction per batch.
+    """
+    csv_format = request.headers.get("content-type", "").startswith("text/csv")
+    result = {"imported": 0, "failed": 0, "batches": 0, "recipe_ids": [], "errors": []}
+    try:
+        async for batch in recipe_import.read_batches(recipe_import.read_records(request.stream(), csv_format), batch_size):
+            # A connection per batch, checked out once the batch is read: slow uploads do not hold pool connections
+            async with db_connection() as conn:
+                try:
+                    imported, errors = await anyio.to_thread.run_sync(recipe_import.import_batch, conn, batch)
+                    await anyio.to_thread.run_sync(conn.commit)
+                except psycopg2.Error:
+                    await anyio.to_thread.run_sync(conn.rollback)
+                    raise
+            result["batches"] += 1
+            result["imported"] += len(imported)
+            result["failed"] += len(errors)
+            result["recipe_ids"] += [recipe_id for _, recipe_id in imported]
+            result["errors"] += [{"line": line, "error": error} for line, error in errors]
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except psycopg2.Error as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Database error after {result['imported']} imported recipes: {e}")
+    return result
+
 @router.get("/{recipe_id}", response_model=Recipe)
 def get_recipe(recipe_id: int, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
     recipe = recipe_service.get_recipe_by_id(conn, recipe_id)
@@ -50,6 +108,7 @@ def delete_recipe(recipe_id: int, conn: psycopg2.extensions.connection = Depends
     try:
         recipe_service.delete_recipe(conn, recipe_id)
         conn.commit()
+        reference_cache.after_commit(conn)
     except psycopg2.Error as e:
         conn.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -1,22 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from datetime import date
+from typing import List, Literal
 import psycopg2
 from app.database.session import get_db_connection
-from app.schemas.schemas import DailySummary
+from app.schemas.schemas import DailySummary, NutritionBucket
 from app.services import stats as stats_service
+from app.services import change_versions
+from app.services import serialization
 
 router = APIRouter()
 
 @router.get("/daily_summary", response_model=DailySummary)
-def get_daily_summary(summary_date: date, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
+def get_daily_summary(summary_date: date, request: Request, response: Response, conn: psycopg2.extensions.connection = Depends(get_db_connection)):
     """
     Get daily nutrition summary for a specific date.
     """
     try:
+        headers = change_versions.get_validators(conn, "stats")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
         daily_summary_data = stats_service.get_daily_summary(conn, summary_date)
         if daily_summary_data and daily_summary_data.get('meals'):
             return DailySummary(**daily_summary_data)
         
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No summary found for this date.")
     except psycopg2.Error as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
+
+@router.get("/range", response_model=List[NutritionBucket])
+def get_nutrition_range(
+    request: Request,
+    response: Response,
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    bucket: Literal["day", "week", "month"] = "day",
+    conn: psycopg2.extensions.connection = Depends(get_db_connection),
+):
+    """
+    Nutrition totals and per-meal breakdowns for every day, week (from Monday) or month
+    between `from` and `to` inclusive. Buckets without consumption are returned with zeros.
+    """
+    if date_to < date_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must not be earlier than 'from'.")
+    if stats_service.bucket_count(date_from, date_to, bucket) > stats_service.MAX_RANGE_BUCKETS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Range is limited to {stats_service.MAX_RANGE_BUCKETS} buckets.")
+    try:
+        headers = change_versions.get_validators(conn, "stats")
+        if change_versions.is_not_modified(request.headers, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return serialization.json_response(stats_service.get_nutrition_range(conn, date_from, date_to, bucket), List[NutritionBucket], response)
+    except psycopg2.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 class Ingredient(BaseModel):
     id: int
@@ -15,6 +15,14 @@ class Ingredient(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class IngredientSearchBatch(BaseModel):
+    queries: List[str] = Field(min_length=1, max_length=100)
+    limit: int = 5
+
+class IngredientSearchBatchResult(BaseModel):
+    query: str
+    matches: List[Ingredient]
+
 class IngredientCreate(BaseModel):
     name: str
     category_id: int
@@ -44,6 +52,10 @@ class Recipe(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class RecipeBrief(BaseModel):
+    id: int
+    name: str
+
 class RecipeIngredient(BaseModel):
     ingredient_id: int
     ingredient_name: str
@@ -62,6 +74,17 @@ class RecipeCreate(BaseModel):
     instructions: Optional[str] = None
     ingredients: List[RecipeIngredientCreate]
 
+class RecipeImportError(BaseModel):
+    line: int
+    error: str
+
+class RecipeImportResult(BaseModel):
+    imported: int
+    failed: int
+    batches: int
+    recipe_ids: List[int]
+    errors: List[RecipeImportError]
+
 
 class CookedDishCreate(BaseModel):
     recipe_id: int
@@ -119,6 +142,12 @@ class DailySummary(BaseModel):
     total_nutrition: TotalNutritionSummary
     meals: Optional[List[MealSummary]] = None
 
+class NutritionBucket(BaseModel):
+    start: date
+    end: date
+    total_nutrition: TotalNutritionSummary
+    meals: List[MealSummary]
+
 class IngredientCategory(BaseModel):
     id: int
     name: str
@@ -170,6 +199,11 @@ class RecipeNutrition(BaseModel):
     total_proteins: float
     total_fats: float
     total_carbs: float
+    total_weight: Optional[float] = None
+    calories_per_100g: Optional[float] = None
+    proteins_per_100g: Optional[float] = None
+    fats_per_100g: Optional[float] = None
+    carbs_per_100g: Optional[float] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -185,6 +219,11 @@ class RemainingDish(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class RemainingDishBrief(BaseModel):
+    cooked_dish_id: int
+    recipe_name: str
+    remaining_weight: float
+
 class PopularRecipe(BaseModel):
     recipe_id: int
     recipe_name: str
@@ -195,3 +234,20 @@ class PopularRecipe(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+
+class PoolStats(BaseModel):
+    min_size: int
+    max_size: int
+    size: int
+    idle: int
+    in_use: int
+    connections_created: int
+    checkouts: int
+    checkout_waits: int
+    checkout_timeouts: int
+    checkout_wait_ms: float
+    health_check_failures: int
+    reset_failures: int
+    connections_closed: Optional[int] = None
+    lifetime_expirations: Optional[int] = None
+    idle_expirations: Optional[int] = None
@@ -0,0 +1,12 @@
+import psycopg
+from psycopg.rows import dict_row
+from typing import Dict
+from app.services.change_versions import VERSION_QUERY, is_not_modified, validators
+
+# Header logic is shared with the sync services; only the query differs
+
+
+async def get_validators(conn: psycopg.AsyncConnection, entity: str) -> Dict[str, str]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(VERSION_QUERY, (entity,))
+        return validators(entity, await cursor.fetchone())
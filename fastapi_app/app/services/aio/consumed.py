@@ -0,0 +1,96 @@
+import psycopg
+from psycopg.rows import dict_row
+from typing import List, Dict, Any, Optional
+from datetime import date
+from app.schemas.schemas import ConsumedCreate, ConsumedUpdate
+from app.services.pagination import Position, history_query
+
+async def get_consumed_items(
+    conn: psycopg.AsyncConnection,
+    limit: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    meal_type: Optional[str] = None,
+    after: Optional[Position] = None,
+) -> List[Dict[str, Any]]:
+    query, params = history_query("nutrition.consumed", "consumed_at", limit, date_from, date_to, after, {"meal_type": meal_type})
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+async def create_consumed_item(conn: psycopg.AsyncConnection, consumed_item: ConsumedCreate) -> Dict[str, Any]:
+    return (await create_consumed_items(conn, [consumed_item]))[0]
+
+async def create_consumed_items(conn: psycopg.AsyncConnection, items: List[ConsumedCreate]) -> List[Dict[str, Any]]:
+    """
+    Inserts the portions in one statement; rows are returned in input order.
+    The affected dishes are locked in id order first, so concurrent batches never wait on each other in a cycle.
+    """
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(
+            """
+            WITH locked_dishes AS (
+                SELECT nutrition.lock_cooked_dishes(%s::BIGINT[])
+            ),
+            data AS (
+                SELECT nextval(pg_get_serial_sequence('nutrition.consumed', 'id')) AS id, d.*
+                FROM unnest(%s::BIGINT[], %s::TEXT[], %s::NUMERIC[]) WITH ORDINALITY
+                    AS d(cooked_dish_id, meal_type, weight_grams, position)
+                -- Uncorrelated, so it runs once before the first row: all locks are taken
+                -- before the consumed triggers lock dishes row by row
+                WHERE (SELECT COUNT(*) FROM locked_dishes) >= 0
+            ),
+            new_items AS (
+                INSERT INTO nutrition.consumed (id, cooked_dish_id, meal_type, weight_grams)
+                OVERRIDING SYSTEM VALUE
+                SELECT id, cooked_dish_id, meal_type, weight_grams FROM data ORDER BY position
+                RETURNING *
+            )
+            SELECT ni.*
+            FROM new_items ni
+            JOIN data d ON d.id = ni.id
+            ORDER BY d.position
+            """,
+            (
+                sorted({item.cooked_dish_id for item in items}),
+                [item.cooked_dish_id for item in items],
+                [item.meal_type for item in items],
+                [item.weight_grams for item in items],
+            )
+        )
+        return await cursor.fetchall()
+
+async def get_consumed_item_by_id(conn: psycopg.AsyncConnection, consumed_id: int) -> Dict[str, Any]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute("SELECT * FROM nutrition.consumed WHERE id = %s", (consumed_id,))
+        return await cursor.fetchone()
+
+async def update_consumed_item(conn: psycopg.AsyncConnection, consumed_id: int, item: ConsumedUpdate) -> Dict[str, Any]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        update_data = item.model_dump(exclude_unset=True)
+        if not update_data:
+            return await get_consumed_item_by_id(conn, consumed_id)
+
+        set_query = ", ".join([f"{key} = %s" for key in update_data.keys()])
+        values = list(update_data.values())
+        values.append(consumed_id)
+
+        await cursor.execute(
+            f"UPDATE nutrition.consumed SET {set_query} WHERE id = %s RETURNING *",
+            values
+        )
+        return await cursor.fetchone()
+
+async def delete_consumed_item(conn: psycopg.AsyncConnection, consumed_id: int) -> int:
+    async with conn.cursor() as cursor:
+        await cursor.execute("DELETE FROM nutrition.consumed WHERE id = %s", (consumed_id,))
+        return cursor.rowcount
+
+async def ensure_consumed_partitions(conn: psycopg.AsyncConnection, months: int = 3) -> int:
+    """
+    Creates the monthly partitions of consumed for the current and the next months.
+    Returns how many were created; the caller commits.
+    """
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT nutrition.ensure_consumed_partitions(p_months => %s)", (months,))
+        return (await cursor.fetchone())[0]
@@ -0,0 +1,29 @@
+import psycopg
+from datetime import date
+from typing import AsyncIterator, Optional
+from app.services.diary_export import EXPORT_CHUNK_SIZE, EXPORT_CURSOR_NAME, export_query, format_chunk
+
+# Query and formatting are shared with the sync services; only the cursor differs
+
+
+async def open_export(conn: psycopg.AsyncConnection, date_from: Optional[date] = None, date_to: Optional[date] = None) -> psycopg.AsyncServerCursor:
+    """
+    Declares the server-side cursor, so query errors surface before the response starts.
+    """
+    cursor = conn.cursor(name=EXPORT_CURSOR_NAME)
+    await cursor.execute(*export_query(date_from, date_to))
+    return cursor
+
+
+async def iter_export(conn: psycopg.AsyncConnection, cursor: psycopg.AsyncServerCursor, export_format: str) -> AsyncIterator[str]:
+    try:
+        if export_format == "csv":
+            yield format_chunk([], export_format, header=True)
+        while True:
+            rows = await cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            yield format_chunk(rows, export_format)
+    finally:
+        await cursor.close()
+        await conn.rollback()
@@ -0,0 +1,52 @@
+import psycopg
+from psycopg.rows import dict_row
+from typing import List, Dict, Any
+from app.schemas.schemas import IngredientCategoryCreate, IngredientCategoryUpdate
+from app.services.aio import reference_cache
+
+async def get_ingredient_categories(conn: psycopg.AsyncConnection, limit: int) -> List[Dict[str, Any]]:
+    async def load():
+        async with conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute("SELECT id, name, description FROM nutrition.ingredient_categories ORDER BY name LIMIT %s", (limit,))
+            return await cursor.fetchall()
+    return await reference_cache.read_through("ingredient_category_lists", limit, load)
+
+async def create_ingredient_category(conn: psycopg.AsyncConnection, category: IngredientCategoryCreate) -> Dict[str, Any]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(
+            "INSERT INTO nutrition.ingredient_categories (name, description) VALUES (%s, %s) RETURNING id, name, description",
+            (category.name, category.description)
+        )
+        new_category = await cursor.fetchone()
+        reference_cache.invalidate_on_commit(conn, "ingredient_categories", new_category["id"])
+        return new_category
+
+async def get_ingredient_category_by_id(conn: psycopg.AsyncConnection, category_id: int) -> Dict[str, Any]:
+    async def load():
+        async with conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute("SELECT id, name, description FROM nutrition.ingredient_categories WHERE id = %s", (category_id,))
+            return await cursor.fetchone()
+    return await reference_cache.read_through("ingredient_categories", category_id, load)
+
+async def update_ingredient_category(conn: psycopg.AsyncConnection, category_id: int, category: IngredientCategoryUpdate) -> Dict[str, Any]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        update_data = category.model_dump(exclude_unset=True)
+        if not update_data:
+            return await get_ingredient_category_by_id(conn, category_id)
+
+        set_query = ", ".join([f"{key} = %s" for key in update_data.keys()])
+        values = list(update_data.values())
+        values.append(category_id)
+
+        await cursor.execute(
+            f"UPDATE nutrition.ingredient_categories SET {set_query} WHERE id = %s RETURNING id, name, description",
+            values
+        )
+        reference_cache.invalidate_on_commit(conn, "ingredient_categories", category_id)
+        return await cursor.fetchone()
+
+async def delete_ingredient_category(conn: psycopg.AsyncConnection, category_id: int) -> int:
+    async with conn.cursor() as cursor:
+        await cursor.execute("DELETE FROM nutrition.ingredient_categories WHERE id = %s", (category_id,))
+        reference_cache.invalidate_on_commit(conn, "ingredient_categories", category_id)
+        return cursor.rowcount
@@ -0,0 +1,47 @@
+import asyncio
+import psycopg
+from psycopg.rows import dict_row
+from typing import List, Dict, Any, Optional
+from app.services.ingredient_search_index import INGREDIENTS_QUERY, IngredientSearchIndex, get_search_index, is_enabled
+
+# The index itself is shared with the sync services; only loading differs
+_load_lock = asyncio.Lock()
+
+
+async def fetch_ingredients(conn: psycopg.AsyncConnection, ingredient_ids: Optional[List[int]] = None, category_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        if ingredient_ids is not None:
+            await cursor.execute(INGREDIENTS_QUERY + " WHERE i.id = ANY(%s)", (list(ingredient_ids),))
+        elif category_id is not None:
+            await cursor.execute(INGREDIENTS_QUERY + " WHERE i.category_id = %s", (category_id,))
+        else:
+            await cursor.execute(INGREDIENTS_QUERY)
+        return await cursor.fetchall()
+
+
+async def ensure_loaded(conn: psycopg.AsyncConnection) -> IngredientSearchIndex:
+    index = get_search_index()
+    if index.is_stale() or index.has_changes():
+        async with _load_lock:
+            if index.is_stale():
+                index.take_changes()
+                index.load(await fetch_ingredients(conn))
+            elif index.has_changes():
+                ingredient_ids, category_ids = index.take_changes()
+                if ingredient_ids:
+                    index.upsert(ingredient_ids, await fetch_ingredients(conn, ingredient_ids=list(ingredient_ids)))
+                for category_id in category_ids:
+                    index.upsert(index.ids_in_category(category_id), await fetch_ingredients(conn, category_id=category_id))
+    return index
+
+
+async def refresh_ingredients(conn: psycopg.AsyncConnection, ingredient_ids: List[int]) -> None:
+    index = get_search_index()
+    if is_enabled() and index.loaded_at is not None:
+        index.upsert(ingredient_ids, await fetch_ingredients(conn, ingredient_ids=ingredient_ids))
+
+
+async def refresh_category(conn: psycopg.AsyncConnection, category_id: int) -> None:
+    index = get_search_index()
+    if is_enabled() and index.loaded_at is not None:
+        index.upsert(index.ids_in_category(category_id), await fetch_ingredients(conn, category_id=category_id))
@@ -0,0 +1,22 @@
+import psycopg
+from psycopg.rows import dict_row
+from typing import List, Dict, Any
+from app.schemas.schemas import IngredientSynonymCreate
+
+async def get_ingredient_synonyms(conn: psycopg.AsyncConnection, ingredient_id: int) -> List[Dict[str, Any]]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute("SELECT id, ingredient_id, synonym FROM nutrition.ingredient_synonyms WHERE ingredient_id = %s ORDER BY synonym", (ingredient_id,))
+        return await cursor.fetchall()
+
+async def create_ingredient_synonym(conn: psycopg.AsyncConnection, ingredient_id: int, synonym: IngredientSynonymCreate) -> Dict[str, Any]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(
+            "INSERT INTO nutrition.ingredient_synonyms (ingredient_id, synonym, synonym_normalized) VALUES (%s, %s, '') RETURNING id, ingredient_id, synonym",
+            (ingredient_id, synonym.synonym)
+        )
+        return await cursor.fetchone()
+
+async def delete_ingredient_synonym(conn: psycopg.AsyncConnection, ingredient_id: int, synonym_id: int) -> int:
+    async with conn.cursor() as cursor:
+        await cursor.execute("DELETE FROM nutrition.ingredient_synonyms WHERE id = %s AND ingredient_id = %s", (synonym_id, ingredient_id))
+        return cursor.rowcount
@@ -0,0 +1,108 @@
+import psycopg
+from psycopg.rows import dict_row
+from typing import List, Dict, Any
+from app.schemas.schemas import IngredientCreate, IngredientUpdate
+from app.services.aio import ingredient_search_index, reference_cache
+
+async def search_ingredients(conn: psycopg.AsyncConnection, query: str, limit: int) -> List[Dict[str, Any]]:
+    if ingredient_search_index.is_enabled():
+        return (await ingredient_search_index.ensure_loaded(conn)).search(query, limit)
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(
+            """
+            SELECT i.id, i.name, i.category_id, ic.name as category_name, i.calories, i.proteins, i.fats, i.carbs, s.search_score 
+            FROM nutrition.search_ingredients(%s, %s) s 
+            JOIN nutrition.ingredients i ON s.id = i.id 
+            JOIN nutrition.ingredient_categories ic ON i.category_id = ic.id
+            """, 
+            (query, limit)
+        )
+        return await cursor.fetchall()
+
+async def search_ingredients_batch(conn: psycopg.AsyncConnection, queries: List[str], limit: int) -> List[Dict[str, Any]]:
+    results = [{"query": query, "matches": []} for query in queries]
+    if ingredient_search_index.is_enabled():
+        index = await ingredient_search_index.ensure_loaded(conn)
+        for result in results:
+            result["matches"] = index.search(result["query"], limit)
+        return results
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(
+            """
+            SELECT s.query_index, i.id, i.name, i.category_id, ic.name as category_name, i.calories, i.proteins, i.fats, i.carbs, s.search_score
+            FROM nutrition.search_ingredients_batch(%s, %s) s
+            JOIN nutrition.ingredients i ON s.id = i.id
+            JOIN nutrition.ingredient_categories ic ON i.category_id = ic.id
+            ORDER BY s.query_index, s.search_score DESC, s.id
+            """,
+            (queries, limit)
+        )
+        for row in await cursor.fetchall():
+            results[row.pop("query_index") - 1]["matches"].append(row)
+    return results
+
+async def create_ingredient(conn: psycopg.AsyncConnection, ingredient: IngredientCreate) -> Dict[str, Any]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(
+            """
+            INSERT INTO nutrition.ingredients (name, category_id, calories, proteins, fats, carbs, name_normalized)
+            VALUES (%s, %s, %s, %s, %s, %s, '')
+            RETURNING id;
+            """,
+            (ingredient.name, ingredient.category_id, ingredient.calories, ingredient.proteins, ingredient.fats, ingredient.carbs)
+        )
+        new_ingredient_id = (await cursor.fetchone())['id']
+        reference_cache.invalidate_on_commit(conn, "ingredients", new_ingredient_id)
+        
+        await cursor.execute(
+            """
+            SELECT i.id, i.name, i.category_id, ic.name as category_name, i.calories, i.proteins, i.fats, i.carbs 
+            FROM nutrition.ingredients i 
+            JOIN nutrition.ingredient_categories ic ON i.category_id = ic.id 
+            WHERE i.id = %s
+            """, 
+            (new_ingredient_id,)
+        )
+        return await cursor.fetchone()
+
+async def get_ingredient_by_id(conn: psycopg.AsyncConnection, ingredient_id: int) -> Dict[str, Any]:
+    return await reference_cache.read_through("ingredients", ingredient_id, lambda: _select_ingredient(conn, ingredient_id))
+
+async def _select_ingredient(conn: psycopg.AsyncConnection, ingredient_id: int) -> Dict[str, Any]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(
+            """
+            SELECT i.id, i.name, i.category_id, ic.name as category_name, i.calories, i.proteins, i.fats, i.carbs 
+            FROM nutrition.ingredients_active i 
+            JOIN nutrition.ingredient_categories ic ON i.category_id = ic.id 
+            WHERE i.id = %s
+            """, 
+            (ingredient_id,)
+        )
+        return await cursor.fetchone()
+
+async def update_ingredient(conn: psycopg.AsyncConnection, ingredient_id: int, ingredient: IngredientUpdate) -> Dict[str, Any]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute("SELECT * FROM nutrition.ingredients WHERE id = %s", (ingredient_id,))
+        if not await cursor.fetchone():
+            return None
+
+        update_data = ingredient.model_dump(exclude_unset=True)
+        if not update_data:
+            return await get_ingredient_by_id(conn, ingredient_id)
+
+        set_query = ", ".join([f"{key} = %s" for key in update_data.keys()])
+        values = list(update_data.values())
+        values.append(ingredient_id)
+
+        query = f"UPDATE nutrition.ingredients SET {set_query}, updated_at=NOW() WHERE id = %s"
+        await cursor.execute(query, values)
+        reference_cache.invalidate_on_commit(conn, "ingredients", ingredient_id)
+
+        # Read back uncached: the row is not committed yet
+        return await _select_ingredient(conn, ingredient_id)
+
+async def delete_ingredient(conn: psycopg.AsyncConnection, ingredient_id: int):
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT nutrition.soft_delete_ingredient(%s);", (ingredient_id,))
+        reference_cache.invalidate_on_commit(conn, "ingredients", ingredient_id)
@@ -0,0 +1,33 @@
+import psycopg
+from psycopg.rows import dict_row
+from typing import List, Tuple
+from app.services.recipe_import import INSERT_BATCH_QUERY, REFERENCES_QUERY, ImportRecord, insert_params, reference_ids, split_batch
+
+# Parsing (read_records / read_batches) is shared with the sync services
+
+
+async def import_batch(conn: psycopg.AsyncConnection, batch: List[ImportRecord]) -> Tuple[List[Tuple[int, int]], List[Tuple[int, str]]]:
+    parsed = [(line, record) for line, record in batch if not isinstance(record, str)]
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(REFERENCES_QUERY, reference_ids(parsed))
+        valid, errors = split_batch(batch, await cursor.fetchone())
+        if not valid:
+            return [], errors
+
+        await cursor.execute("SAVEPOINT recipe_import_batch")
+        try:
+            await cursor.execute(INSERT_BATCH_QUERY, insert_params(valid))
+            return [(row["line"], row["id"]) for row in await cursor.fetchall()], errors
+        except psycopg.Error:
+            await cursor.execute("ROLLBACK TO SAVEPOINT recipe_import_batch")
+
+        imported = []
+        for line, recipe in valid:
+            await cursor.execute("SAVEPOINT recipe_import_row")
+            try:
+                await cursor.execute(INSERT_BATCH_QUERY, insert_params([(line, recipe)]))
+                imported.append((line, (await cursor.fetchone())["id"]))
+            except psycopg.Error as e:
+                await cursor.execute("ROLLBACK TO SAVEPOINT recipe_import_row")
+                errors.append((line, str(e).strip()))
+        return imported, sorted(errors)
@@ -0,0 +1,133 @@
+import psycopg
+from psycopg.rows import dict_row
+from typing import List, Dict, Any, Optional
+from app.schemas.schemas import RecipeCreate
+from app.services.recipes import recipe_page_filter
+from app.services.aio.ingredients import get_ingredient_by_id
+from app.services.aio import reference_cache
+
+async def get_popular_recipes(conn: psycopg.AsyncConnection, limit: int) -> List[Dict[str, Any]]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute("SELECT * FROM nutrition.popular_recipes LIMIT %s", (limit,))
+        return await cursor.fetchall()
+
+async def get_recipes(conn: psycopg.AsyncConnection, search: Optional[str], limit: int, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Returns a page of active recipes ordered by id, starting after `after_id` (keyset pagination).
+    """
+    where, params = recipe_page_filter(search, after_id)
+    params.append(limit)
+
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(
+            f"""
+            WITH page AS (
+                SELECT r.id, r.name, r.category_name, r.description, r.instructions, r.times_cooked, r.avg_cooked_weight
+                FROM nutrition.recipes_active r
+                WHERE {where}
+                ORDER BY r.id
+                LIMIT %s
+            ),
+            page_ingredients AS (
+                SELECT
+                    ri.recipe_id,
+                    json_agg(
+                        json_build_object(
+                            'ingredient_id', ri.ingredient_id,
+                            'ingredient_name', i.name,
+                            'weight_grams', ri.weight_grams
+                        )
+                        ORDER BY ri.ingredient_id
+                    ) AS ingredients
+                FROM nutrition.recipe_ingredients ri
+                JOIN nutrition.ingredients i ON ri.ingredient_id = i.id
+                WHERE ri.recipe_id IN (SELECT id FROM page)
+                GROUP BY ri.recipe_id
+            )
+            SELECT p.*, COALESCE(pi.ingredients, '[]'::json) AS ingredients
+            FROM page p
+            LEFT JOIN page_ingredients pi ON pi.recipe_id = p.id
+            ORDER BY p.id
+            """,
+            params
+        )
+        return await cursor.fetchall()
+
+async def get_recipe_briefs(conn: psycopg.AsyncConnection, search: Optional[str], limit: int, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Same page as get_recipes, only ids and names (for pickers).
+    """
+    where, params = recipe_page_filter(search, after_id)
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(f"SELECT r.id, r.name FROM nutrition.recipes_active r WHERE {where} ORDER BY r.id LIMIT %s", params + [limit])
+        return await cursor.fetchall()
+
+async def create_recipe(conn: psycopg.AsyncConnection, recipe: RecipeCreate) -> Dict[str, Any]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(
+            """
+            WITH new_recipe AS (
+                INSERT INTO nutrition.recipes (name, category_id, description, instructions)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id, name, category_id, description, instructions, times_cooked, avg_cooked_weight
+            ),
+            new_ingredients AS (
+                INSERT INTO nutrition.recipe_ingredients (recipe_id, ingredient_id, weight_grams)
+                SELECT nr.id, x.ingredient_id, x.weight_grams
+                FROM new_recipe nr
+                CROSS JOIN unnest(%s::INT[], %s::NUMERIC[]) AS x(ingredient_id, weight_grams)
+                RETURNING ingredient_id, weight_grams
+            )
+            SELECT
+                nr.id, nr.name, rc.name as category_name, nr.description, nr.instructions, nr.times_cooked, nr.avg_cooked_weight,
+                COALESCE(
+                    (
+                        SELECT json_agg(
+                            json_build_object(
+                                'ingredient_id', ni.ingredient_id,
+                                'ingredient_name', i.name,
+                                'weight_grams', ni.weight_grams
+                            )
+                            ORDER BY ni.ingredient_id
+                        )
+                        FROM new_ingredients ni
+                        JOIN nutrition.ingredients i ON ni.ingredient_id = i.id
+                    ),
+                    '[]'::json
+                ) as ingredients
+            FROM new_recipe nr
+            JOIN nutrition.recipe_categories rc ON nr.category_id = rc.id
+            """,
+            (
+                recipe.name, recipe.category_id, recipe.description, recipe.instructions,
+                [ingredient.ingredient_id for ingredient in recipe.ingredients],
+                [ingredient.weight_grams for ingredient in recipe.ingredients],
+            )
+        )
+        return await cursor.fetchone()
+
+async def get_recipe_by_id(conn: psycopg.AsyncConnection, recipe_id: int) -> Dict[str, Any]:
+    return await reference_cache.read_through("recipes", recipe_id, lambda: _select_recipe(conn, recipe_id))
+
+async def _select_recipe(conn: psycopg.AsyncConnection, recipe_id: int) -> Dict[str, Any]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute("SELECT r.id, r.name, rc.name as category_name, r.description, r.instructions, r.times_cooked, r.avg_cooked_weight FROM nutrition.recipes_active r JOIN nutrition.recipe_categories rc ON r.category_id = rc.id WHERE r.id = %s", (recipe_id,))
+        recipe = await cursor.fetchone()
+
+        if recipe:
+            await cursor.execute("SELECT ri.ingredient_id, i.name as ingredient_name, ri.weight_grams FROM nutrition.recipe_ingredients ri JOIN nutrition.ingredients i ON ri.ingredient_id = i.id WHERE ri.recipe_id = %s ORDER BY ri.ingredient_id", (recipe["id"],))
+            recipe["ingredients"] = await cursor.fetchall()
+        
+        return recipe
+
+async def get_recipe_nutrition(conn: psycopg.AsyncConnection, recipe_id: int) -> Dict[str, Any]:
+    async def load():
+        async with conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute("SELECT * FROM nutrition.recipe_nutrition WHERE recipe_id = %s", (recipe_id,))
+            return await cursor.fetchone()
+    return await reference_cache.read_through("recipe_nutrition", recipe_id, load)
+
+async def delete_recipe(conn: psycopg.AsyncConnection, recipe_id: int):
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT nutrition.soft_delete_recipe(%s);", (recipe_id,))
+        reference_cache.invalidate_on_commit(conn, "recipes", recipe_id)
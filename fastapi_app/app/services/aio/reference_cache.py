@@ -0,0 +1,30 @@
+import psycopg
+from typing import Any, Awaitable, Callable, Hashable
+from app.services.reference_cache import CHANNEL, after_commit, apply_notification, discard_pending, invalidate, invalidate_on_commit, is_enabled, is_listening, listener_connected, lookup, store
+
+# The caches themselves are shared with the sync services; only listening differs
+
+
+async def listen_for_changes(dsn: str) -> None:
+    """
+    LISTENs on its own psycopg connection and invalidates the caches on
+    every notification. Runs until cancelled or the connection is lost.
+    """
+    async with await psycopg.AsyncConnection.connect(dsn, autocommit=True) as conn:
+        await conn.execute(f"LISTEN {CHANNEL}")
+        with listener_connected():
+            async for notify in conn.notifies():
+                apply_notification(notify.payload)
+
+
+async def read_through(namespace: str, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Returns the cached value, awaiting `load()` on a miss or while no listener is connected.
+    """
+    if not is_enabled() or not is_listening():
+        return await load()
+    value, generation = lookup(namespace, key)
+    if value is None:
+        value = await load()
+        store(namespace, key, value, generation)
+    return value
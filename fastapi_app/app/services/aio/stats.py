@@ -0,0 +1,18 @@
+import psycopg
+from psycopg.rows import dict_row
+from typing import Dict, Any, List
+from datetime import date
+from app.services.stats import MAX_RANGE_BUCKETS, RANGE_QUERY, bucket_count, to_bucket
+
+async def get_daily_summary(conn: psycopg.AsyncConnection, summary_date: date) -> Dict[str, Any]:
+    async with conn.cursor() as cursor:
+        await cursor.execute("SELECT nutrition.get_daily_summary(%s);", (summary_date,))
+        result = await cursor.fetchone()
+        if result and result[0]:
+            return result[0]
+        return None
+
+async def get_nutrition_range(conn: psycopg.AsyncConnection, date_from: date, date_to: date, bucket: str) -> List[Dict[str, Any]]:
+    async with conn.cursor(row_factory=dict_row) as cursor:
+        await cursor.execute(RANGE_QUERY, (date_from, date_to, bucket))
+        return [to_bucket(row) for row in await cursor.fetchall()]
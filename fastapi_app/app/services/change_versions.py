@@ -0,0 +1,57 @@
+"""
+HTTP conditional requests driven by nutrition.change_versions.
+
+Deferred triggers bump the version of an entity (recipes, dishes, stats) in
+every transaction that changes its data, so an unchanged version means an
+unchanged response. GET endpoints read the version first, answer a matching
+If-None-Match with 304 before running their queries, and send ETag and
+Last-Modified with full responses. The version is read before
+the data: a write committed in between only makes the next request miss.
+"""
+from datetime import timezone
+from email.utils import format_datetime
+from typing import Any, Dict, Mapping, Optional
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+VERSION_QUERY = "SELECT SUM(version)::bigint AS version, MAX(changed_at) AS changed_at FROM nutrition.change_versions WHERE entity = %s"
+
+
+def validators(entity: str, row: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    ETag, Last-Modified and Cache-Control headers for a change_versions row.
+    The ETag also carries the time of the last change, so versions counted
+    again from zero after the database is recreated do not match old tags.
+    """
+    if not row or row["changed_at"] is None:
+        return {}
+    changed_at = row["changed_at"].astimezone(timezone.utc)
+    return {
+        "ETag": f'W/"{entity}-{row["version"]}-{int(changed_at.timestamp() * 1000000)}"',
+        "Last-Modified": format_datetime(changed_at.replace(microsecond=0), usegmt=True),
+        # Clients may keep the response but must revalidate it on every use
+        "Cache-Control": "no-cache",
+    }
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return etag.replace("W/", "", 1) in [tag.replace("W/", "", 1) for tag in tags]
+
+
+def is_not_modified(request_headers: Mapping[str, str], headers: Dict[str, str]) -> bool:
+    """
+    True when If-None-Match lists the current ETag. If-Modified-Since is not honoured:
+    Last-Modified has whole seconds and would hide a second change within the same second.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    return bool(headers) and if_none_match is not None and _etag_matches(if_none_match, headers["ETag"])
+
+
+def get_validators(conn: psycopg2.extensions.connection, entity: str) -> Dict[str, str]:
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(VERSION_QUERY, (entity,))
+        return validators(entity, cursor.fetchone())
@@ -1,29 +1,68 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from app.database.rows import DictRowCursor
 from typing import List, Dict, Any, Optional
 from datetime import date
 from app.schemas.schemas import ConsumedCreate, ConsumedUpdate
+from app.services.pagination import Position, history_query
 
-def get_consumed_items(conn: psycopg2.extensions.connection, consumed_date: Optional[date], limit: int) -> List[Dict[str, Any]]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        if consumed_date:
-            cursor.execute("SELECT * FROM nutrition.consumed WHERE consumed_at::date = %s ORDER BY consumed_at DESC LIMIT %s", (consumed_date, limit))
-        else:
-            cursor.execute("SELECT * FROM nutrition.consumed ORDER BY consumed_at DESC LIMIT %s", (limit,))
+def get_consumed_items(
+    conn: psycopg2.extensions.connection,
+    limit: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    meal_type: Optional[str] = None,
+    after: Optional[Position] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Returns a page of portions, newest first, starting after the `after` cursor position.
+    """
+    query, params = history_query("nutrition.consumed", "consumed_at", limit, date_from, date_to, after, {"meal_type": meal_type})
+    with conn.cursor(cursor_factory=DictRowCursor) as cursor:
+        cursor.execute(query, params)
         return cursor.fetchall()
 
 def create_consumed_item(conn: psycopg2.extensions.connection, consumed_item: ConsumedCreate) -> Dict[str, Any]:
+    return create_consumed_items(conn, [consumed_item])[0]
+
+def create_consumed_items(conn: psycopg2.extensions.connection, items: List[ConsumedCreate]) -> List[Dict[str, Any]]:
+    """
+    Inserts the portions in one statement; rows are returned in input order.
+    The affected dishes are locked in id order first, so concurrent batches never wait on each other in a cycle.
+    """
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
         cursor.execute(
             """
-            INSERT INTO nutrition.consumed 
-            (cooked_dish_id, meal_type, weight_grams)
-            VALUES (%s, %s, %s)
-            RETURNING *;
+            WITH locked_dishes AS (
+                SELECT nutrition.lock_cooked_dishes(%s::BIGINT[])
+            ),
+            data AS (
+                SELECT nextval(pg_get_serial_sequence('nutrition.consumed', 'id')) AS id, d.*
+                FROM unnest(%s::BIGINT[], %s::TEXT[], %s::NUMERIC[]) WITH ORDINALITY
+                    AS d(cooked_dish_id, meal_type, weight_grams, position)
+                -- Uncorrelated, so it runs once before the first row: all locks are taken
+                -- before the consumed triggers lock dishes row by row
+                WHERE (SELECT COUNT(*) FROM locked_dishes) >= 0
+            ),
+            new_items AS (
+                INSERT INTO nutrition.consumed (id, cooked_dish_id, meal_type, weight_grams)
+                OVERRIDING SYSTEM VALUE
+                SELECT id, cooked_dish_id, meal_type, weight_grams FROM data ORDER BY position
+                RETURNING *
+            )
+            SELECT ni.*
+            FROM new_items ni
+            JOIN data d ON d.id = ni.id
+            ORDER BY d.position
             """,
-            (consumed_item.cooked_dish_id, consumed_item.meal_type, consumed_item.weight_grams)
+            (
+                sorted({item.cooked_dish_id for item in items}),
+                [item.cooked_dish_id for item in items],
+                [item.meal_type for item in items],
+                [item.weight_grams for item in items],
+            )
         )
-        return cursor.fetchone()
+        return cursor.fetchall()
 
 def get_consumed_item_by_id(conn: psycopg2.extensions.connection, consumed_id: int) -> Dict[str, Any]:
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
@@ -50,3 +89,12 @@ def delete_consumed_item(conn: psycopg2.extensions.connection, consumed_id: int)
     with conn.cursor() as cursor:
         cursor.execute("DELETE FROM nutrition.consumed WHERE id = %s", (consumed_id,))
         return cursor.rowcount
+
+def ensure_consumed_partitions(conn: psycopg2.extensions.connection, months: int = 3) -> int:
+    """
+    Creates the monthly partitions of consumed for the current and the next months.
+    Returns how many were created; the caller commits.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT nutrition.ensure_consumed_partitions(p_months => %s)", (months,))
+        return cursor.fetchone()[0]
@@ -0,0 +1,89 @@
+"""
+Consumption diary export (GET /consumed/export).
+
+Portions joined with their dish and recipe are read oldest first from a named
+(server-side) cursor, EXPORT_CHUNK_SIZE rows at a time, and every chunk is
+formatted as CSV or NDJSON text for a StreamingResponse. Only one chunk is
+held in memory, however long the history is. The cursor lives in the request's
+transaction, which is rolled back when the stream ends.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+import psycopg2
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_CURSOR_NAME = "consumed_export"
+EXPORT_COLUMNS = (
+    "id", "consumed_at", "meal_type", "cooked_dish_id", "dish_cooked_at", "recipe_id", "recipe_name",
+    "weight_grams", "calories", "proteins", "fats", "carbs",
+)
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+EXPORT_QUERY = """
+    SELECT
+        c.id, c.consumed_at, c.meal_type, c.cooked_dish_id, cd.cooked_at, cd.recipe_id, r.name,
+        c.weight_grams, c.calories, c.proteins, c.fats, c.carbs
+    FROM nutrition.consumed c
+    JOIN nutrition.cooked_dishes cd ON cd.id = c.cooked_dish_id
+    JOIN nutrition.recipes r ON r.id = cd.recipe_id
+"""
+
+
+def export_query(date_from: Optional[date] = None, date_to: Optional[date] = None) -> Tuple[str, List[Any]]:
+    # Days are inclusive and counted in the app time zone, as in GET /consumed/
+    conditions, params = [], []
+    if date_from:
+        conditions.append("c.consumed_at >= nutrition.local_day_start(%s)")
+        params.append(date_from)
+    if date_to:
+        conditions.append("c.consumed_at < nutrition.local_day_start(%s)")
+        params.append(date_to + timedelta(days=1))
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    # Partitions are merged in index order, so the first rows go out before the last ones are read
+    return f"{EXPORT_QUERY}{where} ORDER BY c.consumed_at, c.id", params
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def format_chunk(rows: Sequence[Sequence[Any]], export_format: str, header: bool = False) -> str:
+    if export_format == "ndjson":
+        return "".join(json.dumps(dict(zip(EXPORT_COLUMNS, map(_plain, row))), ensure_ascii=False) + "\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def open_export(conn: psycopg2.extensions.connection, date_from: Optional[date] = None, date_to: Optional[date] = None) -> psycopg2.extensions.cursor:
+    """
+    Declares the server-side cursor, so query errors surface before the response starts.
+    """
+    cursor = conn.cursor(name=EXPORT_CURSOR_NAME)
+    cursor.execute(*export_query(date_from, date_to))
+    return cursor
+
+
+def iter_export(conn: psycopg2.extensions.connection, cursor: psycopg2.extensions.cursor, export_format: str) -> Iterator[str]:
+    try:
+        if export_format == "csv":
+            yield format_chunk([], export_format, header=True)
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            yield format_chunk(rows, export_format)
+    finally:
+        cursor.close()
+        conn.rollback()
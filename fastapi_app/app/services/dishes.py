@@ -1,45 +1,109 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from typing import List, Dict, Any
+from app.database.rows import DictRowCursor
+from typing import List, Dict, Any, Optional
+from datetime import date
 from app.schemas.schemas import CookedDishCreate
+from app.services.pagination import Position, history_query
+from app.services import reference_cache
+
+# The per-100g join of remaining_dishes is not needed for the picker columns
+REMAINING_BRIEFS_QUERY = """
+    SELECT id AS cooked_dish_id, recipe_name, remaining_weight
+    FROM nutrition.cooked_dishes_active
+    WHERE remaining_weight > 0
+    ORDER BY cooked_at DESC
+    LIMIT %s
+"""
 
 def get_remaining_dishes(conn: psycopg2.extensions.connection, limit: int) -> List[Dict[str, Any]]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+    with conn.cursor(cursor_factory=DictRowCursor) as cursor:
         cursor.execute("SELECT * FROM nutrition.remaining_dishes ORDER BY cooked_at DESC LIMIT %s", (limit,))
         return cursor.fetchall()
 
-def get_cooked_dishes(conn: psycopg2.extensions.connection, limit: int) -> List[Dict[str, Any]]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute("SELECT * FROM nutrition.cooked_dishes_active ORDER BY cooked_at DESC LIMIT %s", (limit,))
+def get_remaining_dish_briefs(conn: psycopg2.extensions.connection, limit: int) -> List[Dict[str, Any]]:
+    """
+    Same dishes as get_remaining_dishes, only id, recipe name and remaining weight (for pickers).
+    """
+    with conn.cursor(cursor_factory=DictRowCursor) as cursor:
+        cursor.execute(REMAINING_BRIEFS_QUERY, (limit,))
+        return cursor.fetchall()
+
+def get_cooked_dishes(
+    conn: psycopg2.extensions.connection,
+    limit: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    after: Optional[Position] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Returns a page of active dishes, newest first, starting after the `after` cursor position.
+    """
+    query, params = history_query("nutrition.cooked_dishes_active", "cooked_at", limit, date_from, date_to, after)
+    with conn.cursor(cursor_factory=DictRowCursor) as cursor:
+        cursor.execute(query, params)
         return cursor.fetchall()
 
 def create_cooked_dish(conn: psycopg2.extensions.connection, dish: CookedDishCreate) -> Dict[str, Any]:
+    return create_cooked_dishes(conn, [dish])[0]
+
+def create_cooked_dishes(conn: psycopg2.extensions.connection, dishes: List[CookedDishCreate]) -> List[Dict[str, Any]]:
+    """
+    Creates the dishes and copies their recipes' ingredients in one statement; rows are returned in input order.
+    """
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
         cursor.execute(
             """
-            INSERT INTO nutrition.cooked_dishes 
-            (recipe_id, initial_weight, final_weight, remaining_weight, total_calories, total_proteins, total_fats, total_carbs)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id;
-            """,
-            (dish.recipe_id, dish.initial_weight, dish.final_weight, dish.final_weight, 0, 0, 0, 0)
-        )
-        cooked_dish_id = cursor.fetchone()['id']
-        
-        cursor.execute(
-            """
-            INSERT INTO nutrition.cooked_dish_ingredients 
-            (cooked_dish_id, ingredient_id, weight_grams, calories, proteins, fats, carbs)
-            SELECT %s, ri.ingredient_id, ri.weight_grams, i.calories, i.proteins, i.fats, i.carbs
-            FROM nutrition.recipe_ingredients ri
-            JOIN nutrition.ingredients i ON ri.ingredient_id = i.id
-            WHERE ri.recipe_id = %s;
+            WITH data AS (
+                SELECT nextval(pg_get_serial_sequence('nutrition.cooked_dishes', 'id')) AS id, d.*
+                FROM unnest(%s::INT[], %s::NUMERIC[], %s::NUMERIC[]) WITH ORDINALITY
+                    AS d(recipe_id, initial_weight, final_weight, position)
+            ),
+            composition AS (
+                SELECT d.id AS cooked_dish_id, ri.ingredient_id, ri.weight_grams, i.calories, i.proteins, i.fats, i.carbs
+                FROM data d
+                JOIN nutrition.recipe_ingredients ri ON ri.recipe_id = d.recipe_id
+                JOIN nutrition.ingredients i ON ri.ingredient_id = i.id
+            ),
+            -- Totals are computed here, so the returned rows already have them;
+            -- trg_recalculate_dish_nutrition_insert arrives at the same values
+            new_dishes AS (
+                INSERT INTO nutrition.cooked_dishes
+                (id, recipe_id, initial_weight, final_weight, remaining_weight, total_calories, total_proteins, total_fats, total_carbs)
+                OVERRIDING SYSTEM VALUE
+                SELECT
+                    d.id, d.recipe_id, COALESCE(SUM(c.weight_grams), d.initial_weight), d.final_weight, d.final_weight,
+                    COALESCE(SUM(c.calories / 100 * c.weight_grams), 0),
+                    COALESCE(SUM(c.proteins / 100 * c.weight_grams), 0),
+                    COALESCE(SUM(c.fats / 100 * c.weight_grams), 0),
+                    COALESCE(SUM(c.carbs / 100 * c.weight_grams), 0)
+                FROM data d
+                LEFT JOIN composition c ON c.cooked_dish_id = d.id
+                GROUP BY d.id, d.recipe_id, d.initial_weight, d.final_weight
+                RETURNING *
+            ),
+            new_ingredients AS (
+                INSERT INTO nutrition.cooked_dish_ingredients
+                (cooked_dish_id, ingredient_id, weight_grams, calories, proteins, fats, carbs)
+                SELECT cooked_dish_id, ingredient_id, weight_grams, calories, proteins, fats, carbs
+                FROM composition
+            )
+            SELECT nd.*, r.name AS recipe_name, r.description AS recipe_description
+            FROM new_dishes nd
+            JOIN data d ON d.id = nd.id
+            JOIN nutrition.recipes r ON nd.recipe_id = r.id
+            ORDER BY d.position
             """,
-            (cooked_dish_id, dish.recipe_id)
+            (
+                [dish.recipe_id for dish in dishes],
+                [dish.initial_weight for dish in dishes],
+                [dish.final_weight for dish in dishes],
+            )
         )
-        
-        cursor.execute("SELECT * FROM nutrition.cooked_dishes_active WHERE id = %s", (cooked_dish_id,))
-        return cursor.fetchone()
+        # trg_update_recipe_stats changes times_cooked and avg_cooked_weight of the recipes
+        for recipe_id in {dish.recipe_id for dish in dishes}:
+            reference_cache.invalidate_on_commit(conn, "recipes", recipe_id)
+        return cursor.fetchall()
 
 def get_cooked_dish_by_id(conn: psycopg2.extensions.connection, dish_id: int) -> Dict[str, Any]:
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
@@ -49,3 +113,12 @@ def get_cooked_dish_by_id(conn: psycopg2.extensions.connection, dish_id: int) ->
 def delete_cooked_dish(conn: psycopg2.extensions.connection, dish_id: int):
     with conn.cursor() as cursor:
         cursor.execute("SELECT nutrition.soft_delete_cooked_dish(%s);", (dish_id,))
+
+def compact_dish_weight_ledger(conn: psycopg2.extensions.connection) -> int:
+    """
+    Folds the dish weight ledger into cooked_dishes.remaining_weight.
+    Returns how many dishes were updated; the caller commits.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT nutrition.compact_dish_weight_ledger()")
+        return cursor.fetchone()[0]
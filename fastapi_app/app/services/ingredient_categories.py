@@ -2,11 +2,14 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from typing import List, Dict, Any
 from app.schemas.schemas import IngredientCategoryCreate, IngredientCategoryUpdate
+from app.services import reference_cache
 
 def get_ingredient_categories(conn: psycopg2.extensions.connection, limit: int) -> List[Dict[str, Any]]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute("SELECT id, name, description FROM nutrition.ingredient_categories ORDER BY name LIMIT %s", (limit,))
-        return cursor.fetchall()
+    def load():
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("SELECT id, name, description FROM nutrition.ingredient_categories ORDER BY name LIMIT %s", (limit,))
+            return cursor.fetchall()
+    return reference_cache.read_through("ingredient_category_lists", limit, load)
 
 def create_ingredient_category(conn: psycopg2.extensions.connection, category: IngredientCategoryCreate) -> Dict[str, Any]:
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
@@ -14,12 +17,16 @@ def create_ingredient_category(conn: psycopg2.extensions.connection, category: I
             "INSERT INTO nutrition.ingredient_categories (name, description) VALUES (%s, %s) RETURNING id, name, description",
             (category.name, category.description)
         )
-        return cursor.fetchone()
+        new_category = cursor.fetchone()
+        reference_cache.invalidate_on_commit(conn, "ingredient_categories", new_category["id"])
+        return new_category
 
 def get_ingredient_category_by_id(conn: psycopg2.extensions.connection, category_id: int) -> Dict[str, Any]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute("SELECT id, name, description FROM nutrition.ingredient_categories WHERE id = %s", (category_id,))
-        return cursor.fetchone()
+    def load():
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("SELECT id, name, description FROM nutrition.ingredient_categories WHERE id = %s", (category_id,))
+            return cursor.fetchone()
+    return reference_cache.read_through("ingredient_categories", category_id, load)
 
 def update_ingredient_category(conn: psycopg2.extensions.connection, category_id: int, category: IngredientCategoryUpdate) -> Dict[str, Any]:
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
@@ -35,9 +42,11 @@ def update_ingredient_category(conn: psycopg2.extensions.connection, category_id
             f"UPDATE nutrition.ingredient_categories SET {set_query} WHERE id = %s RETURNING id, name, description",
             values
         )
+        reference_cache.invalidate_on_commit(conn, "ingredient_categories", category_id)
         return cursor.fetchone()
 
 def delete_ingredient_category(conn: psycopg2.extensions.connection, category_id: int) -> int:
     with conn.cursor() as cursor:
         cursor.execute("DELETE FROM nutrition.ingredient_categories WHERE id = %s", (category_id,))
+        reference_cache.invalidate_on_commit(conn, "ingredient_categories", category_id)
         return cursor.rowcount
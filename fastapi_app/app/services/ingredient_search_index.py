@@ -0,0 +1,569 @@
+"""
+Optional in-process search index for GET /ingredients/search.
+
+Enabled with INGREDIENT_SEARCH_BACKEND=memory. The index keeps every active
+ingredient (normalized name, search document, synonyms) in memory and answers
+searches the same way nutrition.search_ingredients does:
+
+1. candidates: substring of the search document, word_similarity >= 0.3
+   (pg_trgm `<%`) or a full-text match of the document;
+2. candidates are ranked by the SQL score: exact name (10), normalized
+   name (9), ts_rank * 5, similarity(name) * 3 and max synonym similarity * 2.
+
+The SQL function scores only the best GREATEST(limit * 10, 100) candidates
+by word_similarity; the index scores all of them, so both return the same
+rows as long as a query has no more candidates than that.
+
+Trigrams, similarity() and word_similarity() follow pg_trgm, and the
+full-text part uses the same Snowball Russian stemmer and stop words as the
+'russian' text search configuration. Queries shorter than three characters
+match substrings only at word starts (prefix index), and ASCII words are not
+stemmed or stop-word filtered.
+
+The routers refresh single ingredients after ingredient/synonym/category
+writes made by this process. Writes of other workers (or made directly in the
+database) arrive as NOTIFY nutrition_reference_changed on the listener that
+the lifespan runs (reference_cache.listen_for_changes): the ingredients and
+categories they name are re-indexed before the next search, and the whole
+index is reloaded after the listener (re)connects, since notifications may
+have been missed meanwhile. INGREDIENT_SEARCH_INDEX_MAX_AGE (seconds,
+default 0 = never) additionally reloads the whole index periodically.
+"""
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import psycopg2
+import snowballstemmer
+from psycopg2.extras import RealDictCursor
+
+INGREDIENTS_QUERY = """
+    SELECT i.id, i.name, i.name_normalized, i.search_document, i.category_id, ic.name AS category_name,
+           i.calories, i.proteins, i.fats, i.carbs,
+           ARRAY(SELECT s.synonym_normalized FROM nutrition.ingredient_synonyms s WHERE s.ingredient_id = i.id ORDER BY s.id) AS synonyms
+    FROM nutrition.ingredients_active i
+    JOIN nutrition.ingredient_categories ic ON i.category_id = ic.id
+"""
+
+# nutrition.search_ingredients: SET pg_trgm.word_similarity_threshold = 0.3
+WORD_SIMILARITY_THRESHOLD = 0.3
+
+# Stop words of the 'russian' text search configuration (tsearch_data/russian.stop)
+RUSSIAN_STOP_WORDS = frozenset("""
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне было вот от
+меня еще нет о из ему теперь когда даже ну вдруг ли если уже или ни быть был него до вас нибудь опять уж
+вам ведь там потом себя ничего ей может они тут где есть надо ней для мы тебя их чем была сам чтоб без
+будто чего раз тоже себе под будет ж тогда кто этот того потому этого какой совсем ним здесь этом один
+почти мой тем чтобы нее сейчас были куда зачем всех никогда можно при наконец два об другой хоть после
+над больше тот через эти нас про всего них какая много разве три эту моя впрочем хорошо свою этой перед
+иногда лучше чуть том нельзя такой им более всегда конечно всю между
+""".split())
+
+_WORD_RE = re.compile(r"[^\W_]+")
+_TOKEN_RE = re.compile(r"\d+(?:\.\d+)+|[^\W_]+")
+_WHITESPACE_RE = re.compile(r"[ \t\n\r\f\v]+")
+_CYRILLIC_RE = re.compile("[а-яё]")
+_stemmer_lock = threading.Lock()
+_russian_stemmer = snowballstemmer.stemmer("russian")
+
+
+def normalize_search_text(text: str) -> str:
+    """
+    Python version of nutrition.normalize_search_text().
+    """
+    return _WHITESPACE_RE.sub(" ", text.lower().replace("ё", "е")).strip(" ")
+
+
+def trigrams(text: str) -> List[str]:
+    """
+    pg_trgm trigrams of a string in word order (words padded with two spaces
+    in front and one behind), duplicates kept.
+    """
+    result = []
+    for word in _WORD_RE.findall(text.lower()):
+        result.extend(_word_trigrams(word))
+    return result
+
+
+@lru_cache(maxsize=65536)
+def _word_trigrams(word: str) -> tuple:
+    padded = "  " + word + " "
+    return tuple(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """
+    pg_trgm similarity() of two trigram sets.
+    """
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+def word_similarity(query_trigrams: Set[str], document_trigrams: Sequence[str], threshold: Optional[float] = None) -> float:
+    """
+    pg_trgm word_similarity(): the greatest similarity between the query
+    trigrams and a continuous extent of the document trigrams (port of
+    iterate_word_similarity() in non-strict mode). With a threshold it stops
+    as soon as the similarity reaches it, like the `<%` operator.
+    """
+    ulen1 = len(query_trigrams)
+    found_at = [i for i, trg in enumerate(document_trigrams) if trg in query_trigrams]
+    if not found_at:
+        return 0.0
+    if threshold is not None and len({document_trigrams[i] for i in found_at}) < threshold * ulen1:
+        # Not enough shared trigrams for any extent to reach the threshold
+        return 0.0
+
+    # Trigrams before the first and after the last shared one never change the result
+    lastpos: Dict[str, int] = {}
+    lower = -1
+    count = 0
+    ulen2 = 0
+    smlr_max = 0.0
+    for i in range(found_at[0], found_at[-1] + 1):
+        trg = document_trigrams[i]
+        found = trg in query_trigrams
+        if lower >= 0 or found:
+            if lastpos.get(trg, -1) < 0:
+                ulen2 += 1
+                if found:
+                    count += 1
+            lastpos[trg] = i
+        if not found:
+            continue
+
+        upper = i
+        if lower == -1:
+            lower = i
+            ulen2 = 1
+        smlr_cur = count / (ulen1 + ulen2 - count)
+
+        # Try to move the lower bound right for a greater similarity
+        tmp_count, tmp_ulen2, prev_lower = count, ulen2, lower
+        for tmp_lower in range(lower, upper + 1):
+            smlr_tmp = tmp_count / (ulen1 + tmp_ulen2 - tmp_count)
+            if smlr_tmp > smlr_cur:
+                smlr_cur, ulen2, lower, count = smlr_tmp, tmp_ulen2, tmp_lower, tmp_count
+            tmp_trg = document_trigrams[tmp_lower]
+            if lastpos.get(tmp_trg) == tmp_lower:
+                tmp_ulen2 -= 1
+                if tmp_trg in query_trigrams:
+                    tmp_count -= 1
+        smlr_max = max(smlr_max, smlr_cur)
+        if threshold is not None and smlr_max >= threshold:
+            break
+
+        for tmp_lower in range(prev_lower, lower):
+            tmp_trg = document_trigrams[tmp_lower]
+            if lastpos.get(tmp_trg) == tmp_lower:
+                lastpos[tmp_trg] = -1
+    return smlr_max
+
+
+def lexeme_positions(text: str) -> Dict[str, List[int]]:
+    """
+    Lexemes and their positions as produced by to_tsvector('russian', text):
+    Cyrillic words are stop-word filtered and stemmed, stop words still take
+    a position.
+    """
+    positions: Dict[str, List[int]] = defaultdict(list)
+    for position, token in enumerate(_TOKEN_RE.findall(text.lower()), start=1):
+        lexeme = _lexeme(token)
+        if lexeme:
+            positions[lexeme].append(position)
+    return positions
+
+
+def query_lexemes(text: str) -> List[str]:
+    """
+    Distinct lexemes of websearch_to_tsquery('russian', text), all AND-ed.
+    """
+    lexemes = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        lexeme = _lexeme(token)
+        if lexeme and lexeme not in lexemes:
+            lexemes.append(lexeme)
+    return lexemes
+
+
+@lru_cache(maxsize=65536)
+def _lexeme(token: str) -> Optional[str]:
+    if not _CYRILLIC_RE.search(token):
+        return token
+    if token in RUSSIAN_STOP_WORDS:
+        return None
+    with _stemmer_lock:
+        return _russian_stemmer.stemWord(token)
+
+
+def _word_distance(distance: int) -> float:
+    if distance > 100:
+        return 1e-30
+    return 1.0 / (1.005 + 0.05 * math.exp(distance / 1.5 - 2))
+
+
+def ts_rank(positions: Dict[str, List[int]], lexemes: Sequence[str]) -> float:
+    """
+    ts_rank() with default weights (every position has weight D = 0.1).
+    """
+    weight = 0.1
+    size = len(lexemes)
+    if not size:
+        return 0.0
+    if size < 2:
+        res = 0.0
+        for lexeme in lexemes:
+            found = positions.get(lexeme)
+            if not found:
+                continue
+            resj = sum(weight / ((j + 1) * (j + 1)) for j in range(len(found)))
+            res += (weight + resj - weight) / 1.64493406685
+        return res / size
+
+    res = -1.0
+    seen: List[List[int]] = []
+    for lexeme in lexemes:
+        found = positions.get(lexeme)
+        if not found:
+            continue
+        for previous in seen:
+            for a in found:
+                for b in previous:
+                    distance = abs(a - b)
+                    if distance:
+                        curw = math.sqrt(weight * weight * _word_distance(distance))
+                        res = curw if res < 0 else 1.0 - (1.0 - res) * (1.0 - curw)
+        seen.append(found)
+    return res if res >= 0 else 1e-20
+
+
+class _Entry:
+    __slots__ = (
+        "row", "name_lower", "name_normalized", "document", "category_id",
+        "name_trigrams", "synonym_trigrams", "document_trigrams", "document_trigram_set",
+        "document_lexemes", "document_words", "name_positions",
+    )
+
+    def __init__(self, row: Dict[str, Any]):
+        self.row = {
+            "id": row["id"],
+            "name": row["name"],
+            "category_id": row["category_id"],
+            "category_name": row["category_name"],
+            "calories": row["calories"],
+            "proteins": row["proteins"],
+            "fats": row["fats"],
+            "carbs": row["carbs"],
+        }
+        self.name_lower = row["name"].lower()
+        self.name_normalized = row["name_normalized"]
+        self.document = row["search_document"]
+        self.category_id = row["category_id"]
+        self.name_trigrams = set(trigrams(self.name_normalized))
+        self.synonym_trigrams = [set(trigrams(synonym)) for synonym in row["synonyms"] or []]
+        self.document_trigrams = trigrams(self.document)
+        self.document_trigram_set = set(self.document_trigrams)
+        self.document_lexemes = set(lexeme_positions(self.document))
+        self.document_words = set(_WORD_RE.findall(self.document))
+        self.name_positions = lexeme_positions(row["name"])
+
+
+class IngredientSearchIndex:
+    """
+    Trigram, lexeme and word-prefix index over active ingredients.
+    """
+
+    def __init__(self, max_age: float = 0.0, word_similarity_threshold: float = WORD_SIMILARITY_THRESHOLD, result_cache_size: int = 1024):
+        self.max_age = max_age
+        self.word_similarity_threshold = word_similarity_threshold
+        self.result_cache_size = result_cache_size
+        self.loaded_at: Optional[float] = None
+        self._lock = threading.RLock()
+        # Keystroke searches repeat the same prefixes; any index change clears this
+        self._results: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self._entries: Dict[int, _Entry] = {}
+        self._trigrams: Dict[str, Set[int]] = defaultdict(set)
+        self._lexemes: Dict[str, Set[int]] = defaultdict(set)
+        self._words: Dict[str, Set[int]] = defaultdict(set)
+        self._sorted_words: List[str] = []
+        # Changes notified by other workers, re-indexed before the next search
+        self._changed_ids: Set[int] = set()
+        self._changed_categories: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def is_stale(self) -> bool:
+        if self.loaded_at is None:
+            return True
+        return self.max_age > 0 and time.monotonic() - self.loaded_at > self.max_age
+
+    def mark_stale(self) -> None:
+        """
+        Makes the next search reload the whole index.
+        """
+        with self._lock:
+            self.loaded_at = None
+
+    def mark_changed(self, ingredient_ids: Iterable[int] = (), category_ids: Iterable[int] = ()) -> None:
+        with self._lock:
+            self._changed_ids.update(ingredient_ids)
+            self._changed_categories.update(category_ids)
+
+    def has_changes(self) -> bool:
+        return bool(self._changed_ids or self._changed_categories)
+
+    def take_changes(self) -> Tuple[Set[int], Set[int]]:
+        """
+        Returns and forgets the changed ingredient and category ids.
+        """
+        with self._lock:
+            changes = (self._changed_ids, self._changed_categories)
+            self._changed_ids, self._changed_categories = set(), set()
+            return changes
+
+    def load(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Replaces the whole index with the given ingredient rows.
+        """
+        fresh = IngredientSearchIndex(self.max_age, self.word_similarity_threshold)
+        for row in rows:
+            fresh._add(_Entry(row), keep_sorted=False)
+        fresh._sorted_words = sorted(fresh._words)
+        with self._lock:
+            self._entries = fresh._entries
+            self._trigrams = fresh._trigrams
+            self._lexemes = fresh._lexemes
+            self._words = fresh._words
+            self._sorted_words = fresh._sorted_words
+            self._results.clear()
+            self.loaded_at = time.monotonic()
+
+    def upsert(self, ingredient_ids: Iterable[int], rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Re-indexes the given ingredients from their current rows; ids without
+        a row (soft-deleted) are removed from the index.
+        """
+        entries = [_Entry(row) for row in rows]
+        with self._lock:
+            self._results.clear()
+            for ingredient_id in set(ingredient_ids) | {entry.row["id"] for entry in entries}:
+                self._remove(ingredient_id)
+            for entry in entries:
+                self._add(entry)
+
+    def remove(self, ingredient_id: int) -> None:
+        with self._lock:
+            self._results.clear()
+            self._remove(ingredient_id)
+
+    def ids_in_category(self, category_id: int) -> List[int]:
+        with self._lock:
+            return [ingredient_id for ingredient_id, entry in self._entries.items() if entry.category_id == category_id]
+
+    def search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Same result as nutrition.search_ingredients(query, limit) joined with
+        the ingredient and its category.
+        """
+        normalized = normalize_search_text(query)
+        query_trigrams = set(trigrams(normalized))
+        lexemes = query_lexemes(query)
+        query_lower = query.lower()
+
+        with self._lock:
+            cached = self._results.get((query, limit))
+            if cached is not None:
+                self._results.move_to_end((query, limit))
+                return [dict(row) for row in cached]
+
+            if normalized:
+                candidates = self._candidates(normalized, query_trigrams, lexemes)
+            else:
+                # LIKE '%%' matches every document and every score is 0: the SQL function returns the lowest ids
+                candidates = heapq.nsmallest(max(limit, 0), self._entries)
+            ranked = []
+            for ingredient_id in candidates:
+                entry = self._entries[ingredient_id]
+                score = (
+                    (10.0 if entry.name_lower == query_lower else 0.0)
+                    + (9.0 if entry.name_normalized == normalized else 0.0)
+                    + ts_rank(entry.name_positions, lexemes) * 5.0
+                    + similarity(entry.name_trigrams, query_trigrams) * 3.0
+                    + max((similarity(synonym, query_trigrams) for synonym in entry.synonym_trigrams), default=0.0) * 2.0
+                )
+                ranked.append((score, ingredient_id, entry))
+            ranked.sort(key=lambda item: (-item[0], item[1]))
+            results = [dict(entry.row, search_score=score) for score, _, entry in ranked[:max(limit, 0)]]
+
+            self._results[(query, limit)] = results
+            if len(self._results) > self.result_cache_size:
+                self._results.popitem(last=False)
+            return [dict(row) for row in results]
+
+    def _candidates(self, normalized: str, query_trigrams: Set[str], lexemes: List[str]) -> Set[int]:
+        matched: Set[int] = set()
+
+        # 1. search_document LIKE '%query%'
+        inner = [normalized[i:i + 3] for i in range(len(normalized) - 2)]
+        inner = [trg for trg in inner if _WORD_RE.fullmatch(trg)]
+        if inner:
+            postings = sorted((self._trigrams.get(trg, set()) for trg in set(inner)), key=len)
+            substring_ids = set(postings[0]).intersection(*postings[1:])
+        elif _WORD_RE.fullmatch(normalized):
+            substring_ids = self._prefix_ids(normalized)
+        else:
+            substring_ids = set(self._entries)
+        matched.update(i for i in substring_ids if normalized in self._entries[i].document)
+
+        # 2. search_vector @@ websearch_to_tsquery(query)
+        if lexemes:
+            postings = sorted((self._lexemes.get(lexeme, set()) for lexeme in lexemes), key=len)
+            matched.update(set(postings[0]).intersection(*postings[1:]))
+
+        # 3. query <% search_document: at least threshold * |query trigrams| must be shared
+        if query_trigrams:
+            needed = max(1, math.ceil(self.word_similarity_threshold * len(query_trigrams) - 1e-9))
+            shared = Counter()
+            for trg in query_trigrams:
+                shared.update(self._trigrams.get(trg, ()))
+            for ingredient_id, count in shared.items():
+                if count >= needed and ingredient_id not in matched and word_similarity(
+                    query_trigrams, self._entries[ingredient_id].document_trigrams, self.word_similarity_threshold
+                ) >= self.word_similarity_threshold:
+                    matched.add(ingredient_id)
+
+        return matched
+
+    def _prefix_ids(self, prefix: str) -> Set[int]:
+        ids: Set[int] = set()
+        position = bisect_left(self._sorted_words, prefix)
+        while position < len(self._sorted_words) and self._sorted_words[position].startswith(prefix):
+            ids.update(self._words[self._sorted_words[position]])
+            position += 1
+        return ids
+
+    def _add(self, entry: _Entry, keep_sorted: bool = True) -> None:
+        ingredient_id = entry.row["id"]
+        self._entries[ingredient_id] = entry
+        for trg in entry.document_trigram_set:
+            self._trigrams[trg].add(ingredient_id)
+        for lexeme in entry.document_lexemes:
+            self._lexemes[lexeme].add(ingredient_id)
+        for word in entry.document_words:
+            if keep_sorted and word not in self._words:
+                insort(self._sorted_words, word)
+            self._words[word].add(ingredient_id)
+
+    def _remove(self, ingredient_id: int) -> None:
+        entry = self._entries.pop(ingredient_id, None)
+        if entry is None:
+            return
+        for postings, keys in (
+            (self._trigrams, entry.document_trigram_set),
+            (self._lexemes, entry.document_lexemes),
+        ):
+            for key in keys:
+                postings[key].discard(ingredient_id)
+                if not postings[key]:
+                    del postings[key]
+        for word in entry.document_words:
+            self._words[word].discard(ingredient_id)
+            if not self._words[word]:
+                del self._words[word]
+                del self._sorted_words[bisect_left(self._sorted_words, word)]
+
+
+_index: Optional[IngredientSearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return os.getenv("INGREDIENT_SEARCH_BACKEND", "sql").lower() == "memory"
+
+
+def get_search_index() -> IngredientSearchIndex:
+    """
+    Returns the process-wide index (empty until first loaded).
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = IngredientSearchIndex(max_age=float(os.getenv("INGREDIENT_SEARCH_INDEX_MAX_AGE", "0")))
+    return _index
+
+
+def fetch_ingredients(conn: psycopg2.extensions.connection, ingredient_ids: Optional[List[int]] = None, category_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        if ingredient_ids is not None:
+            cursor.execute(INGREDIENTS_QUERY + " WHERE i.id = ANY(%s)", (list(ingredient_ids),))
+        elif category_id is not None:
+            cursor.execute(INGREDIENTS_QUERY + " WHERE i.category_id = %s", (category_id,))
+        else:
+            cursor.execute(INGREDIENTS_QUERY)
+        return cursor.fetchall()
+
+
+def ensure_loaded(conn: psycopg2.extensions.connection) -> IngredientSearchIndex:
+    """
+    Returns the index, (re)loading it from the database if it is empty, marked
+    stale or older than its max age, and re-indexing the notified changes.
+    """
+    index = get_search_index()
+    if index.is_stale() or index.has_changes():
+        with _index_lock:
+            if index.is_stale():
+                # Taken first: changes notified during the load are applied on the next search
+                index.take_changes()
+                index.load(fetch_ingredients(conn))
+            elif index.has_changes():
+                ingredient_ids, category_ids = index.take_changes()
+                if ingredient_ids:
+                    index.upsert(ingredient_ids, fetch_ingredients(conn, ingredient_ids=list(ingredient_ids)))
+                for category_id in category_ids:
+                    index.upsert(index.ids_in_category(category_id), fetch_ingredients(conn, category_id=category_id))
+    return index
+
+
+def refresh_ingredients(conn: psycopg2.extensions.connection, ingredient_ids: List[int]) -> None:
+    """
+    Re-indexes ingredients after a committed write. No-op while the index is disabled or not loaded yet.
+    """
+    index = get_search_index()
+    if is_enabled() and index.loaded_at is not None:
+        index.upsert(ingredient_ids, fetch_ingredients(conn, ingredient_ids=ingredient_ids))
+
+
+def refresh_category(conn: psycopg2.extensions.connection, category_id: int) -> None:
+    """
+    Re-indexes the ingredients of a category after it was renamed.
+    """
+    index = get_search_index()
+    if is_enabled() and index.loaded_at is not None:
+        index.upsert(index.ids_in_category(category_id), fetch_ingredients(conn, category_id=category_id))
+
+
+def apply_notification(table: str, row_id: Optional[int]) -> None:
+    """
+    Records a change notified on nutrition_reference_changed; a notification
+    without an id makes the whole index stale.
+    """
+    index = get_search_index()
+    if not is_enabled() or index.loaded_at is None:
+        return
+    if table in ("ingredients", "ingredient_synonyms", "ingredient_categories") and row_id is None:
+        index.mark_stale()
+    elif table in ("ingredients", "ingredient_synonyms"):
+        index.mark_changed(ingredient_ids=[row_id])
+    elif table == "ingredient_categories":
+        index.mark_changed(category_ids=[row_id])
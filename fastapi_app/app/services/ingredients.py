@@ -1,10 +1,14 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from app.database.rows import DictRowCursor
 from typing import List, Dict, Any
 from app.schemas.schemas import IngredientCreate, IngredientUpdate
+from app.services import ingredient_search_index, reference_cache
 
 def search_ingredients(conn: psycopg2.extensions.connection, query: str, limit: int) -> List[Dict[str, Any]]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+    if ingredient_search_index.is_enabled():
+        return ingredient_search_index.ensure_loaded(conn).search(query, limit)
+    with conn.cursor(cursor_factory=DictRowCursor) as cursor:
         cursor.execute(
             """
             SELECT i.id, i.name, i.category_id, ic.name as category_name, i.calories, i.proteins, i.fats, i.carbs, s.search_score 
@@ -16,6 +20,28 @@ def search_ingredients(conn: psycopg2.extensions.connection, query: str, limit:
         )
         return cursor.fetchall()
 
+def search_ingredients_batch(conn: psycopg2.extensions.connection, queries: List[str], limit: int) -> List[Dict[str, Any]]:
+    results = [{"query": query, "matches": []} for query in queries]
+    if ingredient_search_index.is_enabled():
+        index = ingredient_search_index.ensure_loaded(conn)
+        for result in results:
+            result["matches"] = index.search(result["query"], limit)
+        return results
+    with conn.cursor(cursor_factory=DictRowCursor) as cursor:
+        cursor.execute(
+            """
+            SELECT s.query_index, i.id, i.name, i.category_id, ic.name as category_name, i.calories, i.proteins, i.fats, i.carbs, s.search_score
+            FROM nutrition.search_ingredients_batch(%s, %s) s
+            JOIN nutrition.ingredients i ON s.id = i.id
+            JOIN nutrition.ingredient_categories ic ON i.category_id = ic.id
+            ORDER BY s.query_index, s.search_score DESC, s.id
+            """,
+            (queries, limit)
+        )
+        for row in cursor.fetchall():
+            results[row.pop("query_index") - 1]["matches"].append(row)
+    return results
+
 def create_ingredient(conn: psycopg2.extensions.connection, ingredient: IngredientCreate) -> Dict[str, Any]:
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
         cursor.execute(
@@ -27,6 +53,7 @@ def create_ingredient(conn: psycopg2.extensions.connection, ingredient: Ingredie
             (ingredient.name, ingredient.category_id, ingredient.calories, ingredient.proteins, ingredient.fats, ingredient.carbs)
         )
         new_ingredient_id = cursor.fetchone()['id']
+        reference_cache.invalidate_on_commit(conn, "ingredients", new_ingredient_id)
         
         cursor.execute(
             """
@@ -40,6 +67,9 @@ def create_ingredient(conn: psycopg2.extensions.connection, ingredient: Ingredie
         return cursor.fetchone()
 
 def get_ingredient_by_id(conn: psycopg2.extensions.connection, ingredient_id: int) -> Dict[str, Any]:
+    return reference_cache.read_through("ingredients", ingredient_id, lambda: _select_ingredient(conn, ingredient_id))
+
+def _select_ingredient(conn: psycopg2.extensions.connection, ingredient_id: int) -> Dict[str, Any]:
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
         cursor.execute(
             """
@@ -68,9 +98,12 @@ def update_ingredient(conn: psycopg2.extensions.connection, ingredient_id: int,
 
         query = f"UPDATE nutrition.ingredients SET {set_query}, updated_at=NOW() WHERE id = %s"
         cursor.execute(query, values)
-        
-        return get_ingredient_by_id(conn, ingredient_id)
+        reference_cache.invalidate_on_commit(conn, "ingredients", ingredient_id)
+
+        # Read back uncached: the row is not committed yet
+        return _select_ingredient(conn, ingredient_id)
 
 def delete_ingredient(conn: psycopg2.extensions.connection, ingredient_id: int):
     with conn.cursor() as cursor:
         cursor.execute("SELECT nutrition.soft_delete_ingredient(%s);", (ingredient_id,))
+        reference_cache.invalidate_on_commit(conn, "ingredients", ingredient_id)
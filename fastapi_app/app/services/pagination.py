@@ -0,0 +1,72 @@
+"""
+Opaque keyset cursors for history lists ordered by (timestamp DESC, id DESC).
+
+A cursor is the (timestamp, id) of the last row of a page, URL-safe base64
+encoded so that clients pass it back as is instead of building it themselves.
+"""
+import base64
+import binascii
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+Position = Tuple[datetime, int]
+
+
+def encode_cursor(position: Position) -> str:
+    timestamp, row_id = position
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Position:
+    """
+    Raises ValueError for a cursor this module did not produce.
+    """
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = text.split("|")
+        position = datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("invalid cursor")
+    if position[0].tzinfo is None:
+        raise ValueError("invalid cursor")
+    return position
+
+
+def next_cursor(rows: List[Dict[str, Any]], limit: int, timestamp_key: str) -> Optional[str]:
+    # A full page means there may be more
+    if limit > 0 and len(rows) == limit:
+        return encode_cursor((rows[-1][timestamp_key], rows[-1]["id"]))
+    return None
+
+
+def history_query(
+    relation: str,
+    timestamp_column: str,
+    limit: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    after: Optional[Position] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    Builds a page query over `relation`, newest first. `date_from` and `date_to` are inclusive days in the
+    app time zone; `after` is a decoded cursor; `filters` are column = value conditions, None values are skipped.
+    The ORDER BY matches the (timestamp_column, id) indexes, so every page is a short index range scan.
+    """
+    conditions, params = [], []
+    if date_from:
+        conditions.append(f"{timestamp_column} >= nutrition.local_day_start(%s)")
+        params.append(date_from)
+    if date_to:
+        conditions.append(f"{timestamp_column} < nutrition.local_day_start(%s)")
+        params.append(date_to + timedelta(days=1))
+    for column, value in (filters or {}).items():
+        if value is not None:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+    if after:
+        # The plain bound on the timestamp lets the planner skip newer partitions
+        conditions.append(f"{timestamp_column} <= %s AND ({timestamp_column}, id) < (%s, %s)")
+        params.extend([after[0], after[0], after[1]])
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"SELECT * FROM {relation}{where} ORDER BY {timestamp_column} DESC, id DESC LIMIT %s", params + [limit]
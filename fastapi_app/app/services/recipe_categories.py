@@ -2,11 +2,14 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from typing import List, Dict, Any
 from app.schemas.schemas import RecipeCategoryCreate, RecipeCategoryUpdate
+from app.services import reference_cache
 
 def get_recipe_categories(conn: psycopg2.extensions.connection, limit: int) -> List[Dict[str, Any]]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute("SELECT id, name, description FROM nutrition.recipe_categories ORDER BY name LIMIT %s", (limit,))
-        return cursor.fetchall()
+    def load():
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("SELECT id, name, description FROM nutrition.recipe_categories ORDER BY name LIMIT %s", (limit,))
+            return cursor.fetchall()
+    return reference_cache.read_through("recipe_category_lists", limit, load)
 
 def create_recipe_category(conn: psycopg2.extensions.connection, category: RecipeCategoryCreate) -> Dict[str, Any]:
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
@@ -14,12 +17,16 @@ def create_recipe_category(conn: psycopg2.extensions.connection, category: Recip
             "INSERT INTO nutrition.recipe_categories (name, description) VALUES (%s, %s) RETURNING id, name, description",
             (category.name, category.description)
         )
-        return cursor.fetchone()
+        new_category = cursor.fetchone()
+        reference_cache.invalidate_on_commit(conn, "recipe_categories", new_category["id"])
+        return new_category
 
 def get_recipe_category_by_id(conn: psycopg2.extensions.connection, category_id: int) -> Dict[str, Any]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute("SELECT id, name, description FROM nutrition.recipe_categories WHERE id = %s", (category_id,))
-        return cursor.fetchone()
+    def load():
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("SELECT id, name, description FROM nutrition.recipe_categories WHERE id = %s", (category_id,))
+            return cursor.fetchone()
+    return reference_cache.read_through("recipe_categories", category_id, load)
 
 def update_recipe_category(conn: psycopg2.extensions.connection, category_id: int, category: RecipeCategoryUpdate) -> Dict[str, Any]:
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
@@ -35,9 +42,11 @@ def update_recipe_category(conn: psycopg2.extensions.connection, category_id: in
             f"UPDATE nutrition.recipe_categories SET {set_query} WHERE id = %s RETURNING id, name, description",
             values
         )
+        reference_cache.invalidate_on_commit(conn, "recipe_categories", category_id)
         return cursor.fetchone()
 
 def delete_recipe_category(conn: psycopg2.extensions.connection, category_id: int) -> int:
     with conn.cursor() as cursor:
         cursor.execute("DELETE FROM nutrition.recipe_categories WHERE id = %s", (category_id,))
+        reference_cache.invalidate_on_commit(conn, "recipe_categories", category_id)
         return cursor.rowcount
@@ -0,0 +1,248 @@
+"""
+Bulk recipe import (POST /recipes/import).
+
+The request body is read as a stream of NDJSON lines (one RecipeCreate object
+per line) or CSV records with the header
+
+    name,category_id,description,instructions,ingredients
+
+where `ingredients` is "ingredient_id:weight_grams" pairs separated by ";".
+Records are validated one by one and loaded in batches: each batch is one
+multi-row INSERT into recipes and one into recipe_ingredients, and the router
+commits once per batch. Invalid records are reported with their line number
+and do not stop the import.
+"""
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from pydantic import ValidationError
+from app.schemas.schemas import RecipeCreate
+
+IMPORT_BATCH_SIZE = 500
+CSV_COLUMNS = ("name", "category_id", "description", "instructions", "ingredients")
+
+# (line, recipe) for a parsed record, (line, error message) for a rejected one
+ImportRecord = Tuple[int, Union[RecipeCreate, str]]
+
+REFERENCES_QUERY = """
+    SELECT
+        ARRAY(SELECT id FROM nutrition.recipe_categories WHERE id = ANY(%s::INT[])) AS category_ids,
+        ARRAY(SELECT id FROM nutrition.ingredients WHERE id = ANY(%s::INT[])) AS ingredient_ids
+"""
+
+# Recipe ids are drawn from the identity sequence up front so that ingredient
+# rows can reference them in the same statement
+INSERT_BATCH_QUERY = """
+    WITH data AS (
+        SELECT nextval(pg_get_serial_sequence('nutrition.recipes', 'id'))::INT AS id, d.*
+        FROM unnest(%s::INT[], %s::TEXT[], %s::SMALLINT[], %s::TEXT[], %s::TEXT[])
+            AS d(line, name, category_id, description, instructions)
+    ),
+    new_recipes AS (
+        INSERT INTO nutrition.recipes (id, name, category_id, description, instructions)
+        OVERRIDING SYSTEM VALUE
+        SELECT id, name, category_id, description, instructions FROM data
+        RETURNING id
+    ),
+    new_ingredients AS (
+        INSERT INTO nutrition.recipe_ingredients (recipe_id, ingredient_id, weight_grams)
+        SELECT d.id, x.ingredient_id, x.weight_grams
+        FROM unnest(%s::INT[], %s::INT[], %s::NUMERIC[]) AS x(line, ingredient_id, weight_grams)
+        JOIN data d ON d.line = x.line
+        RETURNING recipe_id
+    )
+    SELECT line, id FROM data ORDER BY line
+"""
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'record'}: {item['msg']}" for item in error.errors()
+    )
+
+
+def parse_ndjson_line(line: str) -> RecipeCreate:
+    return RecipeCreate.model_validate(json.loads(line))
+
+
+def parse_csv_record(values: List[str]) -> RecipeCreate:
+    if len(values) != len(CSV_COLUMNS):
+        raise ValueError(f"expected {len(CSV_COLUMNS)} columns, got {len(values)}")
+    record = dict(zip(CSV_COLUMNS, values))
+    ingredients = []
+    for pair in filter(None, (part.strip() for part in record["ingredients"].split(";"))):
+        ingredient_id, separator, weight_grams = pair.partition(":")
+        if not separator:
+            raise ValueError(f"ingredients: expected ingredient_id:weight_grams, got {pair!r}")
+        ingredients.append({"ingredient_id": ingredient_id.strip(), "weight_grams": weight_grams.strip()})
+    return RecipeCreate.model_validate({
+        "name": record["name"],
+        "category_id": record["category_id"],
+        "description": record["description"] or None,
+        "instructions": record["instructions"] or None,
+        "ingredients": ingredients,
+    })
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, line
+    if buffer:
+        yield line_no + 1, buffer
+
+
+async def read_records(chunks: AsyncIterator[bytes], csv_format: bool = False) -> AsyncIterator[ImportRecord]:
+    """
+    Parses the request body chunk by chunk; raises ValueError only for a bad CSV header.
+    """
+    header_checked = not csv_format
+    record_line, record_text = 0, ""
+    async for line_no, raw in _lines(chunks):
+        try:
+            text = raw.decode("utf-8").rstrip("\r")
+        except UnicodeDecodeError as e:
+            yield line_no, f"invalid UTF-8: {e}"
+            continue
+
+        if not csv_format:
+            if text.strip():
+                try:
+                    yield line_no, parse_ndjson_line(text)
+                except ValidationError as e:
+                    yield line_no, _validation_message(e)
+                except ValueError as e:
+                    yield line_no, f"invalid JSON: {e}"
+            continue
+
+        # A quoted CSV field may span lines: collect lines until the quotes are balanced
+        if not record_text:
+            record_line = line_no
+        record_text = f"{record_text}\n{text}" if record_text else text
+        if record_text.count('"') % 2:
+            continue
+        text, record_text = record_text, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if not header_checked:
+            if tuple(column.strip().lstrip("\ufeff") for column in values) != CSV_COLUMNS:
+                raise ValueError(f"CSV header must be: {','.join(CSV_COLUMNS)}")
+            header_checked = True
+            continue
+        try:
+            yield record_line, parse_csv_record(values)
+        except ValidationError as e:
+            yield record_line, _validation_message(e)
+        except ValueError as e:
+            yield record_line, str(e)
+
+    if record_text:
+        yield record_line, "unterminated quoted field"
+
+
+async def read_batches(records: AsyncIterator[ImportRecord], size: int = IMPORT_BATCH_SIZE) -> AsyncIterator[List[ImportRecord]]:
+    batch: List[ImportRecord] = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def reference_ids(recipes: List[Tuple[int, RecipeCreate]]) -> Tuple[List[int], List[int]]:
+    category_ids = sorted({recipe.category_id for _, recipe in recipes})
+    ingredient_ids = sorted({ingredient.ingredient_id for _, recipe in recipes for ingredient in recipe.ingredients})
+    return category_ids, ingredient_ids
+
+
+def check_recipe(recipe: RecipeCreate, category_ids: Set[int], ingredient_ids: Set[int]) -> Optional[str]:
+    """
+    Catches the constraint violations of a record before it is sent to the database.
+    """
+    if len(recipe.name) > 255:
+        return "name: longer than 255 characters"
+    if any("\x00" in (value or "") for value in (recipe.name, recipe.description, recipe.instructions)):
+        return "text fields must not contain NUL characters"
+    if recipe.category_id not in category_ids:
+        return f"category_id: recipe category {recipe.category_id} not found"
+    seen: Set[int] = set()
+    for ingredient in recipe.ingredients:
+        if ingredient.ingredient_id not in ingredient_ids:
+            return f"ingredients: ingredient {ingredient.ingredient_id} not found"
+        if ingredient.ingredient_id in seen:
+            return f"ingredients: ingredient {ingredient.ingredient_id} is listed twice"
+        if ingredient.weight_grams <= 0:
+            return f"ingredients: weight_grams of ingredient {ingredient.ingredient_id} must be positive"
+        seen.add(ingredient.ingredient_id)
+    return None
+
+
+def insert_params(recipes: List[Tuple[int, RecipeCreate]]) -> Tuple[List[Any], ...]:
+    ingredient_rows = [
+        (line, ingredient.ingredient_id, ingredient.weight_grams)
+        for line, recipe in recipes for ingredient in recipe.ingredients
+    ]
+    return (
+        [line for line, _ in recipes],
+        [recipe.name for _, recipe in recipes],
+        [recipe.category_id for _, recipe in recipes],
+        [recipe.description for _, recipe in recipes],
+        [recipe.instructions for _, recipe in recipes],
+        [row[0] for row in ingredient_rows],
+        [row[1] for row in ingredient_rows],
+        [row[2] for row in ingredient_rows],
+    )
+
+
+def split_batch(batch: List[ImportRecord], references: Dict[str, List[int]]) -> Tuple[List[Tuple[int, RecipeCreate]], List[Tuple[int, str]]]:
+    category_ids, ingredient_ids = set(references["category_ids"]), set(references["ingredient_ids"])
+    valid, errors = [], []
+    for line, record in batch:
+        error = record if isinstance(record, str) else check_recipe(record, category_ids, ingredient_ids)
+        if error:
+            errors.append((line, error))
+        else:
+            valid.append((line, record))
+    return valid, errors
+
+
+def import_batch(conn: psycopg2.extensions.connection, batch: List[ImportRecord]) -> Tuple[List[Tuple[int, int]], List[Tuple[int, str]]]:
+    """
+    Inserts the valid records of a batch. Returns (line, recipe id) pairs and (line, error) pairs.
+    The caller commits.
+    """
+    parsed = [(line, record) for line, record in batch if not isinstance(record, str)]
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(REFERENCES_QUERY, reference_ids(parsed))
+        valid, errors = split_batch(batch, cursor.fetchone())
+        if not valid:
+            return [], errors
+
+        cursor.execute("SAVEPOINT recipe_import_batch")
+        try:
+            cursor.execute(INSERT_BATCH_QUERY, insert_params(valid))
+            return [(row["line"], row["id"]) for row in cursor.fetchall()], errors
+        except psycopg2.Error:
+            cursor.execute("ROLLBACK TO SAVEPOINT recipe_import_batch")
+
+        # Something the checks above did not catch: insert record by record to find it
+        imported = []
+        for line, recipe in valid:
+            cursor.execute("SAVEPOINT recipe_import_row")
+            try:
+                cursor.execute(INSERT_BATCH_QUERY, insert_params([(line, recipe)]))
+                imported.append((line, cursor.fetchone()["id"]))
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT recipe_import_row")
+                errors.append((line, str(e).strip()))
+        return imported, sorted(errors)
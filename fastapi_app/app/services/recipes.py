@@ -1,92 +1,145 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from typing import List, Dict, Any, Optional
+from app.database.rows import DictRowCursor
+from typing import List, Dict, Any, Optional, Tuple
 from app.schemas.schemas import RecipeCreate
 from app.services.ingredients import get_ingredient_by_id
+from app.services import reference_cache
 
 def get_popular_recipes(conn: psycopg2.extensions.connection, limit: int) -> List[Dict[str, Any]]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+    with conn.cursor(cursor_factory=DictRowCursor) as cursor:
         cursor.execute("SELECT * FROM nutrition.popular_recipes LIMIT %s", (limit,))
         return cursor.fetchall()
 
-def get_recipes(conn: psycopg2.extensions.connection, search: Optional[str], limit: int) -> List[Dict[str, Any]]:
+def recipe_page_filter(search: Optional[str], after_id: Optional[int]) -> Tuple[str, List[Any]]:
+    """
+    WHERE clause over recipes_active r for a page after `after_id`, optionally filtered by name.
+    """
+    conditions = ["r.id > %s"]
+    params: List[Any] = [after_id or 0]
+    if search:
+        # LIKE wildcards in the search text are matched literally
+        conditions.append("r.name ILIKE %s")
+        params.append("%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    return " AND ".join(conditions), params
+
+def get_recipes(conn: psycopg2.extensions.connection, search: Optional[str], limit: int, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Returns a page of active recipes ordered by id, starting after `after_id` (keyset pagination).
+    """
+    where, params = recipe_page_filter(search, after_id)
+    params.append(limit)
+
+    with conn.cursor(cursor_factory=DictRowCursor) as cursor:
+        cursor.execute(
+            f"""
+            WITH page AS (
+                SELECT r.id, r.name, r.category_name, r.description, r.instructions, r.times_cooked, r.avg_cooked_weight
+                FROM nutrition.recipes_active r
+                WHERE {where}
+                ORDER BY r.id
+                LIMIT %s
+            ),
+            page_ingredients AS (
+                SELECT
+                    ri.recipe_id,
+                    json_agg(
+                        json_build_object(
+                            'ingredient_id', ri.ingredient_id,
+                            'ingredient_name', i.name,
+                            'weight_grams', ri.weight_grams
+                        )
+                        ORDER BY ri.ingredient_id
+                    ) AS ingredients
+                FROM nutrition.recipe_ingredients ri
+                JOIN nutrition.ingredients i ON ri.ingredient_id = i.id
+                WHERE ri.recipe_id IN (SELECT id FROM page)
+                GROUP BY ri.recipe_id
+            )
+            SELECT p.*, COALESCE(pi.ingredients, '[]'::json) AS ingredients
+            FROM page p
+            LEFT JOIN page_ingredients pi ON pi.recipe_id = p.id
+            ORDER BY p.id
+            """,
+            params
+        )
+        return cursor.fetchall()
+
+def get_recipe_briefs(conn: psycopg2.extensions.connection, search: Optional[str], limit: int, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Same page as get_recipes, only ids and names (for pickers).
+    """
+    where, params = recipe_page_filter(search, after_id)
+    with conn.cursor(cursor_factory=DictRowCursor) as cursor:
+        cursor.execute(f"SELECT r.id, r.name FROM nutrition.recipes_active r WHERE {where} ORDER BY r.id LIMIT %s", params + [limit])
+        return cursor.fetchall()
+
+def create_recipe(conn: psycopg2.extensions.connection, recipe: RecipeCreate) -> Dict[str, Any]:
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        base_query = """
-            SELECT 
-                r.id, 
-                r.name, 
-                rc.name as category_name, 
-                r.description, 
-                r.instructions, 
-                r.times_cooked, 
-                r.avg_cooked_weight,
+        cursor.execute(
+            """
+            WITH new_recipe AS (
+                INSERT INTO nutrition.recipes (name, category_id, description, instructions)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id, name, category_id, description, instructions, times_cooked, avg_cooked_weight
+            ),
+            new_ingredients AS (
+                INSERT INTO nutrition.recipe_ingredients (recipe_id, ingredient_id, weight_grams)
+                SELECT nr.id, x.ingredient_id, x.weight_grams
+                FROM new_recipe nr
+                CROSS JOIN unnest(%s::INT[], %s::NUMERIC[]) AS x(ingredient_id, weight_grams)
+                RETURNING ingredient_id, weight_grams
+            )
+            SELECT
+                nr.id, nr.name, rc.name as category_name, nr.description, nr.instructions, nr.times_cooked, nr.avg_cooked_weight,
                 COALESCE(
                     (
                         SELECT json_agg(
                             json_build_object(
-                                'ingredient_id', ri.ingredient_id, 
-                                'ingredient_name', i.name, 
-                                'weight_grams', ri.weight_grams
+                                'ingredient_id', ni.ingredient_id,
+                                'ingredient_name', i.name,
+                                'weight_grams', ni.weight_grams
                             )
+                            ORDER BY ni.ingredient_id
                         )
-                        FROM nutrition.recipe_ingredients ri
-                        JOIN nutrition.ingredients i ON ri.ingredient_id = i.id
-                        WHERE ri.recipe_id = r.id
-                    ), 
+                        FROM new_ingredients ni
+                        JOIN nutrition.ingredients i ON ni.ingredient_id = i.id
+                    ),
                     '[]'::json
                 ) as ingredients
-            FROM nutrition.recipes_active r 
-            JOIN nutrition.recipe_categories rc ON r.category_id = rc.id 
-        """
-        
-        if search:
-            query = base_query + " WHERE r.name ILIKE %s LIMIT %s"
-            cursor.execute(query, (f"%{search}%", limit))
-        else:
-            query = base_query + " LIMIT %s"
-            cursor.execute(query, (limit,))
-            
-        return cursor.fetchall()
-
-def create_recipe(conn: psycopg2.extensions.connection, recipe: RecipeCreate) -> Dict[str, Any]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute(
-            """
-            INSERT INTO nutrition.recipes (name, category_id, description, instructions)
-            VALUES (%s, %s, %s, %s)
-            RETURNING id;
+            FROM new_recipe nr
+            JOIN nutrition.recipe_categories rc ON nr.category_id = rc.id
             """,
-            (recipe.name, recipe.category_id, recipe.description, recipe.instructions)
-        )
-        new_recipe_id = cursor.fetchone()['id']
-
-        for ingredient in recipe.ingredients:
-            cursor.execute(
-                """
-                INSERT INTO nutrition.recipe_ingredients (recipe_id, ingredient_id, weight_grams)
-                VALUES (%s, %s, %s);
-                """,
-                (new_recipe_id, ingredient.ingredient_id, ingredient.weight_grams)
+            (
+                recipe.name, recipe.category_id, recipe.description, recipe.instructions,
+                [ingredient.ingredient_id for ingredient in recipe.ingredients],
+                [ingredient.weight_grams for ingredient in recipe.ingredients],
             )
-        
-        return get_recipe_by_id(conn, new_recipe_id)
+        )
+        return cursor.fetchone()
 
 def get_recipe_by_id(conn: psycopg2.extensions.connection, recipe_id: int) -> Dict[str, Any]:
+    return reference_cache.read_through("recipes", recipe_id, lambda: _select_recipe(conn, recipe_id))
+
+def _select_recipe(conn: psycopg2.extensions.connection, recipe_id: int) -> Dict[str, Any]:
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
         cursor.execute("SELECT r.id, r.name, rc.name as category_name, r.description, r.instructions, r.times_cooked, r.avg_cooked_weight FROM nutrition.recipes_active r JOIN nutrition.recipe_categories rc ON r.category_id = rc.id WHERE r.id = %s", (recipe_id,))
         recipe = cursor.fetchone()
 
         if recipe:
-            cursor.execute("SELECT ri.ingredient_id, i.name as ingredient_name, ri.weight_grams FROM nutrition.recipe_ingredients ri JOIN nutrition.ingredients i ON ri.ingredient_id = i.id WHERE ri.recipe_id = %s", (recipe["id"],))
+            cursor.execute("SELECT ri.ingredient_id, i.name as ingredient_name, ri.weight_grams FROM nutrition.recipe_ingredients ri JOIN nutrition.ingredients i ON ri.ingredient_id = i.id WHERE ri.recipe_id = %s ORDER BY ri.ingredient_id", (recipe["id"],))
             recipe["ingredients"] = cursor.fetchall()
         
         return recipe
 
 def get_recipe_nutrition(conn: psycopg2.extensions.connection, recipe_id: int) -> Dict[str, Any]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute("SELECT * FROM nutrition.recipe_nutrition WHERE recipe_id = %s", (recipe_id,))
-        return cursor.fetchone()
+    def load():
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("SELECT * FROM nutrition.recipe_nutrition WHERE recipe_id = %s", (recipe_id,))
+            return cursor.fetchone()
+    return reference_cache.read_through("recipe_nutrition", recipe_id, load)
 
 def delete_recipe(conn: psycopg2.extensions.connection, recipe_id: int):
     with conn.cursor() as cursor:
         cursor.execute("SELECT nutrition.soft_delete_recipe(%s);", (recipe_id,))
+        reference_cache.invalidate_on_commit(conn, "recipes", recipe_id)
@@ -0,0 +1,263 @@
+"""
+Optional per-worker read-through cache for reference data: ingredient and
+recipe categories, ingredients, recipes and recipe nutrition.
+
+Enabled with REFERENCE_CACHE_SIZE > 0 (entries per namespace, default 0 =
+off). Every namespace is a separate LRU cache of that size. Misses are loaded
+from the database; rows that do not exist are not cached.
+
+Invalidation:
+
+1. triggers on the reference tables (init/04, section l) send
+   NOTIFY nutrition_reference_changed, '<table>:<id>' for every changed row; the
+   notifications are delivered when the writing transaction commits, to every
+   API worker that LISTENs (see listen_for_changes, started by the lifespan);
+2. the write services invalidate the same entries in their own worker right
+   away, so a client reads its own writes without waiting for the notification,
+   and the routers invalidate them again once the transaction commits
+   (invalidate_on_commit, after_commit): a read in another request between the
+   write and the commit may have cached the old row meanwhile.
+
+A change drops the entry with the same id and clears the namespaces that embed
+the changed row (a renamed category shows up in every ingredient of it).
+Loads that raced with an invalidation are not stored. While the listener is
+not connected, notifications may be missed, so reads bypass the caches, and
+the caches are cleared when it connects and when it stops.
+
+The same listener keeps the in-process ingredient search index
+(ingredient_search_index) up to date with the writes of other workers.
+"""
+import asyncio
+import copy
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+import psycopg2
+
+from app.services import ingredient_search_index
+
+CHANNEL = "nutrition_reference_changed"
+
+# Changed table -> namespaces that cache its rows under the same id.
+# recipe_ingredients notifications carry the recipe id.
+SAME_ID_NAMESPACES: Dict[str, Tuple[str, ...]] = {
+    "ingredient_categories": ("ingredient_categories",),
+    "recipe_categories": ("recipe_categories",),
+    "ingredients": ("ingredients",),
+    "recipes": ("recipes", "recipe_nutrition"),
+    "recipe_ingredients": ("recipes", "recipe_nutrition"),
+}
+
+# Changed table -> namespaces cleared entirely (lists, rows embedding names or nutrition of the changed row)
+DEPENDENT_NAMESPACES: Dict[str, Tuple[str, ...]] = {
+    "ingredient_categories": ("ingredient_category_lists", "ingredients"),
+    "recipe_categories": ("recipe_category_lists", "recipes"),
+    "ingredients": ("recipes", "recipe_nutrition"),
+}
+
+
+class LRUCache:
+    """
+    Thread-safe LRU mapping with a generation counter that every invalidation bumps.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> bool:
+        """
+        Stores the value unless the cache was invalidated since `generation` was read.
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return True
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+_caches: Dict[str, LRUCache] = {}
+_caches_lock = threading.Lock()
+_listening = False
+
+# Connection -> changes of its open transaction, invalidated again by after_commit()
+_pending: "weakref.WeakKeyDictionary[Any, List[Tuple[str, Optional[int]]]]" = weakref.WeakKeyDictionary()
+_pending_lock = threading.Lock()
+
+
+def cache_size() -> int:
+    return int(os.getenv("REFERENCE_CACHE_SIZE", "0"))
+
+
+def is_enabled() -> bool:
+    return cache_size() > 0
+
+
+def is_listening() -> bool:
+    return _listening
+
+
+def get_cache(namespace: str) -> LRUCache:
+    cache = _caches.get(namespace)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.setdefault(namespace, LRUCache(cache_size()))
+    return cache
+
+
+def lookup(namespace: str, key: Hashable) -> Tuple[Optional[Any], int]:
+    """
+    Returns a copy of the cached value (None on a miss) and the generation to pass to store().
+    """
+    cache = get_cache(namespace)
+    generation = cache.generation
+    # Callers may modify the rows they get
+    return copy.deepcopy(cache.get(key)), generation
+
+
+def store(namespace: str, key: Hashable, value: Any, generation: int) -> None:
+    if value is not None:
+        get_cache(namespace).put(key, copy.deepcopy(value), generation)
+
+
+def read_through(namespace: str, key: Hashable, load: Callable[[], Any]) -> Any:
+    """
+    Returns the cached value, calling `load()` on a miss or while no listener is connected.
+    """
+    if not is_enabled() or not is_listening():
+        return load()
+    value, generation = lookup(namespace, key)
+    if value is None:
+        value = load()
+        store(namespace, key, value, generation)
+    return value
+
+
+def invalidate(table: str, row_id: Optional[int] = None) -> None:
+    """
+    Drops what a change of `table` row `row_id` makes stale; without an id, the whole namespaces.
+    """
+    if not is_enabled():
+        return
+    for namespace in SAME_ID_NAMESPACES.get(table, ()):
+        if row_id is None:
+            get_cache(namespace).clear()
+        else:
+            get_cache(namespace).invalidate(row_id)
+    for namespace in DEPENDENT_NAMESPACES.get(table, ()):
+        get_cache(namespace).clear()
+
+
+def invalidate_on_commit(conn: Any, table: str, row_id: Optional[int] = None) -> None:
+    """
+    Invalidates now and again when after_commit(conn) is called for the transaction of `conn`.
+    """
+    invalidate(table, row_id)
+    if is_enabled():
+        with _pending_lock:
+            _pending.setdefault(conn, []).append((table, row_id))
+
+
+def after_commit(conn: Any) -> None:
+    for table, row_id in discard_pending(conn):
+        invalidate(table, row_id)
+
+
+def discard_pending(conn: Any) -> List[Tuple[str, Optional[int]]]:
+    """
+    Forgets the changes registered for `conn` (its transaction was rolled back or the connection is returned).
+    """
+    with _pending_lock:
+        return _pending.pop(conn, [])
+
+
+def clear() -> None:
+    for cache in list(_caches.values()):
+        cache.clear()
+
+
+def apply_notification(payload: str) -> None:
+    table, _, row_id = payload.partition(":")
+    row_id = int(row_id) if row_id.isdigit() else None
+    invalidate(table, row_id)
+    ingredient_search_index.apply_notification(table, row_id)
+
+
+@contextmanager
+def listener_connected() -> Iterator[None]:
+    """
+    Marks the time a listener is LISTENing; the caches start and end empty,
+    and the search index reloads, as notifications may have been missed.
+    """
+    global _listening
+    clear()
+    ingredient_search_index.get_search_index().mark_stale()
+    _listening = True
+    try:
+        yield
+    finally:
+        _listening = False
+        clear()
+
+
+async def listen_for_changes(dsn: str) -> None:
+    """
+    LISTENs on its own psycopg2 connection and invalidates the caches on
+    every notification. Runs until cancelled or the connection is lost.
+    """
+    loop = asyncio.get_running_loop()
+    conn = await loop.run_in_executor(None, psycopg2.connect, dsn)
+    fileno = conn.fileno()
+    readable = asyncio.Event()
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        loop.add_reader(fileno, readable.set)
+        with listener_connected():
+            while True:
+                await readable.wait()
+                readable.clear()
+                # Raises OperationalError when the server closes the connection
+                conn.poll()
+                while conn.notifies:
+                    apply_notification(conn.notifies.pop(0).payload)
+    finally:
+        loop.remove_reader(fileno)
+        conn.close()
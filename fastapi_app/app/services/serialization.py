@@ -0,0 +1,46 @@
+"""
+Fast JSON path for list endpoints.
+
+For a declared response_model FastAPI validates the returned rows, dumps the
+models into a JSON-compatible Python copy and encodes that copy with
+json.dumps. json_response() validates the rows through the same schema and lets
+pydantic-core encode the models straight into JSON bytes. Validation stays (a
+row that does not fit the schema is still a 500) and the JSON has the
+same values; only the intermediate copy and the pure-Python encoder go.
+
+benchmarks/list_serialization.py compares both pipelines.
+"""
+from functools import lru_cache
+from typing import Any, Dict
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def _adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def encode(content: Any, response_type: Any) -> bytes:
+    adapter = _adapter(response_type)
+    return adapter.dump_json(adapter.validate_python(content))
+
+
+def jsonable(content: Any, response_type: Any) -> Any:
+    """
+    The value json.loads would give for encode(content, response_type), for
+    callers of the service layer that are not behind HTTP (the bot's embedded mode).
+    """
+    adapter = _adapter(response_type)
+    return adapter.dump_python(adapter.validate_python(content), mode="json")
+
+
+def json_response(content: Any, response_type: Any, response: Response) -> Response:
+    """
+    Encodes `content` as `response_type` (the endpoint's response_model). Headers
+    already set on the endpoint's `response` (cursors, ETags) are carried over:
+    FastAPI does not merge them into responses the endpoint returns itself.
+    """
+    headers: Dict[str, str] = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return Response(content=encode(content, response_type), media_type="application/json", headers=headers)
@@ -1,6 +1,28 @@
 import psycopg2
-from typing import Dict, Any
-from datetime import date
+from app.database.rows import DictRowCursor
+from typing import Dict, Any, List
+from datetime import date, timedelta
+
+# Upper bound on the number of buckets in one GET /stats/range response
+MAX_RANGE_BUCKETS = 1000
+
+RANGE_QUERY = "SELECT * FROM nutrition.get_nutrition_range(%s, %s, %s)"
+
+def bucket_count(date_from: date, date_to: date, bucket: str) -> int:
+    if bucket == "week":
+        first_monday = date_from - timedelta(days=date_from.weekday())
+        return (date_to - first_monday).days // 7 + 1
+    if bucket == "month":
+        return (date_to.year - date_from.year) * 12 + date_to.month - date_from.month + 1
+    return (date_to - date_from).days + 1
+
+def to_bucket(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "start": row["bucket_start"],
+        "end": row["bucket_end"],
+        "total_nutrition": {key: row[key] for key in ("calories", "proteins", "fats", "carbs")},
+        "meals": row["meals"],
+    }
 
 def get_daily_summary(conn: psycopg2.extensions.connection, summary_date: date) -> Dict[str, Any]:
     with conn.cursor() as cursor:
@@ -9,3 +31,8 @@ def get_daily_summary(conn: psycopg2.extensions.connection, summary_date: date)
         if result and result[0]:
             return result[0]
         return None
+
+def get_nutrition_range(conn: psycopg2.extensions.connection, date_from: date, date_to: date, bucket: str) -> List[Dict[str, Any]]:
+    with conn.cursor(cursor_factory=DictRowCursor) as cursor:
+        cursor.execute(RANGE_QUERY, (date_from, date_to, bucket))
+        return [to_bucket(row) for row in cursor.fetchall()]
@@ -1,10 +1,98 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Callable
+import anyio
 from fastapi import FastAPI
-from app.routers import ingredients, recipes, dishes, consumed, stats, ingredient_categories, recipe_categories, ingredient_synonyms
+from app.database.session import get_database_url, get_pool, close_pool
+from app.schemas.schemas import PoolStats
+
+# "sync": def endpoints on psycopg2 (threadpool); "async": async def endpoints on psycopg 3.
+DB_MODE = os.getenv("API_DB_MODE", "sync").lower()
+
+if DB_MODE == "async":
+    from app.database.async_session import open_async_pool, close_async_pool, get_async_pool, get_async_pool_stats
+    from app.services.aio import consumed as consumed_service, dishes as dish_service, ingredient_search_index, reference_cache
+    from app.routers.aio import ingredients, recipes, dishes, consumed, stats, ingredient_categories, recipe_categories, ingredient_synonyms
+else:
+    from app.routers import ingredients, recipes, dishes, consumed, stats, ingredient_categories, recipe_categories, ingredient_synonyms
+    from app.services import consumed as consumed_service, dishes as dish_service, ingredient_search_index, reference_cache
+
+# How often the API makes sure the monthly partitions of consumed exist (seconds)
+CONSUMED_PARTITION_CHECK_INTERVAL = float(os.getenv("CONSUMED_PARTITION_CHECK_INTERVAL", "86400"))
+# How often the dish weight ledger is folded into cooked_dishes (seconds); a no-op in the default row mode
+DISH_WEIGHT_LEDGER_COMPACT_INTERVAL = float(os.getenv("DISH_WEIGHT_LEDGER_COMPACT_INTERVAL", "300"))
+# Pause before the reference change listener reconnects (seconds); reads bypass the cache meanwhile
+REFERENCE_CACHE_RECONNECT_INTERVAL = float(os.getenv("REFERENCE_CACHE_RECONNECT_INTERVAL", "5"))
+
+logger = logging.getLogger(__name__)
+
+def _run_maintenance_sync(job: Callable) -> None:
+    with get_pool().connection() as conn:
+        try:
+            job(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+async def _run_maintenance(job: Callable) -> None:
+    if DB_MODE == "async":
+        async with get_async_pool().connection() as conn:
+            await job(conn)
+    else:
+        await anyio.to_thread.run_sync(_run_maintenance_sync, job)
+
+async def _repeat_maintenance(job: Callable, interval: float, failure_message: str) -> None:
+    while True:
+        try:
+            await _run_maintenance(job)
+        except Exception:
+            logger.exception(failure_message)
+        await asyncio.sleep(interval)
+
+async def _listen_for_reference_changes() -> None:
+    while True:
+        try:
+            await reference_cache.listen_for_changes(get_database_url())
+        except Exception:
+            logger.exception("Reference change listener lost its connection")
+        await asyncio.sleep(REFERENCE_CACHE_RECONNECT_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_MODE == "async":
+        await open_async_pool()
+    else:
+        get_pool()
+    maintenance = [
+        # Rows outside the created partitions land in consumed_default and are moved on the next run
+        asyncio.create_task(_repeat_maintenance(
+            consumed_service.ensure_consumed_partitions, CONSUMED_PARTITION_CHECK_INTERVAL,
+            "Could not create partitions of nutrition.consumed",
+        )),
+        asyncio.create_task(_repeat_maintenance(
+            dish_service.compact_dish_weight_ledger, DISH_WEIGHT_LEDGER_COMPACT_INTERVAL,
+            "Could not compact nutrition.dish_weight_ledger",
+        )),
+    ]
+    # Both follow the writes of other workers through it
+    if reference_cache.is_enabled() or ingredient_search_index.is_enabled():
+        maintenance.append(asyncio.create_task(_listen_for_reference_changes()))
+    yield
+    for task in maintenance:
+        task.cancel()
+    if DB_MODE == "async":
+        await close_async_pool()
+    else:
+        close_pool()
 
 app = FastAPI(
     title="Nutrition API",
     description="A FastAPI application to interact with the Nutrition database.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.include_router(ingredient_categories.router, prefix="/ingredient_categories", tags=["ingredient-categories"])
@@ -18,4 +106,13 @@ app.include_router(stats.router, prefix="/stats", tags=["statistics"])
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to the Nutrition API"}
+    return {"message": "Welcome to the Nutrition API", "db_mode": DB_MODE}
+
+@app.get("/db/pool", response_model=PoolStats, tags=["service"])
+def get_pool_stats():
+    """
+    Connection pool statistics, used to size DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE.
+    """
+    if DB_MODE == "async":
+        return get_async_pool_stats()
+    return get_pool().get_stats()
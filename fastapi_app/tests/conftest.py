@@ -0,0 +1,56 @@
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from fastapi_app import main
+
+DB_MODES = ["sync", "async"]
+
+def _load_app(db_mode):
+    """
+    The app with the routers of db_mode. API_DB_MODE is read when main.py is
+    imported, so the other mode gets its own copy of the module.
+    """
+    if db_mode == main.DB_MODE:
+        return main.app
+    previous = os.environ.get("API_DB_MODE")
+    os.environ["API_DB_MODE"] = db_mode
+    try:
+        spec = importlib.util.spec_from_file_location(f"main_{db_mode}", Path(main.__file__))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        if previous is None:
+            del os.environ["API_DB_MODE"]
+        else:
+            os.environ["API_DB_MODE"] = previous
+    return module.app
+
+@pytest.fixture(scope="session")
+def apps():
+    return {db_mode: _load_app(db_mode) for db_mode in DB_MODES}
+
+def pytest_generate_tests(metafunc):
+    # Endpoint tests (modules with a module-level client) run in both modes
+    if "db_mode" in metafunc.fixturenames and hasattr(metafunc.module, "client"):
+        metafunc.parametrize("db_mode", DB_MODES, indirect=True, scope="module")
+
+@pytest.fixture(scope="module", autouse=True)
+def db_mode(request, apps):
+    """
+    Replaces the module's client by one that runs the app of the mode with its
+    lifespan, as uvicorn does: the asyncio pool is opened in the event loop of
+    the requests.
+    """
+    if not hasattr(request, "param"):
+        yield main.DB_MODE
+        return
+    module_client = request.module.client
+    with TestClient(apps[request.param]) as client:
+        request.module.client = client
+        try:
+            yield request.param
+        finally:
+            request.module.client = module_client
@@ -1,9 +1,27 @@
 from fastapi.testclient import TestClient
+from concurrent.futures import ThreadPoolExecutor
 from fastapi_app.main import app
+from app.database.session import get_database_url
+from app.schemas.schemas import ConsumedCreate
+from app.services import consumed as consumed_service
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import json
+import os
+import psycopg2
 import pytest
+import time
 
 client = TestClient(app)
 
+def app_day(timestamp):
+    """
+    Day of an API timestamp in APP_TIMEZONE (by default the database time zone), in which the API counts days.
+    """
+    moment = datetime.fromisoformat(timestamp)
+    timezone = os.getenv("APP_TIMEZONE")
+    return (moment.astimezone(ZoneInfo(timezone)) if timezone else moment).date().isoformat()
+
 # Helper function to create a cooked dish
 def create_test_cooked_dish():
     recipe_id = 3 # 'Омлет'
@@ -97,4 +115,231 @@ def test_get_update_delete_consumed_item():
 
     # 6. Verify deletion
     get_after_delete_response = client.get(f"/consumed/{new_consumed_id}")
-    assert get_after_delete_response.status_code == 404
\ No newline at end of file
+    assert get_after_delete_response.status_code == 404
+
+def test_get_consumed_items_by_date():
+    cooked_dish_id = create_test_cooked_dish()
+    item = client.post(
+        "/consumed/",
+        json={"cooked_dish_id": cooked_dish_id, "meal_type": "snack", "weight_grams": 20.0}
+    ).json()
+
+    consumed_date = app_day(item["consumed_at"])
+    response = client.get(f"/consumed/?consumed_date={consumed_date}&limit=1000")
+    assert response.status_code == 200
+    assert item["id"] in [row["id"] for row in response.json()]
+    assert all(app_day(row["consumed_at"]) == consumed_date for row in response.json())
+
+    response = client.get("/consumed/?consumed_date=2000-01-01")
+    assert response.status_code == 200
+    assert response.json() == []
+
+def test_create_consumed_items_batch():
+    first_dish_id, second_dish_id = create_test_cooked_dish(), create_test_cooked_dish()
+    items = [
+        {"cooked_dish_id": second_dish_id, "meal_type": "dinner", "weight_grams": 100.0},
+        {"cooked_dish_id": first_dish_id, "meal_type": "dinner", "weight_grams": 50.0},
+        {"cooked_dish_id": second_dish_id, "meal_type": "dinner", "weight_grams": 25.0},
+    ]
+    response = client.post("/consumed/batch", json=items)
+    assert response.status_code == 201
+    data = response.json()
+    assert [(row["cooked_dish_id"], row["weight_grams"]) for row in data] == [(item["cooked_dish_id"], item["weight_grams"]) for item in items]
+    assert all(row["calories"] > 0 for row in data)
+
+    # Every portion is taken from its dish; single and batch inserts compute the same values
+    assert client.get(f"/dishes/{first_dish_id}").json()["remaining_weight"] == 450.0
+    assert client.get(f"/dishes/{second_dish_id}").json()["remaining_weight"] == 375.0
+    single = client.post("/consumed/", json=items[1]).json()
+    assert single["calories"] == data[1]["calories"]
+
+def test_create_consumed_items_batch_is_atomic():
+    cooked_dish_id = create_test_cooked_dish()
+    response = client.post("/consumed/batch", json=[
+        {"cooked_dish_id": cooked_dish_id, "meal_type": "lunch", "weight_grams": 100.0},
+        {"cooked_dish_id": 99999, "meal_type": "lunch", "weight_grams": 100.0},
+    ])
+    assert response.status_code == 400
+    assert client.get(f"/dishes/{cooked_dish_id}").json()["remaining_weight"] == 500.0
+
+def test_create_consumed_items_batch_locks_dishes_in_id_order():
+    # A batch listing dishes as [second, first] must wait for the first dish before it touches the second,
+    # otherwise two batches with opposite orders can deadlock
+    first_dish_id, second_dish_id = sorted([create_test_cooked_dish(), create_test_cooked_dish()])
+    holder, batch_conn, probe = (psycopg2.connect(get_database_url()) for _ in range(3))
+    try:
+        with holder.cursor() as cursor:
+            cursor.execute("SELECT id FROM nutrition.cooked_dishes WHERE id = %s FOR UPDATE", (first_dish_id,))
+        with batch_conn.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid()")
+            batch_pid = cursor.fetchone()[0]
+
+        items = [ConsumedCreate(cooked_dish_id=dish_id, meal_type="snack", weight_grams=1.0) for dish_id in (second_dish_id, first_dish_id)]
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batch = executor.submit(consumed_service.create_consumed_items, batch_conn, items)
+            try:
+                with probe.cursor() as cursor:
+                    for _ in range(100):
+                        cursor.execute("SELECT wait_event_type FROM pg_stat_activity WHERE pid = %s", (batch_pid,))
+                        if cursor.fetchone()[0] == "Lock":
+                            break
+                        time.sleep(0.05)
+                    # The batch is blocked on the first dish and holds no lock on the second one
+                    cursor.execute("SELECT id FROM nutrition.cooked_dishes WHERE id = %s FOR UPDATE NOWAIT", (second_dish_id,))
+                    probe.rollback()
+            finally:
+                holder.rollback()
+            assert [row["cooked_dish_id"] for row in batch.result(timeout=10)] == [second_dish_id, first_dish_id]
+            batch_conn.rollback()
+    finally:
+        for conn in (holder, batch_conn, probe):
+            conn.close()
+
+@pytest.fixture
+def ledger_mode():
+    conn = psycopg2.connect(get_database_url())
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT nutrition.set_dish_weight_mode('ledger')")
+        conn.commit()
+        yield conn
+    finally:
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT nutrition.set_dish_weight_mode('row')")
+        conn.commit()
+        conn.close()
+
+def test_consumed_items_in_ledger_mode(ledger_mode):
+    first_dish_id, second_dish_id = create_test_cooked_dish(), create_test_cooked_dish()
+    response = client.post("/consumed/batch", json=[
+        {"cooked_dish_id": second_dish_id, "meal_type": "lunch", "weight_grams": 100.0},
+        {"cooked_dish_id": first_dish_id, "meal_type": "lunch", "weight_grams": 450.0},
+    ])
+    assert response.status_code == 201
+    single = client.post("/consumed/", json={"cooked_dish_id": first_dish_id, "meal_type": "snack", "weight_grams": 100.0})
+    assert single.status_code == 201
+    assert single.json()["weight_grams"] == 50.0 # Trimmed to what is left, as in the row mode
+    client.delete(f"/consumed/{response.json()[0]['id']}")
+
+    # Portions only append to the ledger: the API sees the remaining weight, the dish rows are untouched until compaction
+    assert client.get(f"/dishes/{first_dish_id}").json()["remaining_weight"] == 0.0
+    assert client.get(f"/dishes/{second_dish_id}").json()["remaining_weight"] == 500.0
+    assert client.post("/consumed/", json={"cooked_dish_id": first_dish_id, "meal_type": "snack", "weight_grams": 1.0}).status_code == 400
+    with ledger_mode.cursor() as cursor:
+        cursor.execute("SELECT remaining_weight FROM nutrition.cooked_dishes WHERE id = %s", (first_dish_id,))
+        assert cursor.fetchone()[0] == 500
+        cursor.execute("SELECT nutrition.compact_dish_weight_ledger()")
+        cursor.execute("SELECT remaining_weight FROM nutrition.cooked_dishes WHERE id = %s", (first_dish_id,))
+        assert cursor.fetchone()[0] == 0
+    ledger_mode.commit()
+    assert client.get(f"/dishes/{first_dish_id}").json()["remaining_weight"] == 0.0
+
+def test_create_consumed_items_in_ledger_mode_does_not_lock_dish_rows(ledger_mode):
+    cooked_dish_id = create_test_cooked_dish()
+    batch_conn, probe = (psycopg2.connect(get_database_url()) for _ in range(2))
+    try:
+        items = [ConsumedCreate(cooked_dish_id=cooked_dish_id, meal_type="snack", weight_grams=1.0)]
+        consumed_service.create_consumed_items(batch_conn, items)
+        # The open transaction holds the advisory lock of the dish and only the foreign key lock of its row,
+        # so the row can still be updated
+        with probe.cursor() as cursor:
+            cursor.execute("SELECT id FROM nutrition.cooked_dishes WHERE id = %s FOR NO KEY UPDATE NOWAIT", (cooked_dish_id,))
+            cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (cooked_dish_id,))
+            assert cursor.fetchone()[0] is False
+        probe.rollback()
+        batch_conn.rollback()
+    finally:
+        for conn in (batch_conn, probe):
+            conn.close()
+
+def test_get_consumed_items_cursor_pagination():
+    cooked_dish_id = create_test_cooked_dish()
+    items = client.post("/consumed/batch", json=[
+        {"cooked_dish_id": cooked_dish_id, "meal_type": meal_type, "weight_grams": 10.0}
+        for meal_type in ["dinner", "snack", "dinner", "dinner", "snack", "dinner", "dinner"]
+    ]).json()
+    consumed_day = app_day(items[0]["consumed_at"])
+    dinner_ids = {item["id"] for item in items if item["meal_type"] == "dinner"}
+
+    rows, cursor = [], None
+    while True:
+        params = {"from": consumed_day, "to": consumed_day, "meal_type": "dinner", "limit": 2}
+        response = client.get("/consumed/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        rows += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    # Portions of one batch share consumed_at: pages follow (consumed_at, id) descending without gaps or repeats
+    assert [(row["consumed_at"], row["id"]) for row in rows] == sorted(((row["consumed_at"], row["id"]) for row in rows), reverse=True)
+    assert len({row["id"] for row in rows}) == len(rows)
+    assert dinner_ids <= {row["id"] for row in rows}
+    assert all(row["meal_type"] == "dinner" for row in rows)
+
+    assert client.get("/consumed/?meal_type=brunch").status_code == 422
+    assert client.get("/consumed/?cursor=bm90IGEgY3Vyc29y").status_code == 400
+
+@pytest.mark.parametrize("export_format", ["csv", "ndjson"])
+def test_export_consumed_items(export_format, monkeypatch):
+    from app.services import diary_export
+    from app.services.aio import diary_export as aio_diary_export
+    for module in (diary_export, aio_diary_export):
+        monkeypatch.setattr(module, "EXPORT_CHUNK_SIZE", 2)
+
+    cooked_dish_id = create_test_cooked_dish()
+    items = client.post("/consumed/batch", json=[
+        {"cooked_dish_id": cooked_dish_id, "meal_type": meal_type, "weight_grams": 10.0}
+        for meal_type in ["breakfast", "lunch", "dinner", "snack", "dinner"]
+    ]).json()
+    consumed_day = app_day(items[0]["consumed_at"])
+    expected_ids = [row["id"] for row in client.get(f"/consumed/?consumed_date={consumed_day}&limit=100000").json()][::-1]
+
+    with client.stream("GET", f"/consumed/export?format={export_format}&from={consumed_day}&to={consumed_day}") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv" if export_format == "csv" else "application/x-ndjson")
+        text = response.read().decode()
+
+    if export_format == "csv":
+        lines = text.splitlines()
+        assert lines[0].split(",") == list(diary_export.EXPORT_COLUMNS)
+        rows = [dict(zip(lines[0].split(","), line.split(","))) for line in lines[1:]]
+    else:
+        rows = [json.loads(line) for line in text.splitlines()]
+
+    # Oldest first, with dish and recipe attached
+    assert [int(row["id"]) for row in rows] == expected_ids
+    exported = {int(row["id"]): row for row in rows}
+    for item in items:
+        assert exported[item["id"]]["recipe_name"] == "Омлет"
+        assert float(exported[item["id"]]["calories"]) == item["calories"]
+
+def test_export_reads_server_side_cursor_in_chunks(monkeypatch):
+    from app.services import diary_export
+    monkeypatch.setattr(diary_export, "EXPORT_CHUNK_SIZE", 2)
+    cooked_dish_id = create_test_cooked_dish()
+    client.post("/consumed/batch", json=[{"cooked_dish_id": cooked_dish_id, "meal_type": "lunch", "weight_grams": 1.0}] * 5)
+
+    conn = psycopg2.connect(get_database_url())
+    try:
+        cursor = diary_export.open_export(conn)
+        assert cursor.name == diary_export.EXPORT_CURSOR_NAME
+        with conn.cursor() as probe:
+            probe.execute("SELECT COUNT(*) FROM nutrition.consumed")
+            total = probe.fetchone()[0]
+            probe.execute("SELECT COUNT(*) FROM pg_cursors WHERE name = %s", (diary_export.EXPORT_CURSOR_NAME,))
+            assert probe.fetchone()[0] == 1
+        chunks = list(diary_export.iter_export(conn, cursor, "ndjson"))
+        # Never more than EXPORT_CHUNK_SIZE rows per chunk; the cursor is gone once the stream ends
+        assert [chunk.count("\n") for chunk in chunks] == [2] * (total // 2) + ([total % 2] if total % 2 else [])
+        assert conn.status == psycopg2.extensions.STATUS_READY
+    finally:
+        conn.close()
+
+def test_export_consumed_items_validates_parameters():
+    assert client.get("/consumed/export?format=xml").status_code == 422
+    assert client.get("/consumed/export?from=2000-01-02&to=2000-01-01").status_code == 400
+    response = client.get("/consumed/export?format=ndjson&from=2000-01-01&to=2000-01-01")
+    assert response.status_code == 200
+    assert response.text == ""
@@ -0,0 +1,29 @@
+from fastapi.testclient import TestClient
+from fastapi_app.main import app
+import pytest
+
+client = TestClient(app)
+
+def test_get_pool_stats():
+    response = client.get("/db/pool")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["max_size"] >= data["min_size"]
+    assert data["size"] == data["idle"] + data["in_use"]
+    assert "checkout_timeouts" in data
+
+def test_connections_are_reused_between_requests():
+    client.get("/ingredient_categories/")
+    created_before = client.get("/db/pool").json()["connections_created"]
+
+    for _ in range(5):
+        response = client.get("/ingredient_categories/")
+        assert response.status_code == 200
+
+    stats = client.get("/db/pool").json()
+    assert stats["connections_created"] == created_before
+
+def test_async_pool_is_not_opened_outside_the_lifespan(apps):
+    # Without `with`, the lifespan does not run; requests must not open a pool on their own loop
+    response = TestClient(apps["async"]).get("/ingredient_categories/")
+    assert response.status_code == 503
@@ -1,9 +1,20 @@
 from fastapi.testclient import TestClient
 from fastapi_app.main import app
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import os
 import pytest
 
 client = TestClient(app)
 
+def app_day(timestamp):
+    """
+    Day of an API timestamp in APP_TIMEZONE (by default the database time zone), in which the API counts days.
+    """
+    moment = datetime.fromisoformat(timestamp)
+    timezone = os.getenv("APP_TIMEZONE")
+    return (moment.astimezone(ZoneInfo(timezone)) if timezone else moment).date().isoformat()
+
 def test_create_cooked_dish_success():
     # Assuming recipe_id for 'Омлет' is known (from seed data)
     # In a real scenario, you might fetch this dynamically or use a fixture
@@ -78,3 +89,90 @@ def test_get_remaining_dishes():
     assert "cooked_dish_id" in data[0]
     assert "remaining_weight" in data[0]
     assert data[0]["remaining_weight"] > 0
+
+def test_get_remaining_dish_briefs():
+    client.post("/dishes/", json={"recipe_id": 2, "initial_weight": 300, "final_weight": 280})
+
+    dishes = client.get("/dishes/remaining").json()
+    response = client.get("/dishes/remaining/brief")
+    assert response.status_code == 200
+    assert response.json() == [
+        {key: dish[key] for key in ("cooked_dish_id", "recipe_name", "remaining_weight")} for dish in dishes
+    ]
+
+def test_create_cooked_dishes_batch():
+    batch = [
+        {"recipe_id": 3, "initial_weight": 175, "final_weight": 160},
+        {"recipe_id": 1, "initial_weight": 255, "final_weight": 240},
+    ]
+    response = client.post("/dishes/batch", json=batch)
+    assert response.status_code == 201
+    data = response.json()
+    assert [dish["recipe_id"] for dish in data] == [3, 1]
+
+    # Returned totals are the ones stored after the nutrition trigger ran
+    for dish in data:
+        stored = client.get(f"/dishes/{dish['id']}").json()
+        assert stored["total_calories"] == dish["total_calories"] > 0
+        assert stored["initial_weight"] == dish["initial_weight"]
+        client.delete(f"/dishes/{dish['id']}")
+
+def test_create_cooked_dishes_batch_is_atomic():
+    dishes_before = len(client.get("/dishes/?limit=1000").json())
+    batch = [
+        {"recipe_id": 3, "initial_weight": 175, "final_weight": 160},
+        {"recipe_id": 99999, "initial_weight": 100, "final_weight": 90},
+    ]
+    response = client.post("/dishes/batch", json=batch)
+    assert response.status_code == 400
+    assert len(client.get("/dishes/?limit=1000").json()) == dishes_before
+
+def get_pages(url, limit):
+    rows, cursor = [], None
+    while True:
+        response = client.get(url, params={"limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        rows += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return rows
+
+def test_get_cooked_dishes_cursor_pagination():
+    # Dishes created in one batch share cooked_at, so pages must break ties by id
+    batch = client.post("/dishes/batch", json=[{"recipe_id": 2, "initial_weight": 300, "final_weight": 280}] * 5).json()
+    cooked_day = app_day(batch[0]["cooked_at"])
+    url = f"/dishes/?from={cooked_day}&to={cooked_day}"
+
+    paged = get_pages(url, limit=2)
+    single_page = client.get(url, params={"limit": 1000}).json()
+    assert [dish["id"] for dish in paged] == [dish["id"] for dish in single_page]
+    assert len({dish["id"] for dish in paged}) == len(paged)
+    assert {dish["id"] for dish in batch} <= {dish["id"] for dish in paged}
+    assert all(app_day(dish["cooked_at"]) == cooked_day for dish in paged)
+
+    assert client.get("/dishes/?from=2000-01-01&to=2000-01-01").json() == []
+    assert client.get("/dishes/?from=2000-01-02&to=2000-01-01").status_code == 400
+    assert client.get("/dishes/?cursor=not-a-cursor").status_code == 400
+    for dish in batch:
+        client.delete(f"/dishes/{dish['id']}")
+
+def test_get_remaining_dishes_conditional_requests():
+    response = client.get("/dishes/remaining")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "no-cache" and "Last-Modified" in response.headers
+
+    not_modified = client.get("/dishes/remaining", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag and not_modified.content == b""
+
+    # A committed write changes the version once, however many rows it touched
+    dish = client.post("/dishes/", json={"recipe_id": 1, "initial_weight": 300.0, "final_weight": 300.0}).json()
+    changed = client.get("/dishes/remaining", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+    # A failed write does not
+    etag = changed.headers["ETag"]
+    assert client.post("/dishes/", json={"recipe_id": 999999, "initial_weight": 300.0, "final_weight": 300.0}).status_code == 400
+    assert client.get("/dishes/remaining", headers={"If-None-Match": etag}).status_code == 304
+    client.delete(f"/dishes/{dish['id']}")
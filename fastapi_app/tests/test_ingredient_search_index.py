@@ -0,0 +1,102 @@
+from fastapi.testclient import TestClient
+from fastapi_app.main import app
+from app.database.session import get_database_url
+from app.services import ingredient_search_index, reference_cache
+import asyncio
+import psycopg2
+import pytest
+import threading
+import time
+
+client = TestClient(app)
+
+QUERIES = ["Огурец", "огурцы", "помидор", "кур", "гречкаа", "филе говядины", "молоко 3.2", "сладкий перец", ""]
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    monkeypatch.setenv("INGREDIENT_SEARCH_BACKEND", "memory")
+    monkeypatch.setattr(ingredient_search_index, "_index", None)
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+def search(query, limit=10):
+    response = client.get(f"/ingredients/search?query={query}&limit={limit}")
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_memory_backend_matches_sql(query, monkeypatch):
+    sql_results = search(query)
+
+    monkeypatch.setenv("INGREDIENT_SEARCH_BACKEND", "memory")
+    monkeypatch.setattr(ingredient_search_index, "_index", None)
+    memory_results = search(query)
+
+    assert [row["id"] for row in memory_results] == [row["id"] for row in sql_results]
+    for memory_row, sql_row in zip(memory_results, sql_results):
+        assert memory_row["search_score"] == pytest.approx(sql_row["search_score"], abs=1e-4)
+        assert memory_row["category_name"] == sql_row["category_name"]
+
+def test_memory_backend_follows_writes(memory_backend):
+    unique_name = f"Кумкват {time.time()}"
+    assert search("кумкват") == []
+
+    # 1. New ingredient
+    create_response = client.post("/ingredients/", json={
+        "name": unique_name, "category_id": 1, "calories": 71, "proteins": 1.9, "fats": 0.9, "carbs": 9.4
+    })
+    assert create_response.status_code == 201
+    ingredient_id = create_response.json()["id"]
+    assert [row["id"] for row in search("кумкват")] == [ingredient_id]
+
+    # 2. New synonym
+    synonym_response = client.post(f"/ingredients/{ingredient_id}/synonyms", json={"synonym": "Фортунелла"})
+    assert synonym_response.status_code == 201
+    assert [row["id"] for row in search("фортунелла")] == [ingredient_id]
+
+    # 3. Deleted synonym
+    client.delete(f"/ingredients/{ingredient_id}/synonyms/{synonym_response.json()['id']}")
+    assert search("фортунелла") == []
+
+    # 4. Soft-deleted ingredient
+    client.delete(f"/ingredients/{ingredient_id}")
+    assert search("кумкват") == []
+
+def test_memory_backend_follows_notifications_of_other_workers(memory_backend):
+    ingredient = client.post("/ingredients/", json={
+        "name": f"Помело {time.time()}", "category_id": 1, "calories": 38, "proteins": 0.8, "fats": 0, "carbs": 9.6
+    }).json()
+    assert search("шеддок") == []
+
+    # The listener runs on its own event loop, as in the lifespan of a worker
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    listener = asyncio.run_coroutine_threadsafe(reference_cache.listen_for_changes(get_database_url()), loop)
+    conn = psycopg2.connect(get_database_url())
+    try:
+        wait_for(reference_cache.is_listening)
+        # The index reloads after the listener connects
+        assert search("помело")[0]["id"] == ingredient["id"]
+
+        # Another worker (here: a plain connection) adds a synonym
+        with conn.cursor() as cursor:
+            cursor.execute("INSERT INTO nutrition.ingredient_synonyms (ingredient_id, synonym) VALUES (%s, 'Шеддок')", (ingredient["id"],))
+        conn.commit()
+        wait_for(ingredient_search_index.get_search_index().has_changes)
+        assert search("шеддок")[0]["id"] == ingredient["id"]
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM nutrition.ingredient_synonyms WHERE ingredient_id = %s", (ingredient["id"],))
+        conn.commit()
+        conn.close()
+        listener.cancel()
+        wait_for(lambda: not reference_cache.is_listening())
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        client.delete(f"/ingredients/{ingredient['id']}")
@@ -30,6 +30,25 @@ def test_search_ingredients_with_limit():
     assert len(data) == 1
     assert "Масло" in data[0]["name"]
 
+def test_search_ingredients_batch():
+    queries = ["огурец", "nonexistentingredient123", "масло", "кур"]
+    response = client.post("/ingredients/search/batch", json={"queries": queries, "limit": 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert [result["query"] for result in data] == queries
+    assert data[0]["matches"][0]["name"] == "Огурец"
+    assert data[1]["matches"] == []
+    assert len(data[2]["matches"]) == 2
+
+    # Matches are the same as for separate searches
+    for result in data:
+        single = client.get(f"/ingredients/search?query={result['query']}&limit=2").json()
+        assert [row["id"] for row in result["matches"]] == [row["id"] for row in single]
+
+def test_search_ingredients_batch_empty():
+    response = client.post("/ingredients/search/batch", json={"queries": []})
+    assert response.status_code == 422
+
 def test_create_get_update_delete_ingredient():
     import time
     unique_name = f"Тестовый Ингредиент {time.time()}"
@@ -1,5 +1,10 @@
 from fastapi.testclient import TestClient
 from fastapi_app.main import app
+from app.routers import recipes as recipes_router
+from app.routers.aio import recipes as aio_recipes_router
+from contextlib import asynccontextmanager
+import httpx
+import json
 import pytest
 
 client = TestClient(app)
@@ -21,6 +26,49 @@ def test_get_recipes_with_limit():
     assert isinstance(data, list)
     assert len(data) == 1
 
+def test_get_recipes_keyset_pagination():
+    all_ids = [recipe["id"] for recipe in client.get("/recipes/").json()]
+    assert all_ids == sorted(all_ids)
+
+    # Walk the list two recipes at a time following X-Next-Cursor
+    paged_ids = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/recipes/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        paged_ids += [recipe["id"] for recipe in page]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["after_id"] = response.headers["X-Next-Cursor"]
+    assert paged_ids == all_ids
+
+def test_get_recipes_search():
+    response = client.get("/recipes/", params={"search": "омлет"})
+    assert response.status_code == 200
+    data = response.json()
+    assert [recipe["name"] for recipe in data] == ["Омлет"]
+    assert len(data[0]["ingredients"]) > 0
+
+    # LIKE wildcards are not special
+    response = client.get("/recipes/", params={"search": "%"})
+    assert response.status_code == 200
+    assert response.json() == []
+
+def test_get_recipe_briefs():
+    recipes = client.get("/recipes/").json()
+    response = client.get("/recipes/brief")
+    assert response.status_code == 200
+    assert response.json() == [{"id": recipe["id"], "name": recipe["name"]} for recipe in recipes]
+
+    response = client.get("/recipes/brief", params={"search": "омлет", "limit": 5})
+    assert [recipe["name"] for recipe in response.json()] == ["Омлет"]
+
+    response = client.get("/recipes/brief", params={"limit": 1})
+    assert len(response.json()) == 1
+    assert response.headers["X-Next-Cursor"] == str(recipes[0]["id"])
+    assert client.get("/recipes/brief", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
 def test_create_get_delete_recipe():
     # 1. Create a new recipe
     new_recipe_data = {
@@ -78,3 +126,116 @@ def test_get_recipe_nutrition():
     assert "total_proteins" in data
     assert "total_fats" in data
     assert "total_carbs" in data
+    assert data["calories_per_100g"] == pytest.approx(data["total_calories"] / data["total_weight"] * 100, abs=0.01)
+
+def test_recipe_nutrition_follows_ingredient_changes():
+    new_recipe_data = {
+        "name": "Тестовый рецепт КБЖУ",
+        "category_id": 4,
+        "ingredients": [{"ingredient_id": 22, "weight_grams": 200}, {"ingredient_id": 23, "weight_grams": 100}]
+    }
+    recipe_id = client.post("/recipes/", json=new_recipe_data).json()["id"]
+    cucumber = client.get("/ingredients/22").json()
+
+    nutrition = client.get(f"/recipes/{recipe_id}/nutrition").json()
+    assert nutrition["total_weight"] == 300
+
+    # Changing the ingredient's calories updates the cached totals of recipes that use it
+    response = client.put("/ingredients/22", json={"calories": cucumber["calories"] + 50})
+    assert response.status_code == 200
+    try:
+        updated = client.get(f"/recipes/{recipe_id}/nutrition").json()
+        assert updated["total_calories"] == pytest.approx(nutrition["total_calories"] + 100, abs=0.01)
+    finally:
+        client.put("/ingredients/22", json={"calories": cucumber["calories"]})
+
+    # Deleted recipes have no nutrition
+    client.delete(f"/recipes/{recipe_id}")
+    assert client.get(f"/recipes/{recipe_id}/nutrition").status_code == 404
+
+def test_import_recipes_ndjson():
+    lines = [
+        '{"name": "Импорт: салат 1", "category_id": 4, "ingredients": [{"ingredient_id": 22, "weight_grams": 150}]}',
+        '{"name": "Импорт: салат 2", "category_id": 4, "ingredients": [{"ingredient_id": 22, "weight_grams": 100}, {"ingredient_id": 23, "weight_grams": 100}]}',
+        '',
+        '{"name": "Импорт: без категории", "category_id": 9999, "ingredients": []}',
+        '{"name": "Импорт: повтор", "category_id": 4, "ingredients": [{"ingredient_id": 22, "weight_grams": 1}, {"ingredient_id": 22, "weight_grams": 2}]}',
+        'not json',
+        '{"name": "Импорт: салат 3", "category_id": 4, "ingredients": [{"ingredient_id": 23, "weight_grams": 80}]}',
+    ]
+    response = client.post(
+        "/recipes/import?batch_size=2",
+        content="\n".join(lines).encode("utf-8"),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 3
+    assert result["failed"] == 3
+    assert result["batches"] == 3
+    assert [error["line"] for error in result["errors"]] == [4, 5, 6]
+
+    recipe = client.get(f"/recipes/{result['recipe_ids'][1]}").json()
+    assert recipe["name"] == "Импорт: салат 2"
+    assert sorted(ingredient["ingredient_id"] for ingredient in recipe["ingredients"]) == [22, 23]
+
+    for recipe_id in result["recipe_ids"]:
+        client.delete(f"/recipes/{recipe_id}")
+
+def test_import_recipes_holds_no_connection_while_reading_the_body(db_mode, monkeypatch):
+    router, name = (aio_recipes_router, "async_db_connection") if db_mode == "async" else (recipes_router, "db_connection")
+    checkout = getattr(router, name)
+    checked_out, checkouts = [], []
+
+    @asynccontextmanager
+    async def tracked_checkout():
+        async with checkout() as conn:
+            checked_out.append(conn)
+            checkouts.append(conn)
+            try:
+                yield conn
+            finally:
+                checked_out.remove(conn)
+
+    monkeypatch.setattr(router, name, tracked_checkout)
+    held_while_reading = []
+
+    async def body():
+        for i in range(3):
+            # Asked for once the previous batch is imported and before the next one is read
+            held_while_reading.append((len(checkouts), len(checked_out)))
+            record = {"name": f"Импорт: поток {i}", "category_id": 4, "ingredients": [{"ingredient_id": 22, "weight_grams": 100}]}
+            yield (json.dumps(record) + "\n").encode("utf-8")
+
+    async def upload():
+        # Streams the body chunk by chunk into the app, on the event loop of its lifespan
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=client.app), base_url="http://test") as http_client:
+            return await http_client.post("/recipes/import?batch_size=1", content=body())
+
+    response = client.portal.call(upload)
+    assert response.status_code == 200
+    assert response.json()["batches"] == 3
+    # Batch i was imported (i checkouts) before chunk i + 1 was read, and its connection returned
+    assert held_while_reading == [(0, 0), (1, 0), (2, 0)]
+    for recipe_id in response.json()["recipe_ids"]:
+        client.delete(f"/recipes/{recipe_id}")
+
+def test_import_recipes_csv():
+    body = (
+        "name,category_id,description,instructions,ingredients\n"
+        'Импорт CSV,4,"Описание, с запятой","Шаг 1\nШаг 2",22:150;23:50\n'
+        "Импорт CSV без веса,4,,,22\n"
+    )
+    response = client.post("/recipes/import", content=body.encode("utf-8"), headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 1
+    assert result["errors"][0]["line"] == 4
+
+    recipe = client.get(f"/recipes/{result['recipe_ids'][0]}").json()
+    assert recipe["description"] == "Описание, с запятой"
+    assert recipe["instructions"] == "Шаг 1\nШаг 2"
+    client.delete(f"/recipes/{result['recipe_ids'][0]}")
+
+    response = client.post("/recipes/import", content=b"name,category\n", headers={"Content-Type": "text/csv"})
+    assert response.status_code == 400
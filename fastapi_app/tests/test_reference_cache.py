@@ -0,0 +1,129 @@
+from fastapi.testclient import TestClient
+from fastapi_app.main import app
+from app.database.session import get_database_url
+from app.services import reference_cache
+from app.services.aio import reference_cache as aio_reference_cache
+from contextlib import contextmanager
+import asyncio
+import psycopg2
+import pytest
+import threading
+import time
+
+client = TestClient(app)
+
+@pytest.fixture
+def cache_enabled(monkeypatch):
+    monkeypatch.setenv("REFERENCE_CACHE_SIZE", "64")
+    monkeypatch.setattr(reference_cache, "_caches", {})
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+@contextmanager
+def running(listen):
+    # The listener runs on its own event loop, as in the lifespan of a worker
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    listener = asyncio.run_coroutine_threadsafe(listen(get_database_url()), loop)
+    try:
+        wait_for(reference_cache.is_listening)
+        yield
+    finally:
+        listener.cancel()
+        wait_for(lambda: not reference_cache.is_listening())
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = reference_cache.LRUCache(2)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    assert cache.get(1) == "a"
+    cache.put(3, "c")
+    assert 2 not in cache
+    assert cache.get(1) == "a" and cache.get(3) == "c"
+    assert (cache.hits, cache.misses) == (3, 0)
+
+def test_lru_cache_does_not_store_loads_that_raced_with_invalidation():
+    cache = reference_cache.LRUCache(8)
+    generation = cache.generation
+    cache.invalidate(1)
+    assert not cache.put(1, "stale", generation)
+    assert 1 not in cache
+    assert cache.put(1, "fresh", cache.generation)
+
+def test_writes_invalidate_again_after_commit(cache_enabled):
+    class Connection:
+        pass
+    conn = Connection()
+    reference_cache.invalidate_on_commit(conn, "ingredients", 1)
+    # Another request reads the row before the write commits and caches the old version
+    _, generation = reference_cache.lookup("ingredients", 1)
+    reference_cache.store("ingredients", 1, {"id": 1, "calories": 10}, generation)
+    assert 1 in reference_cache.get_cache("ingredients")
+    reference_cache.after_commit(conn)
+    assert 1 not in reference_cache.get_cache("ingredients")
+
+    # A rolled back write leaves nothing to invalidate
+    reference_cache.invalidate_on_commit(conn, "ingredients", 2)
+    assert reference_cache.discard_pending(conn) == [("ingredients", 2)]
+    reference_cache.after_commit(conn)
+    assert reference_cache.discard_pending(conn) == []
+
+def test_reads_bypass_the_cache_without_listener(cache_enabled):
+    category = client.post("/ingredient_categories/", json={"name": f"Без слушателя {time.time()}"}).json()
+    assert client.get(f"/ingredient_categories/{category['id']}").status_code == 200
+    assert category["id"] not in reference_cache.get_cache("ingredient_categories")
+    client.delete(f"/ingredient_categories/{category['id']}")
+
+def test_cached_reads_follow_writes_of_this_worker(cache_enabled):
+    with running(reference_cache.listen_for_changes):
+        category = client.post("/ingredient_categories/", json={"name": f"Кэш {time.time()}"}).json()
+        ingredient = client.post("/ingredients/", json={
+            "name": f"Кэшируемый ингредиент {time.time()}", "category_id": category["id"],
+            "calories": 10, "proteins": 1, "fats": 1, "carbs": 1,
+        }).json()
+
+        assert client.get(f"/ingredients/{ingredient['id']}").json()["category_name"] == category["name"]
+        assert ingredient["id"] in reference_cache.get_cache("ingredients")
+        hits = reference_cache.get_cache("ingredients").hits
+        assert client.get(f"/ingredients/{ingredient['id']}").json() == client.get(f"/ingredients/{ingredient['id']}").json()
+        assert reference_cache.get_cache("ingredients").hits == hits + 2
+
+        # A renamed category reaches the cached ingredients of it
+        renamed = f"Кэш переименован {time.time()}"
+        assert client.put(f"/ingredient_categories/{category['id']}", json={"name": renamed}).status_code == 200
+        assert client.get(f"/ingredient_categories/{category['id']}").json()["name"] == renamed
+        assert client.get(f"/ingredients/{ingredient['id']}").json()["category_name"] == renamed
+
+        assert client.put(f"/ingredients/{ingredient['id']}", json={"calories": 20}).status_code == 200
+        assert client.get(f"/ingredients/{ingredient['id']}").json()["calories"] == 20
+
+        client.delete(f"/ingredients/{ingredient['id']}")
+        assert client.get(f"/ingredients/{ingredient['id']}").status_code == 404
+        assert ingredient["id"] not in reference_cache.get_cache("ingredients")
+
+@pytest.mark.parametrize("listen", [reference_cache.listen_for_changes, aio_reference_cache.listen_for_changes], ids=["psycopg2", "psycopg"])
+def test_cached_reads_follow_notifications_of_other_workers(cache_enabled, listen):
+    conn = psycopg2.connect(get_database_url())
+    try:
+        with running(listen):
+            category = client.post("/recipe_categories/", json={"name": f"Кэш {time.time()}"}).json()
+            assert client.get(f"/recipe_categories/{category['id']}").json()["description"] is None
+            assert category["id"] in reference_cache.get_cache("recipe_categories")
+
+            # Another worker (here: a plain connection) changes the row
+            with conn.cursor() as cursor:
+                cursor.execute("UPDATE nutrition.recipe_categories SET description = 'Из другого воркера' WHERE id = %s", (category["id"],))
+            conn.commit()
+            wait_for(lambda: category["id"] not in reference_cache.get_cache("recipe_categories"))
+            assert client.get(f"/recipe_categories/{category['id']}").json()["description"] == "Из другого воркера"
+            client.delete(f"/recipe_categories/{category['id']}")
+    finally:
+        conn.close()
@@ -0,0 +1,40 @@
+from fastapi import Response
+from typing import List
+from app.database.pool import ConnectionPool
+from app.database.rows import DictRowCursor, register_numeric_as_float
+from app.database.session import get_database_url
+from app.schemas.schemas import NutritionBucket
+from app.services import serialization
+import json
+
+def test_rows_come_back_as_dicts_of_floats():
+    pool = ConnectionPool(get_database_url(), min_size=1, max_size=1, configure=register_numeric_as_float)
+    conn = pool.getconn()
+    try:
+        with conn.cursor(cursor_factory=DictRowCursor) as cursor:
+            cursor.execute("SELECT 12.50::numeric AS weight, ARRAY[1.25]::numeric[] AS parts, NULL::numeric AS empty FROM generate_series(1, 3)")
+            assert cursor.fetchone() == {"weight": 12.5, "parts": [1.25], "empty": None}
+            assert cursor.fetchmany(1) == [{"weight": 12.5, "parts": [1.25], "empty": None}]
+            assert list(cursor) == [{"weight": 12.5, "parts": [1.25], "empty": None}]
+            assert cursor.fetchall() == []
+    finally:
+        pool.putconn(conn)
+        pool.closeall()
+
+def test_json_response_matches_response_model_encoding():
+    # Whole numbers from JSON aggregates become floats, as through the response_model
+    buckets = [{
+        "start": "2025-03-01", "end": "2025-03-01",
+        "total_nutrition": {"calories": 0, "proteins": 1.5, "fats": 0, "carbs": 0},
+        "meals": [{"meal_type": "lunch", "portions_count": 1, "calories": 200, "proteins": 1.5, "fats": 0, "carbs": 0}],
+    }]
+    response = Response()
+    response.headers["X-Next-Cursor"] = "abc"
+
+    encoded = serialization.json_response(buckets, List[NutritionBucket], response)
+    assert encoded.headers["X-Next-Cursor"] == "abc"
+    assert encoded.headers["content-type"] == "application/json"
+    body = json.loads(encoded.body)
+    assert body[0]["total_nutrition"]["calories"] == 0.0 and isinstance(body[0]["total_nutrition"]["calories"], float)
+    assert body == [NutritionBucket(**buckets[0]).model_dump(mode="json")]
+    assert serialization.jsonable(buckets, List[NutritionBucket]) == body
@@ -1,13 +1,27 @@
 from fastapi.testclient import TestClient
 from fastapi_app.main import app
-from datetime import date
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+import os
 import pytest
 
 client = TestClient(app)
 
+def app_day(timestamp):
+    """
+    Day of an API timestamp in APP_TIMEZONE (by default the database time zone), in which the API counts days.
+    """
+    moment = datetime.fromisoformat(timestamp)
+    timezone = os.getenv("APP_TIMEZONE")
+    return (moment.astimezone(ZoneInfo(timezone)) if timezone else moment).date().isoformat()
+
+def app_today():
+    timezone = os.getenv("APP_TIMEZONE")
+    return datetime.now(ZoneInfo(timezone)).date() if timezone else date.today()
+
 def test_get_daily_summary_success():
     # Assuming there's consumed data for today's date (or a specific test date)
-    test_date = date.today().isoformat() # Format as YYYY-MM-DD
+    test_date = app_today().isoformat() # Format as YYYY-MM-DD
     response = client.get(f"/stats/daily_summary?summary_date={test_date}")
     assert response.status_code == 200
     data = response.json()
@@ -21,3 +35,80 @@ def test_get_daily_summary_no_data():
     response = client.get(f"/stats/daily_summary?summary_date={test_date}")
     assert response.status_code == 404
     assert "No summary found for this date." in response.json()["detail"]
+
+def test_get_daily_summary_follows_consumed_items():
+    dish_response = client.post("/dishes/", json={"recipe_id": 3, "initial_weight": 500.0, "final_weight": 500.0})
+    assert dish_response.status_code == 201
+    item = client.post(
+        "/consumed/",
+        json={"cooked_dish_id": dish_response.json()["id"], "meal_type": "snack", "weight_grams": 40.0}
+    ).json()
+    summary_date = app_day(item["consumed_at"])
+
+    def snack():
+        response = client.get(f"/stats/daily_summary?summary_date={summary_date}")
+        if response.status_code == 404:
+            return None
+        assert response.status_code == 200
+        return next((meal for meal in response.json()["meals"] if meal["meal_type"] == "snack"), None)
+
+    before = snack()
+    assert before["portions_count"] >= 1
+
+    # Update and delete are reflected by the rollup triggers as well
+    assert client.put(f"/consumed/{item['id']}", json={"weight_grams": 20.0}).status_code == 200
+    after_update = snack()
+    assert after_update["portions_count"] == before["portions_count"]
+    assert after_update["calories"] == pytest.approx(before["calories"] - item["calories"] / 2, abs=0.02)
+
+    assert client.delete(f"/consumed/{item['id']}").status_code == 204
+    after_delete = snack()
+    if before["portions_count"] == 1:
+        assert after_delete is None
+    else:
+        assert after_delete["portions_count"] == before["portions_count"] - 1
+
+def test_get_nutrition_range_buckets():
+    dish_response = client.post("/dishes/", json={"recipe_id": 3, "initial_weight": 500.0, "final_weight": 500.0})
+    item = client.post(
+        "/consumed/",
+        json={"cooked_dish_id": dish_response.json()["id"], "meal_type": "lunch", "weight_grams": 30.0}
+    ).json()
+    today = date.fromisoformat(app_day(item["consumed_at"]))
+    date_from, date_to = today - timedelta(days=13), today
+
+    # One bucket per day, empty days filled with zeros
+    days = client.get(f"/stats/range?from={date_from}&to={date_to}").json()
+    assert [bucket["start"] for bucket in days] == [str(date_from + timedelta(days=i)) for i in range(14)]
+    assert days[-1]["total_nutrition"]["calories"] >= item["calories"]
+    daily_summary = client.get(f"/stats/daily_summary?summary_date={today}").json()
+    assert days[-1]["total_nutrition"] == daily_summary["total_nutrition"]
+    assert days[-1]["meals"] == daily_summary["meals"]
+
+    # Weeks start on Monday; the edge buckets are clipped to the range and add up to the same totals
+    weeks = client.get(f"/stats/range?from={date_from}&to={date_to}&bucket=week").json()
+    assert weeks[0]["start"] == str(date_from) and weeks[-1]["end"] == str(date_to)
+    assert all(date.fromisoformat(bucket["start"]).weekday() == 0 for bucket in weeks[1:])
+    assert sum(bucket["total_nutrition"]["calories"] for bucket in weeks) == pytest.approx(
+        sum(bucket["total_nutrition"]["calories"] for bucket in days)
+    )
+
+    months = client.get(f"/stats/range?from={date_from}&to={date_to}&bucket=month").json()
+    assert len(months) == (2 if date_from.month != date_to.month else 1)
+
+def test_get_nutrition_range_invalid():
+    assert client.get("/stats/range?from=2025-03-10&to=2025-03-01").status_code == 400
+    assert client.get("/stats/range?from=2025-03-01&to=2025-03-10&bucket=year").status_code == 422
+    assert client.get("/stats/range?from=2000-01-01&to=2025-01-01&bucket=day").status_code == 400
+    assert client.get("/stats/range?from=2000-01-01&to=2025-01-01&bucket=month").status_code == 200
+
+def test_stats_conditional_requests_follow_consumed_items():
+    url = f"/stats/range?from={app_today() - timedelta(days=6)}&to={app_today()}"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+
+    dish = client.post("/dishes/", json={"recipe_id": 3, "initial_weight": 500.0, "final_weight": 500.0}).json()
+    item = client.post("/consumed/", json={"cooked_dish_id": dish["id"], "meal_type": "snack", "weight_grams": 40.0}).json()
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+    client.delete(f"/consumed/{item['id']}")
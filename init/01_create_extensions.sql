@@ -15,6 +15,31 @@ CREATE SCHEMA IF NOT EXISTS nutrition;
 -- Установка search_path для текущей сессии
 SET search_path = nutrition, public;
 
+-- Часовой пояс приложения: app_timezone() и local_day_start(DATE) — в каком поясе считаются сутки
+-- Часовой пояс задаётся параметром nutrition.timezone (ALTER DATABASE ... SET nutrition.timezone = 'Europe/Moscow'
+-- или опцией подключения -c nutrition.timezone=...), иначе берётся TimeZone сессии.
+-- Фильтр по дню записывается как полуинтервал
+--   consumed_at >= local_day_start(d) AND consumed_at < local_day_start(d + 1)
+-- вместо consumed_at::date = d: такое условие использует индекс по consumed_at и отсекает секции consumed.
+CREATE OR REPLACE FUNCTION nutrition.app_timezone()
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(NULLIF(current_setting('nutrition.timezone', true), ''), current_setting('TimeZone'));
+$$;
+
+CREATE OR REPLACE FUNCTION nutrition.local_day_start(
+    p_date DATE
+)
+RETURNS TIMESTAMPTZ
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT p_date::timestamp AT TIME ZONE nutrition.app_timezone();
+$$;
+
+
 -- Вывод информации об установленных расширениях
 \echo '============================================'
 \echo 'Extensions installed successfully:'
@@ -24,4 +49,5 @@ SET search_path = nutrition, public;
 \echo ''
 \echo 'Schema created: nutrition'
 \echo 'Search path set to: nutrition, public'
+\echo 'Timezone helpers: app_timezone(), local_day_start(DATE)'
 \echo '============================================'
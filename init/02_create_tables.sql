@@ -57,6 +57,10 @@ CREATE TABLE ingredients (
     vitamin_c NUMERIC(8, 2) CHECK (vitamin_c >= 0), -- мг
     vitamin_d NUMERIC(8, 2) CHECK (vitamin_d >= 0), -- мкг
 
+    -- Поисковый документ (имя + нормализованное имя + все синонимы), поддерживается триггерами
+    search_document TEXT NOT NULL DEFAULT '',
+    search_vector TSVECTOR GENERATED ALWAYS AS (to_tsvector('russian', search_document)) STORED,
+
     -- Метаданные
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
@@ -86,6 +90,8 @@ COMMENT ON COLUMN ingredients.iron IS 'Железо на 100г (мг)';
 COMMENT ON COLUMN ingredients.vitamin_a IS 'Витамин A на 100г (мкг)';
 COMMENT ON COLUMN ingredients.vitamin_c IS 'Витамин C на 100г (мг)';
 COMMENT ON COLUMN ingredients.vitamin_d IS 'Витамин D на 100г (мкг)';
+COMMENT ON COLUMN ingredients.search_document IS 'Поисковый документ: нормализованное имя, исходное имя (если отличается) и все синонимы';
+COMMENT ON COLUMN ingredients.search_vector IS 'Полнотекстовый вектор поискового документа';
 COMMENT ON COLUMN ingredients.created_at IS 'Время создания записи';
 COMMENT ON COLUMN ingredients.updated_at IS 'Время последнего обновления записи';
 COMMENT ON COLUMN ingredients.deleted_at IS 'Время мягкого удаления записи';
@@ -246,8 +252,11 @@ COMMENT ON COLUMN cooked_dish_ingredients.carbs IS 'Углеводы на 100г
 
 
 -- 9. Потребление (факты)
+-- Секционирована по месяцам (consumed_at): секции consumed_YYYY_MM создаёт
+-- ensure_consumed_partitions(), строки вне созданных секций попадают в consumed_default.
+-- Первичный ключ секционированной таблицы обязан включать ключ секционирования.
 CREATE TABLE consumed (
-    id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    id BIGINT GENERATED ALWAYS AS IDENTITY,
     cooked_dish_id BIGINT NOT NULL,
     consumed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     meal_type VARCHAR(50) NOT NULL CHECK (meal_type IN ('breakfast', 'lunch', 'dinner', 'snack')),
@@ -259,10 +268,17 @@ CREATE TABLE consumed (
     fats NUMERIC(10, 2) NOT NULL,
     carbs NUMERIC(10, 2) NOT NULL,
 
+    -- День в daily_meal_rollup (заполняется триггером trg_set_consumption_date)
+    consumption_date DATE NOT NULL,
+
+    PRIMARY KEY (id, consumed_at),
+
     CONSTRAINT fk_consumed_dish
         FOREIGN KEY(cooked_dish_id)
         REFERENCES cooked_dishes(id)
-);
+) PARTITION BY RANGE (consumed_at);
+
+CREATE TABLE consumed_default PARTITION OF consumed DEFAULT;
 
 COMMENT ON TABLE consumed IS 'Факты потребления порций приготовленных блюд';
 COMMENT ON COLUMN consumed.id IS 'Уникальный идентификатор факта потребления';
@@ -274,4 +290,124 @@ COMMENT ON COLUMN consumed.calories IS 'Калорийность съеденн
 COMMENT ON COLUMN consumed.proteins IS 'Белки в съеденной порции';
 COMMENT ON COLUMN consumed.fats IS 'Жиры в съеденной порции';
 COMMENT ON COLUMN consumed.carbs IS 'Углеводы в съеденной порции';
+COMMENT ON COLUMN consumed.consumption_date IS 'День consumed_at в часовом поясе приложения на момент записи (ключ daily_meal_rollup)';
+COMMENT ON TABLE consumed_default IS 'Секция consumed для строк вне месячных секций (переносятся ensure_consumed_partitions())';
+
+
+
+-- 10. КБЖУ рецептов (кэш, поддерживается триггерами на recipe_ingredients и ingredients)
+CREATE TABLE recipe_nutrition_totals (
+    recipe_id INT PRIMARY KEY,
+
+    -- Суммы по всем ингредиентам рецепта
+    total_weight NUMERIC(12, 2) NOT NULL,
+    total_calories NUMERIC(12, 2) NOT NULL,
+    total_proteins NUMERIC(12, 2) NOT NULL,
+    total_fats NUMERIC(12, 2) NOT NULL,
+    total_carbs NUMERIC(12, 2) NOT NULL,
+
+    -- На 100 г сырых ингредиентов
+    calories_per_100g NUMERIC(10, 2) GENERATED ALWAYS AS (total_calories / total_weight * 100) STORED,
+    proteins_per_100g NUMERIC(10, 2) GENERATED ALWAYS AS (total_proteins / total_weight * 100) STORED,
+    fats_per_100g NUMERIC(10, 2) GENERATED ALWAYS AS (total_fats / total_weight * 100) STORED,
+    carbs_per_100g NUMERIC(10, 2) GENERATED ALWAYS AS (total_carbs / total_weight * 100) STORED,
+
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    CONSTRAINT fk_recipe_nutrition_recipe
+        FOREIGN KEY(recipe_id)
+        REFERENCES recipes(id)
+        ON DELETE CASCADE
+);
+
+COMMENT ON TABLE recipe_nutrition_totals IS 'Предрасчитанная пищевая ценность рецептов (строка есть только у рецептов с ингредиентами)';
+COMMENT ON COLUMN recipe_nutrition_totals.recipe_id IS 'Ссылка на рецепт';
+COMMENT ON COLUMN recipe_nutrition_totals.total_weight IS 'Суммарный вес ингредиентов рецепта';
+COMMENT ON COLUMN recipe_nutrition_totals.total_calories IS 'Калорийность всего рецепта';
+COMMENT ON COLUMN recipe_nutrition_totals.total_proteins IS 'Белки во всем рецепте';
+COMMENT ON COLUMN recipe_nutrition_totals.total_fats IS 'Жиры во всем рецепте';
+COMMENT ON COLUMN recipe_nutrition_totals.total_carbs IS 'Углеводы во всем рецепте';
+COMMENT ON COLUMN recipe_nutrition_totals.calories_per_100g IS 'Калорийность на 100 г сырых ингредиентов';
+COMMENT ON COLUMN recipe_nutrition_totals.proteins_per_100g IS 'Белки на 100 г сырых ингредиентов';
+COMMENT ON COLUMN recipe_nutrition_totals.fats_per_100g IS 'Жиры на 100 г сырых ингредиентов';
+COMMENT ON COLUMN recipe_nutrition_totals.carbs_per_100g IS 'Углеводы на 100 г сырых ингредиентов';
+COMMENT ON COLUMN recipe_nutrition_totals.updated_at IS 'Время последнего пересчета';
+
+
+
+-- 11. Дневная статистика потребления (поддерживается триггерами на consumed)
+-- Дата — consumed.consumption_date: день consumed_at в часовом поясе nutrition.app_timezone() сессии, которая
+-- вставила порцию (или изменила её consumed_at). Изменение и удаление порции из сессии с другим поясом
+-- вычитают её из того же дня, в который она была добавлена.
+CREATE TABLE daily_meal_rollup (
+    consumption_date DATE NOT NULL,
+    meal_type VARCHAR(50) NOT NULL,
+
+    total_calories NUMERIC(12, 2) NOT NULL,
+    total_proteins NUMERIC(12, 2) NOT NULL,
+    total_fats NUMERIC(12, 2) NOT NULL,
+    total_carbs NUMERIC(12, 2) NOT NULL,
+    portions_count INT NOT NULL CHECK (portions_count > 0),
+
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (consumption_date, meal_type)
+);
+
+COMMENT ON TABLE daily_meal_rollup IS 'Суммы потребления по дням и приемам пищи (строка есть только у дней с порциями)';
+COMMENT ON COLUMN daily_meal_rollup.consumption_date IS 'День потребления в часовом поясе приложения';
+COMMENT ON COLUMN daily_meal_rollup.meal_type IS 'Тип приема пищи';
+COMMENT ON COLUMN daily_meal_rollup.total_calories IS 'Калорийность всех порций';
+COMMENT ON COLUMN daily_meal_rollup.total_proteins IS 'Белки во всех порциях';
+COMMENT ON COLUMN daily_meal_rollup.total_fats IS 'Жиры во всех порциях';
+COMMENT ON COLUMN daily_meal_rollup.total_carbs IS 'Углеводы во всех порциях';
+COMMENT ON COLUMN daily_meal_rollup.portions_count IS 'Число порций';
+COMMENT ON COLUMN daily_meal_rollup.updated_at IS 'Время последнего изменения';
+
+
+
+-- 12. Журнал движения веса блюд (режим ledger, см. set_dish_weight_mode в 06_create_functions.sql)
+-- Порции дописывают сюда -weight_grams, удаление порции — +weight_grams; строка cooked_dishes не переписывается.
+-- Остаток блюда = cooked_dishes.remaining_weight + SUM(delta); compact_dish_weight_ledger() переносит суммы
+-- в cooked_dishes и очищает журнал.
+CREATE TABLE dish_weight_ledger (
+    id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    cooked_dish_id BIGINT NOT NULL,
+    delta NUMERIC(10, 2) NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    CONSTRAINT fk_dish_weight_ledger_cooked_dish
+        FOREIGN KEY(cooked_dish_id)
+        REFERENCES cooked_dishes(id)
+);
+
+COMMENT ON TABLE dish_weight_ledger IS 'Несвернутые изменения остатка блюд (только в режиме ledger)';
+COMMENT ON COLUMN dish_weight_ledger.cooked_dish_id IS 'ID приготовленного блюда';
+COMMENT ON COLUMN dish_weight_ledger.delta IS 'Изменение остатка в граммах (отрицательное — потребление)';
+COMMENT ON COLUMN dish_weight_ledger.created_at IS 'Время записи';
+
+
+
+-- 13. Версии изменений данных (для ETag / If-None-Match в API)
+-- Отложенные триггеры (04_create_triggers.sql, раздел m) увеличивают version один раз за транзакцию,
+-- изменившую данные сущности. Счётчик сущности разбит на 16 строк (shard = pg_backend_pid() % 16), чтобы
+-- параллельные транзакции не ждали друг друга на одной строке; версия сущности — SUM(version) по её строкам.
+CREATE TABLE change_versions (
+    entity TEXT NOT NULL,
+    shard SMALLINT NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+
+    PRIMARY KEY (entity, shard)
+);
+
+COMMENT ON TABLE change_versions IS 'Счётчики изменений данных, по которым API отвечает 304 Not Modified';
+COMMENT ON COLUMN change_versions.entity IS 'Сущность: recipes (рецепты), dishes (блюда и остатки), stats (дневная статистика)';
+COMMENT ON COLUMN change_versions.shard IS 'Номер строки счётчика (pg_backend_pid() % 16)';
+COMMENT ON COLUMN change_versions.version IS 'Число транзакций, изменивших сущность через эту строку';
+COMMENT ON COLUMN change_versions.changed_at IS 'Время последнего изменения';
 
+INSERT INTO change_versions (entity, shard)
+SELECT e.entity, s.shard
+FROM unnest(ARRAY['recipes', 'dishes', 'stats']) AS e(entity)
+CROSS JOIN generate_series(0, 15) AS s(shard);
@@ -16,6 +16,7 @@ CREATE INDEX idx_cooked_dishes_recipe_id ON cooked_dishes (recipe_id);
 CREATE INDEX idx_cooked_dish_ingredients_cooked_dish_id ON cooked_dish_ingredients (cooked_dish_id);
 CREATE INDEX idx_cooked_dish_ingredients_ingredient_id ON cooked_dish_ingredients (ingredient_id);
 CREATE INDEX idx_consumed_cooked_dish_id ON consumed (cooked_dish_id);
+CREATE INDEX idx_dish_weight_ledger_cooked_dish_id ON dish_weight_ledger (cooked_dish_id);
 
 
 -- 2. GIN trigram на ingredients.name_normalized для поиска по подстроке/нечеткого поиска
@@ -31,16 +32,25 @@ CREATE INDEX trgm_idx_ingredient_synonyms_synonym_normalized ON ingredient_synon
 -- Если будет tsvector, то индекс будет на нем: CREATE INDEX fts_idx_ingredients_name ON ingredients USING GIN (to_tsvector('russian', name));
 CREATE INDEX fts_idx_ingredients_name ON ingredients USING GIN (to_tsvector('russian', name));
 
--- 5. B-tree на consumed.consumed_at
-CREATE INDEX idx_consumed_consumed_at ON consumed (consumed_at);
+-- 5. B-tree на consumed(consumed_at, id): фильтры по дням и курсор истории (ORDER BY consumed_at DESC, id DESC)
+CREATE INDEX idx_consumed_consumed_at_id ON consumed (consumed_at, id);
 
--- 6. Composite индекс на consumed(consumed_at, meal_type) для ускорения запросов по статистике потребления
-CREATE INDEX idx_consumed_consumed_at_meal_type ON consumed (consumed_at, meal_type);
+-- 6. Composite индекс на consumed(meal_type, consumed_at, id) для истории с фильтром по приему пищи
+CREATE INDEX idx_consumed_meal_type_consumed_at_id ON consumed (meal_type, consumed_at, id);
 
--- 7. B-tree на cooked_dishes.cooked_at
-CREATE INDEX idx_cooked_dishes_cooked_at ON cooked_dishes (cooked_at);
+-- 7. B-tree на cooked_dishes(cooked_at, id): фильтры по дням и курсор истории блюд
+CREATE INDEX idx_cooked_dishes_cooked_at_id ON cooked_dishes (cooked_at, id);
 
 -- 8. Partial indexes (WHERE deleted_at IS NULL) для активных записей
 CREATE INDEX idx_ingredients_active ON ingredients (id) WHERE deleted_at IS NULL;
 CREATE INDEX idx_recipes_active ON recipes (id) WHERE deleted_at IS NULL;
 CREATE INDEX idx_cooked_dishes_active ON cooked_dishes (id) WHERE deleted_at IS NULL;
+
+-- 9. Поисковый документ ингредиента (имя + синонимы) для search_ingredients
+-- Первая фаза поиска отбирает кандидатов только по этим индексам (LIKE / word_similarity / полнотекст)
+CREATE INDEX trgm_idx_ingredients_search_document ON ingredients USING GIN (search_document gin_trgm_ops) WHERE deleted_at IS NULL;
+CREATE INDEX fts_idx_ingredients_search_vector ON ingredients USING GIN (search_vector) WHERE deleted_at IS NULL;
+
+-- 10. Поиск рецептов по подстроке названия (GET /recipes?search=...)
+-- gin_trgm_ops поддерживает ILIKE '%...%' напрямую
+CREATE INDEX trgm_idx_recipes_name ON recipes USING GIN (name gin_trgm_ops) WHERE deleted_at IS NULL;
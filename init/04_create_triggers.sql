@@ -6,17 +6,44 @@
 
 SET search_path = nutrition, public;
 
--- a) normalize_ingredient_name() + триггер
--- Нормализует имя ингредиента (удаляет пробелы, переводит в нижний регистр, заменяет 'ё' на 'е')
-CREATE OR REPLACE FUNCTION nutrition.normalize_ingredient_name()
-RETURNS TRIGGER AS $$
-BEGIN
-  NEW.name_normalized := TRIM(
+-- normalize_search_text() — общая нормализация для имён, синонимов и поисковых запросов
+-- (удаляет лишние пробелы, переводит в нижний регистр, заменяет 'ё' на 'е')
+CREATE OR REPLACE FUNCTION nutrition.normalize_search_text(p_text TEXT)
+RETURNS TEXT AS $$
+  SELECT TRIM(
     REGEXP_REPLACE(
-      REPLACE(LOWER(NEW.name), 'ё', 'е'),
+      REPLACE(LOWER(p_text), 'ё', 'е'),
       '\s+', ' ', 'g'
     )
   );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- build_ingredient_search_document() — поисковый документ ингредиента:
+-- нормализованное имя, исходное имя (если отличается) и все нормализованные синонимы
+CREATE OR REPLACE FUNCTION nutrition.build_ingredient_search_document(
+  p_ingredient_id INT,
+  p_name TEXT,
+  p_name_normalized TEXT
+)
+RETURNS TEXT AS $$
+  SELECT CONCAT_WS(' | ',
+    p_name_normalized,
+    NULLIF(LOWER(p_name), p_name_normalized),
+    (SELECT STRING_AGG(s.synonym_normalized, ' | ' ORDER BY s.id)
+     FROM nutrition.ingredient_synonyms s
+     WHERE s.ingredient_id = p_ingredient_id)
+  );
+$$ LANGUAGE sql STABLE;
+
+-- a) normalize_ingredient_name() + триггер
+-- Нормализует имя ингредиента и пересобирает его поисковый документ при смене имени
+CREATE OR REPLACE FUNCTION nutrition.normalize_ingredient_name()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.name_normalized := nutrition.normalize_search_text(NEW.name);
+  IF TG_OP = 'INSERT' OR NEW.name IS DISTINCT FROM OLD.name THEN
+    NEW.search_document := nutrition.build_ingredient_search_document(NEW.id, NEW.name, NEW.name_normalized);
+  END IF;
   RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
@@ -30,12 +57,7 @@ FOR EACH ROW EXECUTE FUNCTION nutrition.normalize_ingredient_name();
 CREATE OR REPLACE FUNCTION nutrition.normalize_synonym()
 RETURNS TRIGGER AS $$
 BEGIN
-  NEW.synonym_normalized := TRIM(
-    REGEXP_REPLACE(
-      REPLACE(LOWER(NEW.synonym), 'ё', 'е'),
-      '\s+', ' ', 'g'
-    )
-  );
+  NEW.synonym_normalized := nutrition.normalize_search_text(NEW.synonym);
   RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
@@ -44,54 +66,87 @@ CREATE TRIGGER trg_normalize_synonym
 BEFORE INSERT OR UPDATE ON nutrition.ingredient_synonyms
 FOR EACH ROW EXECUTE FUNCTION nutrition.normalize_synonym();
 
-
--- c) recalculate_dish_nutrition() + триггер
--- Пересчитывает КБЖУ приготовленного блюда при изменении его ингредиентов
-CREATE OR REPLACE FUNCTION nutrition.recalculate_dish_nutrition()
+-- h) refresh_ingredient_search_document() + триггер
+-- Пересобирает поисковый документ ингредиента при добавлении, изменении или удалении синонима
+CREATE OR REPLACE FUNCTION nutrition.refresh_ingredient_search_document()
 RETURNS TRIGGER AS $$
-DECLARE
-  v_total_calories NUMERIC(10, 2) := 0;
-  v_total_proteins NUMERIC(10, 2) := 0;
-  v_total_fats     NUMERIC(10, 2) := 0;
-  v_total_carbs    NUMERIC(10, 2) := 0;
-  v_initial_weight NUMERIC(10, 2) := 0;
-  v_cooked_dish_id BIGINT;
 BEGIN
-  IF TG_OP = 'DELETE' THEN
-    v_cooked_dish_id := OLD.cooked_dish_id;
-  ELSE -- INSERT or UPDATE
-    v_cooked_dish_id := NEW.cooked_dish_id;
-  END IF;
+  UPDATE nutrition.ingredients i
+  SET search_document = nutrition.build_ingredient_search_document(i.id, i.name, i.name_normalized)
+  WHERE i.id IN (
+    CASE WHEN TG_OP <> 'INSERT' THEN OLD.ingredient_id END,
+    CASE WHEN TG_OP <> 'DELETE' THEN NEW.ingredient_id END
+  );
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
 
-  -- Суммируем КБЖУ всех ингредиентов в блюде
-  SELECT
-    SUM(cdi.calories / 100 * cdi.weight_grams),
-    SUM(cdi.proteins / 100 * cdi.weight_grams),
-    SUM(cdi.fats / 100 * cdi.weight_grams),
-    SUM(cdi.carbs / 100 * cdi.weight_grams),
-    SUM(cdi.weight_grams)
-  INTO
-    v_total_calories, v_total_proteins, v_total_fats, v_total_carbs, v_initial_weight
-  FROM nutrition.cooked_dish_ingredients cdi
-  WHERE cdi.cooked_dish_id = v_cooked_dish_id;
+CREATE TRIGGER trg_refresh_ingredient_search_document
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.ingredient_synonyms
+FOR EACH ROW EXECUTE FUNCTION nutrition.refresh_ingredient_search_document();
 
-  -- Обновляем cooked_dishes
-  UPDATE nutrition.cooked_dishes
+
+-- c) recalculate_dish_nutrition() + триггеры
+-- Пересчитывает КБЖУ приготовленных блюд при изменении их ингредиентов.
+-- Триггеры уровня оператора: копирование состава рецепта из N ингредиентов пересчитывает блюдо один раз, а не N раз.
+CREATE OR REPLACE FUNCTION nutrition.recalculate_dish_nutrition_for(p_cooked_dish_ids BIGINT[])
+RETURNS VOID AS $$
+BEGIN
+  -- Суммируем КБЖУ всех ингредиентов в блюдах (блюдо без ингредиентов получает нули)
+  UPDATE nutrition.cooked_dishes cd
   SET
-    initial_weight = COALESCE(v_initial_weight, 0),
-    total_calories = COALESCE(v_total_calories, 0),
-    total_proteins = COALESCE(v_total_proteins, 0),
-    total_fats     = COALESCE(v_total_fats, 0),
-    total_carbs    = COALESCE(v_total_carbs, 0)
-  WHERE id = v_cooked_dish_id;
+    initial_weight = totals.initial_weight,
+    total_calories = totals.total_calories,
+    total_proteins = totals.total_proteins,
+    total_fats     = totals.total_fats,
+    total_carbs    = totals.total_carbs
+  FROM (
+    SELECT
+      d.id,
+      COALESCE(SUM(cdi.weight_grams), 0) AS initial_weight,
+      COALESCE(SUM(cdi.calories / 100 * cdi.weight_grams), 0) AS total_calories,
+      COALESCE(SUM(cdi.proteins / 100 * cdi.weight_grams), 0) AS total_proteins,
+      COALESCE(SUM(cdi.fats / 100 * cdi.weight_grams), 0) AS total_fats,
+      COALESCE(SUM(cdi.carbs / 100 * cdi.weight_grams), 0) AS total_carbs
+    FROM unnest(p_cooked_dish_ids) AS d(id)
+    LEFT JOIN nutrition.cooked_dish_ingredients cdi ON cdi.cooked_dish_id = d.id
+    GROUP BY d.id
+  ) totals
+  WHERE cd.id = totals.id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION nutrition.recalculate_dish_nutrition()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM nutrition.recalculate_dish_nutrition_for(ARRAY(SELECT DISTINCT cooked_dish_id FROM new_rows));
+  ELSIF TG_OP = 'UPDATE' THEN
+    PERFORM nutrition.recalculate_dish_nutrition_for(ARRAY(
+      SELECT cooked_dish_id FROM new_rows UNION SELECT cooked_dish_id FROM old_rows
+    ));
+  ELSE -- DELETE
+    PERFORM nutrition.recalculate_dish_nutrition_for(ARRAY(SELECT DISTINCT cooked_dish_id FROM old_rows));
+  END IF;
 
   RETURN NULL; -- AFTER триггер не должен возвращать строку
 END;
 $$ LANGUAGE plpgsql;
 
-CREATE TRIGGER trg_recalculate_dish_nutrition
-AFTER INSERT OR UPDATE OR DELETE ON nutrition.cooked_dish_ingredients
-FOR EACH ROW EXECUTE FUNCTION nutrition.recalculate_dish_nutrition();
+CREATE TRIGGER trg_recalculate_dish_nutrition_insert
+AFTER INSERT ON nutrition.cooked_dish_ingredients
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION nutrition.recalculate_dish_nutrition();
+
+CREATE TRIGGER trg_recalculate_dish_nutrition_update
+AFTER UPDATE ON nutrition.cooked_dish_ingredients
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION nutrition.recalculate_dish_nutrition();
+
+CREATE TRIGGER trg_recalculate_dish_nutrition_delete
+AFTER DELETE ON nutrition.cooked_dish_ingredients
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION nutrition.recalculate_dish_nutrition();
 
 
 -- d) calculate_consumed_nutrition() + триггер
@@ -265,4 +320,402 @@ $$ LANGUAGE plpgsql;
 
 CREATE TRIGGER trg_update_recipe_updated_at
 BEFORE UPDATE ON nutrition.recipes
-FOR EACH ROW EXECUTE FUNCTION nutrition.update_updated_at();
\ No newline at end of file
+FOR EACH ROW EXECUTE FUNCTION nutrition.update_updated_at();
+
+-- i) refresh_recipe_nutrition() + триггеры
+-- Пересчитывает кэш recipe_nutrition_totals только для затронутых рецептов.
+-- Триггеры уровня оператора: пакетная вставка состава (импорт рецептов) пересчитывает каждый рецепт один раз.
+CREATE OR REPLACE FUNCTION nutrition.refresh_recipe_nutrition(p_recipe_ids INT[])
+RETURNS VOID AS $$
+BEGIN
+  -- Рецепты, у которых не осталось ингредиентов
+  DELETE FROM nutrition.recipe_nutrition_totals rnt
+  WHERE rnt.recipe_id = ANY(p_recipe_ids)
+    AND NOT EXISTS (SELECT 1 FROM nutrition.recipe_ingredients ri WHERE ri.recipe_id = rnt.recipe_id);
+
+  INSERT INTO nutrition.recipe_nutrition_totals AS rnt
+    (recipe_id, total_weight, total_calories, total_proteins, total_fats, total_carbs, updated_at)
+  SELECT
+    ri.recipe_id,
+    SUM(ri.weight_grams),
+    SUM(ri.weight_grams * i.calories / 100),
+    SUM(ri.weight_grams * i.proteins / 100),
+    SUM(ri.weight_grams * i.fats / 100),
+    SUM(ri.weight_grams * i.carbs / 100),
+    NOW()
+  FROM nutrition.recipe_ingredients ri
+  JOIN nutrition.ingredients i ON ri.ingredient_id = i.id
+  WHERE ri.recipe_id = ANY(p_recipe_ids)
+  GROUP BY ri.recipe_id
+  ON CONFLICT (recipe_id) DO UPDATE SET
+    total_weight   = EXCLUDED.total_weight,
+    total_calories = EXCLUDED.total_calories,
+    total_proteins = EXCLUDED.total_proteins,
+    total_fats     = EXCLUDED.total_fats,
+    total_carbs    = EXCLUDED.total_carbs,
+    updated_at     = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Изменение состава рецептов
+CREATE OR REPLACE FUNCTION nutrition.refresh_recipe_nutrition_on_recipe_ingredients()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM nutrition.refresh_recipe_nutrition(ARRAY(SELECT DISTINCT recipe_id FROM new_rows));
+  ELSIF TG_OP = 'UPDATE' THEN
+    PERFORM nutrition.refresh_recipe_nutrition(ARRAY(
+      SELECT recipe_id FROM new_rows UNION SELECT recipe_id FROM old_rows
+    ));
+  ELSE -- DELETE
+    PERFORM nutrition.refresh_recipe_nutrition(ARRAY(SELECT DISTINCT recipe_id FROM old_rows));
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Таблицы переходов нельзя объявить у триггера на несколько событий, поэтому триггеров три
+CREATE TRIGGER trg_refresh_recipe_nutrition_insert
+AFTER INSERT ON nutrition.recipe_ingredients
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION nutrition.refresh_recipe_nutrition_on_recipe_ingredients();
+
+CREATE TRIGGER trg_refresh_recipe_nutrition_update
+AFTER UPDATE ON nutrition.recipe_ingredients
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION nutrition.refresh_recipe_nutrition_on_recipe_ingredients();
+
+CREATE TRIGGER trg_refresh_recipe_nutrition_delete
+AFTER DELETE ON nutrition.recipe_ingredients
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION nutrition.refresh_recipe_nutrition_on_recipe_ingredients();
+
+-- Изменение КБЖУ ингредиентов: пересчитываются только рецепты, где они используются
+CREATE OR REPLACE FUNCTION nutrition.refresh_recipe_nutrition_on_ingredients()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM nutrition.refresh_recipe_nutrition(ARRAY(
+    SELECT DISTINCT ri.recipe_id
+    FROM new_rows n
+    JOIN old_rows o ON o.id = n.id
+    JOIN nutrition.recipe_ingredients ri ON ri.ingredient_id = n.id
+    WHERE (n.calories, n.proteins, n.fats, n.carbs) IS DISTINCT FROM (o.calories, o.proteins, o.fats, o.carbs)
+  ));
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_refresh_recipe_nutrition_on_ingredients
+AFTER UPDATE ON nutrition.ingredients
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION nutrition.refresh_recipe_nutrition_on_ingredients();
+
+
+-- j) set_consumption_date(), apply_daily_meal_rollup() + триггеры
+-- consumption_date порции — день consumed_at в поясе nutrition.app_timezone() сессии, которая её вставила
+-- (или изменила consumed_at). По нему порция попадает в daily_meal_rollup и по нему же вычитается: иначе
+-- изменение или удаление из сессии с другим nutrition.timezone/TimeZone уменьшало бы строку другого дня.
+CREATE OR REPLACE FUNCTION nutrition.set_consumption_date()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' OR NEW.consumed_at IS DISTINCT FROM OLD.consumed_at THEN
+    NEW.consumption_date := (NEW.consumed_at AT TIME ZONE nutrition.app_timezone())::date;
+  ELSE
+    NEW.consumption_date := OLD.consumption_date;
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_set_consumption_date
+BEFORE INSERT OR UPDATE ON nutrition.consumed
+FOR EACH ROW EXECUTE FUNCTION nutrition.set_consumption_date();
+
+-- Поддерживает daily_meal_rollup: суммы порций из таблиц переходов прибавляются (INSERT) и вычитаются (DELETE),
+-- UPDATE делает и то и другое. Приращения через ON CONFLICT/UPDATE ... SET x = x + delta не теряются при
+-- параллельных вставках за один день, в отличие от пересчета из consumed по снимку транзакции.
+-- Полный пересчет — rebuild_daily_meal_rollup().
+CREATE OR REPLACE FUNCTION nutrition.apply_daily_meal_rollup()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    INSERT INTO nutrition.daily_meal_rollup AS r
+      (consumption_date, meal_type, total_calories, total_proteins, total_fats, total_carbs, portions_count, updated_at)
+    SELECT
+      n.consumption_date,
+      n.meal_type,
+      SUM(n.calories),
+      SUM(n.proteins),
+      SUM(n.fats),
+      SUM(n.carbs),
+      COUNT(*),
+      NOW()
+    FROM new_rows n
+    GROUP BY 1, 2
+    ORDER BY 1, 2 -- одинаковый порядок блокировок строк у параллельных операторов
+    ON CONFLICT (consumption_date, meal_type) DO UPDATE SET
+      total_calories = r.total_calories + EXCLUDED.total_calories,
+      total_proteins = r.total_proteins + EXCLUDED.total_proteins,
+      total_fats     = r.total_fats + EXCLUDED.total_fats,
+      total_carbs    = r.total_carbs + EXCLUDED.total_carbs,
+      portions_count = r.portions_count + EXCLUDED.portions_count,
+      updated_at     = EXCLUDED.updated_at;
+  END IF;
+
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    -- Дни и приемы пищи, у которых не осталось порций
+    DELETE FROM nutrition.daily_meal_rollup r
+    USING (
+      SELECT consumption_date, meal_type, COUNT(*) AS portions_count
+      FROM old_rows
+      GROUP BY 1, 2
+    ) o
+    WHERE r.consumption_date = o.consumption_date
+      AND r.meal_type = o.meal_type
+      AND r.portions_count <= o.portions_count;
+
+    UPDATE nutrition.daily_meal_rollup r
+    SET
+      total_calories = r.total_calories - o.calories,
+      total_proteins = r.total_proteins - o.proteins,
+      total_fats     = r.total_fats - o.fats,
+      total_carbs    = r.total_carbs - o.carbs,
+      portions_count = r.portions_count - o.portions_count,
+      updated_at     = NOW()
+    FROM (
+      SELECT
+        consumption_date,
+        meal_type,
+        SUM(calories) AS calories,
+        SUM(proteins) AS proteins,
+        SUM(fats) AS fats,
+        SUM(carbs) AS carbs,
+        COUNT(*) AS portions_count
+      FROM old_rows
+      GROUP BY 1, 2
+    ) o
+    WHERE r.consumption_date = o.consumption_date
+      AND r.meal_type = o.meal_type;
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_apply_daily_meal_rollup_insert
+AFTER INSERT ON nutrition.consumed
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION nutrition.apply_daily_meal_rollup();
+
+CREATE TRIGGER trg_apply_daily_meal_rollup_update
+AFTER UPDATE ON nutrition.consumed
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION nutrition.apply_daily_meal_rollup();
+
+CREATE TRIGGER trg_apply_daily_meal_rollup_delete
+AFTER DELETE ON nutrition.consumed
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION nutrition.apply_daily_meal_rollup();
+
+-- k) calculate_consumed_nutrition_ledger() / restore_dish_weight_ledger() + триггеры (режим ledger)
+-- Замена d) и g), включается set_dish_weight_mode('ledger'). Порции одного блюда сериализуются
+-- транзакционной advisory-блокировкой по id блюда, а остаток пишется строкой в dish_weight_ledger,
+-- поэтому строка cooked_dishes не блокируется и не переписывается на каждую порцию.
+-- Остаток читается новым снимком после получения блокировки, поэтому перерасход невозможен
+-- в READ COMMITTED (уровень изоляции API).
+CREATE OR REPLACE FUNCTION nutrition.calculate_consumed_nutrition_ledger()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_dish RECORD;
+  v_portion_coefficient NUMERIC(10, 4);
+BEGIN
+  PERFORM pg_advisory_xact_lock(NEW.cooked_dish_id);
+
+  -- Изменение веса или блюда: старая порция возвращается в журнал, новая списывается целиком
+  IF TG_OP = 'UPDATE' AND (NEW.weight_grams <> OLD.weight_grams OR NEW.cooked_dish_id <> OLD.cooked_dish_id) THEN
+    INSERT INTO nutrition.dish_weight_ledger (cooked_dish_id, delta)
+    VALUES (OLD.cooked_dish_id, OLD.weight_grams);
+  END IF;
+
+  SELECT
+    cd.total_calories,
+    cd.total_proteins,
+    cd.total_fats,
+    cd.total_carbs,
+    cd.final_weight,
+    cd.remaining_weight + COALESCE(
+      (SELECT SUM(l.delta) FROM nutrition.dish_weight_ledger l WHERE l.cooked_dish_id = cd.id), 0
+    ) AS remaining_weight
+  INTO v_dish
+  FROM nutrition.cooked_dishes cd
+  WHERE cd.id = NEW.cooked_dish_id;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Приготовленное блюдо с ID % не найдено.', NEW.cooked_dish_id;
+  END IF;
+
+  IF TG_OP = 'UPDATE' AND NEW.weight_grams = OLD.weight_grams AND NEW.cooked_dish_id = OLD.cooked_dish_id THEN
+    -- Вес не меняется: остаток не трогаем, только пересчитываем КБЖУ
+    NULL;
+  ELSE
+    IF NEW.weight_grams > v_dish.remaining_weight THEN
+      NEW.weight_grams := v_dish.remaining_weight;
+      RAISE WARNING 'Порция была урезана до оставшегося веса блюда (%).', v_dish.remaining_weight;
+    END IF;
+
+    IF NEW.weight_grams <= 0 THEN
+      RAISE EXCEPTION 'Нечего потреблять, оставшийся вес блюда равен 0.';
+    END IF;
+
+    INSERT INTO nutrition.dish_weight_ledger (cooked_dish_id, delta)
+    VALUES (NEW.cooked_dish_id, -NEW.weight_grams);
+  END IF;
+
+  v_portion_coefficient := NEW.weight_grams / v_dish.final_weight;
+
+  NEW.calories := v_dish.total_calories * v_portion_coefficient;
+  NEW.proteins := v_dish.total_proteins * v_portion_coefficient;
+  NEW.fats     := v_dish.total_fats * v_portion_coefficient;
+  NEW.carbs    := v_dish.total_carbs * v_portion_coefficient;
+
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Удаление порций возвращает вес одной строкой журнала на блюдо
+CREATE OR REPLACE FUNCTION nutrition.restore_dish_weight_ledger()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO nutrition.dish_weight_ledger (cooked_dish_id, delta)
+  SELECT cooked_dish_id, SUM(weight_grams)
+  FROM old_rows
+  GROUP BY cooked_dish_id
+  ORDER BY cooked_dish_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_calculate_consumed_nutrition_ledger
+BEFORE INSERT OR UPDATE ON nutrition.consumed
+FOR EACH ROW EXECUTE FUNCTION nutrition.calculate_consumed_nutrition_ledger();
+
+CREATE TRIGGER trg_restore_dish_weight_ledger
+AFTER DELETE ON nutrition.consumed
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION nutrition.restore_dish_weight_ledger();
+
+-- По умолчанию работает режим row (триггеры d и g)
+ALTER TABLE nutrition.consumed DISABLE TRIGGER trg_calculate_consumed_nutrition_ledger;
+ALTER TABLE nutrition.consumed DISABLE TRIGGER trg_restore_dish_weight_ledger;
+
+
+-- l) notify_reference_change() + триггеры
+-- Сообщает API-воркерам об изменении справочных данных: NOTIFY nutrition_reference_changed с текстом
+-- '<таблица>:<id>' (для recipe_ingredients — id рецепта, для ingredient_synonyms — id ингредиента).
+-- Уведомления доставляются при фиксации транзакции, одинаковые уведомления одной транзакции PostgreSQL
+-- объединяет. По ним воркеры сбрасывают свой кэш (app/services/reference_cache.py) и переиндексируют
+-- ингредиенты в индексе поиска (app/services/ingredient_search_index.py).
+CREATE OR REPLACE FUNCTION nutrition.notify_reference_change()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_id_column CONSTANT TEXT := COALESCE(TG_ARGV[0], 'id');
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM pg_notify('nutrition_reference_changed', TG_TABLE_NAME || ':' || (to_jsonb(OLD) ->> v_id_column));
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM pg_notify('nutrition_reference_changed', TG_TABLE_NAME || ':' || (to_jsonb(NEW) ->> v_id_column));
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_notify_ingredient_categories_change
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.ingredient_categories
+FOR EACH ROW EXECUTE FUNCTION nutrition.notify_reference_change();
+
+CREATE TRIGGER trg_notify_recipe_categories_change
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.recipe_categories
+FOR EACH ROW EXECUTE FUNCTION nutrition.notify_reference_change();
+
+CREATE TRIGGER trg_notify_ingredients_change
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.ingredients
+FOR EACH ROW EXECUTE FUNCTION nutrition.notify_reference_change();
+
+CREATE TRIGGER trg_notify_recipes_change
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.recipes
+FOR EACH ROW EXECUTE FUNCTION nutrition.notify_reference_change();
+
+CREATE TRIGGER trg_notify_recipe_ingredients_change
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.recipe_ingredients
+FOR EACH ROW EXECUTE FUNCTION nutrition.notify_reference_change('recipe_id');
+
+CREATE TRIGGER trg_notify_ingredient_synonyms_change
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.ingredient_synonyms
+FOR EACH ROW EXECUTE FUNCTION nutrition.notify_reference_change('ingredient_id');
+
+
+-- m) touch_change_version() / bump_change_version() + триггеры
+-- Увеличивают счётчики change_versions. Каждая сущность обновляется один раз за транзакцию (флаг
+-- nutrition.changed_<сущность> живёт до конца транзакции), строка счётчика выбирается по pg_backend_pid(),
+-- а триггеры отложенные (срабатывают при фиксации), поэтому параллельные транзакции почти не ждут друг друга.
+-- Новая версия становится видна вместе с изменёнными данными.
+CREATE OR REPLACE FUNCTION nutrition.touch_change_version(p_entity TEXT)
+RETURNS VOID AS $$
+BEGIN
+  IF COALESCE(current_setting('nutrition.changed_' || p_entity, true), '') = '' THEN
+    UPDATE nutrition.change_versions
+    SET version = version + 1, changed_at = clock_timestamp()
+    WHERE entity = p_entity AND shard = pg_backend_pid() % 16;
+    PERFORM set_config('nutrition.changed_' || p_entity, 'on', true);
+  END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION nutrition.bump_change_version()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_entity TEXT;
+BEGIN
+  FOREACH v_entity IN ARRAY TG_ARGV LOOP
+    PERFORM nutrition.touch_change_version(v_entity);
+  END LOOP;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Рецепты: список и карточка содержат категорию и названия ингредиентов; остатки блюд — название рецепта
+CREATE CONSTRAINT TRIGGER trg_change_version_recipes
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.recipes
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW EXECUTE FUNCTION nutrition.bump_change_version('recipes', 'dishes');
+
+CREATE CONSTRAINT TRIGGER trg_change_version_recipe_ingredients
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.recipe_ingredients
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW EXECUTE FUNCTION nutrition.bump_change_version('recipes');
+
+CREATE CONSTRAINT TRIGGER trg_change_version_recipe_categories
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.recipe_categories
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW EXECUTE FUNCTION nutrition.bump_change_version('recipes');
+
+CREATE CONSTRAINT TRIGGER trg_change_version_ingredients
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.ingredients
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW EXECUTE FUNCTION nutrition.bump_change_version('recipes');
+
+-- Блюда и их остатки; журнал dish_weight_ledger пишется только вместе с consumed или cooked_dishes
+CREATE CONSTRAINT TRIGGER trg_change_version_cooked_dishes
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.cooked_dishes
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW EXECUTE FUNCTION nutrition.bump_change_version('dishes');
+
+-- Порции меняют остатки блюд и daily_meal_rollup, из которого читают get_daily_summary и get_nutrition_range
+-- (пересчет rebuild_daily_meal_rollup() обновляет версию stats сам)
+CREATE CONSTRAINT TRIGGER trg_change_version_consumed
+AFTER INSERT OR UPDATE OR DELETE ON nutrition.consumed
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW EXECUTE FUNCTION nutrition.bump_change_version('dishes', 'stats');
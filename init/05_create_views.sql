@@ -35,33 +35,69 @@ JOIN recipe_categories rc ON r.category_id = rc.id;
 
 
 -- 3. cooked_dishes_active / cooked_dishes_all
+-- remaining_weight учитывает еще не свернутые строки dish_weight_ledger (режим ledger)
 -- Активные приготовленные блюда (не удаленные)
 CREATE OR REPLACE VIEW cooked_dishes_active AS
-SELECT cd.*, r.name AS recipe_name, r.description AS recipe_description
+SELECT
+    cd.id,
+    cd.recipe_id,
+    cd.cooked_at,
+    cd.initial_weight,
+    cd.final_weight,
+    cd.remaining_weight + COALESCE(
+        (SELECT SUM(l.delta) FROM dish_weight_ledger l WHERE l.cooked_dish_id = cd.id), 0
+    ) AS remaining_weight,
+    cd.total_calories,
+    cd.total_proteins,
+    cd.total_fats,
+    cd.total_carbs,
+    cd.deleted_at,
+    r.name AS recipe_name,
+    r.description AS recipe_description
 FROM cooked_dishes cd
 JOIN recipes r ON cd.recipe_id = r.id
 WHERE cd.deleted_at IS NULL;
 
 -- Все приготовленные блюда (включая удаленные)
 CREATE OR REPLACE VIEW cooked_dishes_all AS
-SELECT cd.*, r.name AS recipe_name, r.description AS recipe_description
+SELECT
+    cd.id,
+    cd.recipe_id,
+    cd.cooked_at,
+    cd.initial_weight,
+    cd.final_weight,
+    cd.remaining_weight + COALESCE(
+        (SELECT SUM(l.delta) FROM dish_weight_ledger l WHERE l.cooked_dish_id = cd.id), 0
+    ) AS remaining_weight,
+    cd.total_calories,
+    cd.total_proteins,
+    cd.total_fats,
+    cd.total_carbs,
+    cd.deleted_at,
+    r.name AS recipe_name,
+    r.description AS recipe_description
 FROM cooked_dishes cd
 JOIN recipes r ON cd.recipe_id = r.id;
 
 
 -- 4. recipe_nutrition (КБЖУ на весь рецепт)
+-- Читает кэш recipe_nutrition_totals (см. refresh_recipe_nutrition в 04_create_triggers.sql); удаленные рецепты скрыты
 CREATE OR REPLACE VIEW recipe_nutrition AS
 SELECT
     r.id AS recipe_id,
     r.name AS recipe_name,
-    SUM(ri.weight_grams * i.calories / 100) AS total_calories,
-    SUM(ri.weight_grams * i.proteins / 100) AS total_proteins,
-    SUM(ri.weight_grams * i.fats / 100) AS total_fats,
-    SUM(ri.weight_grams * i.carbs / 100) AS total_carbs
-FROM recipes r
-JOIN recipe_ingredients ri ON r.id = ri.recipe_id
-JOIN ingredients i ON ri.ingredient_id = i.id
-GROUP BY r.id, r.name;
+    rnt.total_calories,
+    rnt.total_proteins,
+    rnt.total_fats,
+    rnt.total_carbs,
+    rnt.total_weight,
+    rnt.calories_per_100g,
+    rnt.proteins_per_100g,
+    rnt.fats_per_100g,
+    rnt.carbs_per_100g
+FROM recipe_nutrition_totals rnt
+JOIN recipes r ON r.id = rnt.recipe_id
+WHERE r.deleted_at IS NULL;
 
 
 -- 5. cooked_dishes_per_100g (КБЖУ приготовленного блюда на 100г)
@@ -99,17 +135,17 @@ WHERE cd.remaining_weight > 0;
 
 
 -- 7. daily_stats (Ежедневная статистика потребления)
+-- Читает daily_meal_rollup, который поддерживают триггеры на consumed
 CREATE OR REPLACE VIEW daily_stats AS
 SELECT
-    consumed_at::date AS consumption_date,
+    consumption_date,
     meal_type,
-    SUM(calories) AS total_calories,
-    SUM(proteins) AS total_proteins,
-    SUM(fats) AS total_fats,
-    SUM(carbs) AS total_carbs,
-    COUNT(id) AS total_portions
-FROM consumed
-GROUP BY consumed_at::date, meal_type
+    total_calories,
+    total_proteins,
+    total_fats,
+    total_carbs,
+    portions_count AS total_portions
+FROM daily_meal_rollup
 ORDER BY consumption_date, meal_type;
 
 
@@ -9,6 +9,11 @@ SET search_path = nutrition, public;
 -- 1. search_ingredients(TEXT, INT) — многоуровневый поиск
 -- Ищет ингредиенты по названию или синонимам, используя полнотекстовый поиск и trigram-совпадение.
 -- Возвращает список ингредиентов, отсортированных по релевантности.
+-- Поиск двухфазный:
+--   1) кандидаты отбираются только по GIN-индексам поискового документа ingredients.search_document
+--      (подстрока, word_similarity, полнотекст) и предварительно упорядочиваются по word_similarity;
+--   2) полный score (точные совпадения, ts_rank, similarity по имени и синонимам) считается
+--      только для ограниченного числа лучших кандидатов.
 CREATE OR REPLACE FUNCTION nutrition.search_ingredients(
     p_search_query TEXT,
     p_limit INT DEFAULT 10
@@ -20,40 +25,58 @@ RETURNS TABLE (
     search_score NUMERIC
 )
 LANGUAGE plpgsql
+STABLE
+-- Порог для оператора <% (word_similarity); по умолчанию в pg_trgm он 0.6, что отсекает опечатки
+SET pg_trgm.word_similarity_threshold = 0.3
 AS $$
+DECLARE
+    v_query TEXT := nutrition.normalize_search_text(p_search_query);
+    v_tsquery TSQUERY := websearch_to_tsquery('russian', p_search_query);
+    -- Сколько кандидатов из первой фазы ранжировать полностью
+    v_candidates INT := GREATEST(p_limit * 10, 100);
 BEGIN
     RETURN QUERY
+    WITH candidates AS (
+        SELECT
+            i.id,
+            i.name,
+            i.name_normalized,
+            i.category_id
+        FROM
+            nutrition.ingredients i
+        WHERE
+            i.deleted_at IS NULL AND (
+                i.search_document LIKE '%' || v_query || '%' OR
+                v_query <% i.search_document OR
+                i.search_vector @@ v_tsquery
+            )
+        ORDER BY
+            word_similarity(v_query, i.search_document) DESC, i.id
+        LIMIT v_candidates
+    )
     SELECT
-        i.id,
-        i.name,
+        c.id,
+        c.name,
         ic.name AS category_name,
         -- Чем выше score, тем релевантнее
         (
             -- Точное совпадение
-            CASE WHEN LOWER(i.name) = LOWER(p_search_query) THEN 10.0 ELSE 0.0 END +
+            CASE WHEN LOWER(c.name) = LOWER(p_search_query) THEN 10.0 ELSE 0.0 END +
             -- Совпадение по нормализованному имени
-            CASE WHEN LOWER(i.name_normalized) = LOWER(p_search_query) THEN 9.0 ELSE 0.0 END +
+            CASE WHEN c.name_normalized = v_query THEN 9.0 ELSE 0.0 END +
             -- Полнотекстовый поиск (чем больше совпадений, тем выше ранг)
-            ts_rank(to_tsvector('russian', i.name), websearch_to_tsquery('russian', p_search_query)) * 5.0 +
+            ts_rank(to_tsvector('russian', c.name), v_tsquery) * 5.0 +
             -- Триграмное сходство для name_normalized
-            similarity(i.name_normalized, p_search_query) * 3.0 +
+            similarity(c.name_normalized, v_query) * 3.0 +
             -- Поиск по синонимам
-            COALESCE((SELECT MAX(similarity(s.synonym_normalized, p_search_query)) FROM nutrition.ingredient_synonyms s WHERE s.ingredient_id = i.id), 0) * 2.0
+            COALESCE((SELECT MAX(similarity(s.synonym_normalized, v_query)) FROM nutrition.ingredient_synonyms s WHERE s.ingredient_id = c.id), 0) * 2.0
         )::NUMERIC AS score
     FROM
-        nutrition.ingredients i
+        candidates c
     JOIN
-        nutrition.ingredient_categories ic ON i.category_id = ic.id
-    WHERE
-        i.deleted_at IS NULL AND (
-            LOWER(i.name) LIKE '%' || LOWER(p_search_query) || '%' OR
-            LOWER(i.name_normalized) LIKE '%' || LOWER(p_search_query) || '%' OR
-            to_tsvector('russian', i.name) @@ websearch_to_tsquery('russian', p_search_query) OR
-            similarity(i.name_normalized, p_search_query) > 0.1 OR -- Произвольный порог
-            EXISTS (SELECT 1 FROM nutrition.ingredient_synonyms s WHERE s.ingredient_id = i.id AND similarity(s.synonym_normalized, p_search_query) > 0.1)
-        )
+        nutrition.ingredient_categories ic ON c.category_id = ic.id
     ORDER BY
-        score DESC
+        score DESC, c.id
     LIMIT p_limit;
 END;
 $$;
@@ -89,43 +112,36 @@ $$;
 
 
 -- 3. get_daily_summary(DATE) — JSON статистика за день
+-- Читает предрасчитанные суммы из daily_meal_rollup (не больше четырех строк на день).
 CREATE OR REPLACE FUNCTION nutrition.get_daily_summary(
     p_date DATE
 )
 RETURNS JSONB
 LANGUAGE sql
+STABLE
 AS $$
-    WITH daily_totals AS (
-        SELECT
-            COALESCE(SUM(calories), 0) AS total_calories,
-            COALESCE(SUM(proteins), 0) AS total_proteins,
-            COALESCE(SUM(fats), 0) AS total_fats,
-            COALESCE(SUM(carbs), 0) AS total_carbs
-        FROM nutrition.consumed
-        WHERE consumed_at::date = p_date
-    ),
-    meal_data AS (
+    WITH meal_data AS (
         SELECT
             meal_type,
-            SUM(calories) AS calories,
-            SUM(proteins) AS proteins,
-            SUM(fats) AS fats,
-            SUM(carbs) AS carbs,
-            COUNT(id) AS portions_count
-        FROM nutrition.consumed
-        WHERE consumed_at::date = p_date
-        GROUP BY meal_type
+            total_calories AS calories,
+            total_proteins AS proteins,
+            total_fats AS fats,
+            total_carbs AS carbs,
+            portions_count
+        FROM nutrition.daily_meal_rollup
+        WHERE consumption_date = p_date
     )
     SELECT jsonb_build_object(
         'date', p_date,
         'total_nutrition', jsonb_build_object(
-            'calories', (SELECT total_calories FROM daily_totals),
-            'proteins', (SELECT total_proteins FROM daily_totals),
-            'fats', (SELECT total_fats FROM daily_totals),
-            'carbs', (SELECT total_carbs FROM daily_totals)
+            'calories', COALESCE(SUM(calories), 0),
+            'proteins', COALESCE(SUM(proteins), 0),
+            'fats', COALESCE(SUM(fats), 0),
+            'carbs', COALESCE(SUM(carbs), 0)
         ),
-        'meals', (SELECT jsonb_agg(meal_data ORDER BY meal_type) FROM meal_data)
-    );
+        'meals', jsonb_agg(meal_data ORDER BY meal_type)
+    )
+    FROM meal_data;
 $$;
 
 
@@ -184,8 +200,9 @@ AS $$
 DECLARE
     v_remaining_weight NUMERIC(10, 2);
 BEGIN
+    -- Остаток из представления учитывает несвернутый журнал dish_weight_ledger
     SELECT remaining_weight INTO v_remaining_weight
-    FROM nutrition.cooked_dishes
+    FROM nutrition.cooked_dishes_all
     WHERE id = p_cooked_dish_id;
 
     IF v_remaining_weight IS NULL THEN
@@ -201,4 +218,320 @@ BEGIN
     SET deleted_at = NOW()
     WHERE id = p_cooked_dish_id;
 END;
-$$;
\ No newline at end of file
+$$;
+
+-- 7. search_ingredients_batch(TEXT[], INT) — поиск сразу по списку запросов
+-- Для импорта рецепта из текста: лучшие p_limit ингредиентов для каждой строки массива за один вызов.
+-- query_index — позиция запроса в массиве (с 1); внутри запроса строки идут по убыванию score.
+CREATE OR REPLACE FUNCTION nutrition.search_ingredients_batch(
+    p_search_queries TEXT[],
+    p_limit INT DEFAULT 5
+)
+RETURNS TABLE (
+    query_index INT,
+    query TEXT,
+    id INT,
+    name VARCHAR(200),
+    category_name VARCHAR(100),
+    search_score NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        q.query_index::INT,
+        q.query,
+        s.id,
+        s.name,
+        s.category_name,
+        s.search_score
+    FROM
+        unnest(p_search_queries) WITH ORDINALITY AS q(query, query_index)
+    CROSS JOIN LATERAL
+        nutrition.search_ingredients(q.query, p_limit) WITH ORDINALITY AS s(id, name, category_name, search_score, rank)
+    ORDER BY
+        q.query_index, s.rank;
+$$;
+
+
+-- 8. ensure_consumed_partitions(DATE, INT) — месячные секции consumed
+-- Создаёт секции consumed_YYYY_MM на p_months месяцев начиная с месяца p_from (границы месяцев в UTC,
+-- чтобы смена nutrition.timezone не давала пересекающихся секций). Строки, которые уже попали
+-- в consumed_default, переносятся в новую секцию; включенные пользовательские триггеры consumed_default
+-- на время переноса отключаются, чтобы перенос не возвращал вес блюдам. Возвращает число созданных секций.
+-- Вызывается при инициализации БД и при старте API; можно повесить на pg_cron.
+CREATE OR REPLACE FUNCTION nutrition.ensure_consumed_partitions(
+    p_from DATE DEFAULT (NOW() AT TIME ZONE 'UTC')::date,
+    p_months INT DEFAULT 3
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_month DATE;
+    v_name TEXT;
+    v_start TIMESTAMPTZ;
+    v_end TIMESTAMPTZ;
+    v_created INT := 0;
+    v_triggers TEXT[];
+    v_trigger TEXT;
+BEGIN
+    FOR i IN 0 .. p_months - 1 LOOP
+        v_month := (date_trunc('month', p_from) + make_interval(months => i))::date;
+        v_name := 'consumed_' || to_char(v_month, 'YYYY_MM');
+        CONTINUE WHEN to_regclass('nutrition.' || v_name) IS NOT NULL;
+
+        v_start := v_month::timestamp AT TIME ZONE 'UTC';
+        v_end := (v_month + INTERVAL '1 month') AT TIME ZONE 'UTC';
+
+        IF EXISTS (
+            SELECT 1 FROM nutrition.consumed_default
+            WHERE consumed_at >= v_start AND consumed_at < v_end
+        ) THEN
+            EXECUTE format(
+                'CREATE TABLE nutrition.%I (LIKE nutrition.consumed INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                v_name
+            );
+            -- Отложенные события версий (init/04, раздел m) по строкам этой транзакции срабатывают сейчас:
+            -- пока они ждут фиксации, ATTACH PARTITION не может изменить consumed_default.
+            -- Версия всё равно увеличивается один раз за транзакцию
+            SET CONSTRAINTS nutrition.trg_change_version_consumed IMMEDIATE;
+            SET CONSTRAINTS nutrition.trg_change_version_consumed DEFERRED;
+            -- Отключенные триггеры другого режима остатка (set_dish_weight_mode) не включаются обратно
+            v_triggers := ARRAY(
+                SELECT tgname FROM pg_trigger
+                WHERE tgrelid = 'nutrition.consumed_default'::regclass AND NOT tgisinternal AND tgenabled <> 'D'
+            );
+            FOREACH v_trigger IN ARRAY v_triggers LOOP
+                EXECUTE format('ALTER TABLE nutrition.consumed_default DISABLE TRIGGER %I', v_trigger);
+            END LOOP;
+            EXECUTE format(
+                'WITH moved AS (
+                     DELETE FROM nutrition.consumed_default
+                     WHERE consumed_at >= $1 AND consumed_at < $2
+                     RETURNING *
+                 )
+                 INSERT INTO nutrition.%I SELECT * FROM moved',
+                v_name
+            ) USING v_start, v_end;
+            FOREACH v_trigger IN ARRAY v_triggers LOOP
+                EXECUTE format('ALTER TABLE nutrition.consumed_default ENABLE TRIGGER %I', v_trigger);
+            END LOOP;
+            EXECUTE format(
+                'ALTER TABLE nutrition.consumed ATTACH PARTITION nutrition.%I FOR VALUES FROM (%L) TO (%L)',
+                v_name, v_start, v_end
+            );
+        ELSE
+            EXECUTE format(
+                'CREATE TABLE nutrition.%I PARTITION OF nutrition.consumed FOR VALUES FROM (%L) TO (%L)',
+                v_name, v_start, v_end
+            );
+        END IF;
+        v_created := v_created + 1;
+    END LOOP;
+
+    RETURN v_created;
+END;
+$$;
+
+SELECT nutrition.ensure_consumed_partitions();
+
+
+-- 9. rebuild_daily_meal_rollup(DATE, DATE) — пересчет daily_meal_rollup из consumed
+-- Пересчитывает дни [p_from, p_to] (NULL — без ограничения) по consumed.consumption_date:
+-- после сбоя или ручной правки данных. Блокировка EXCLUSIVE не дает
+-- триггерам параллельных транзакций менять daily_meal_rollup до конца пересчета, чтение не блокирует.
+-- Возвращает число записанных строк.
+CREATE OR REPLACE FUNCTION nutrition.rebuild_daily_meal_rollup(
+    p_from DATE DEFAULT NULL,
+    p_to DATE DEFAULT NULL
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows INT;
+BEGIN
+    LOCK TABLE nutrition.daily_meal_rollup IN EXCLUSIVE MODE;
+
+    DELETE FROM nutrition.daily_meal_rollup
+    WHERE (p_from IS NULL OR consumption_date >= p_from)
+      AND (p_to IS NULL OR consumption_date <= p_to);
+
+    INSERT INTO nutrition.daily_meal_rollup
+        (consumption_date, meal_type, total_calories, total_proteins, total_fats, total_carbs, portions_count)
+    SELECT
+        consumption_date,
+        meal_type,
+        SUM(calories),
+        SUM(proteins),
+        SUM(fats),
+        SUM(carbs),
+        COUNT(*)
+    FROM nutrition.consumed
+    WHERE (p_from IS NULL OR consumption_date >= p_from)
+      AND (p_to IS NULL OR consumption_date <= p_to)
+    GROUP BY 1, 2;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    PERFORM nutrition.touch_change_version('stats');
+    RETURN v_rows;
+END;
+$$;
+
+
+-- 10. get_nutrition_range(DATE, DATE, TEXT) — статистика за период по дням, неделям или месяцам
+-- Одна группировка по daily_meal_rollup; пустые интервалы добавляет generate_series.
+-- Недели начинаются с понедельника; крайние интервалы обрезаются до [p_from, p_to].
+CREATE OR REPLACE FUNCTION nutrition.get_nutrition_range(
+    p_from DATE,
+    p_to DATE,
+    p_bucket TEXT DEFAULT 'day'
+)
+RETURNS TABLE (
+    bucket_start DATE,
+    bucket_end DATE,
+    calories NUMERIC,
+    proteins NUMERIC,
+    fats NUMERIC,
+    carbs NUMERIC,
+    meals JSONB
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH buckets AS (
+        SELECT
+            b::date AS bucket,
+            GREATEST(b::date, p_from) AS bucket_start,
+            LEAST((b + ('1 ' || p_bucket)::interval)::date - 1, p_to) AS bucket_end
+        FROM generate_series(date_trunc(p_bucket, p_from::timestamp), p_to::timestamp, ('1 ' || p_bucket)::interval) AS b
+    ),
+    meal_data AS (
+        SELECT
+            date_trunc(p_bucket, consumption_date::timestamp)::date AS bucket,
+            meal_type,
+            SUM(total_calories) AS calories,
+            SUM(total_proteins) AS proteins,
+            SUM(total_fats) AS fats,
+            SUM(total_carbs) AS carbs,
+            SUM(portions_count) AS portions_count
+        FROM nutrition.daily_meal_rollup
+        WHERE consumption_date BETWEEN p_from AND p_to
+        GROUP BY 1, 2
+    )
+    SELECT
+        b.bucket_start,
+        b.bucket_end,
+        COALESCE(SUM(m.calories), 0),
+        COALESCE(SUM(m.proteins), 0),
+        COALESCE(SUM(m.fats), 0),
+        COALESCE(SUM(m.carbs), 0),
+        COALESCE(
+            jsonb_agg(jsonb_build_object(
+                'meal_type', m.meal_type,
+                'calories', m.calories,
+                'proteins', m.proteins,
+                'fats', m.fats,
+                'carbs', m.carbs,
+                'portions_count', m.portions_count
+            ) ORDER BY m.meal_type) FILTER (WHERE m.meal_type IS NOT NULL),
+            '[]'::jsonb
+        )
+    FROM buckets b
+    LEFT JOIN meal_data m ON m.bucket = b.bucket
+    GROUP BY b.bucket, b.bucket_start, b.bucket_end
+    ORDER BY b.bucket;
+$$;
+
+
+-- 11. dish_weight_mode() / set_dish_weight_mode(TEXT) — режим учета остатка блюд
+-- 'row' (по умолчанию): каждая порция блокирует и переписывает строку cooked_dishes (триггеры d и g).
+-- 'ledger': порции дописывают dish_weight_ledger под advisory-блокировкой блюда (триггеры k), строка
+-- cooked_dishes обновляется только при свертке журнала. Переключение ждет завершения текущих записей в consumed;
+-- при возврате в 'row' журнал сворачивается.
+CREATE OR REPLACE FUNCTION nutrition.dish_weight_mode()
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT CASE WHEN tgenabled = 'D' THEN 'row' ELSE 'ledger' END
+    FROM pg_trigger
+    WHERE tgrelid = 'nutrition.consumed'::regclass
+      AND tgname = 'trg_calculate_consumed_nutrition_ledger';
+$$;
+
+CREATE OR REPLACE FUNCTION nutrition.set_dish_weight_mode(p_mode TEXT)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF p_mode = 'ledger' THEN
+        ALTER TABLE nutrition.consumed DISABLE TRIGGER trg_calculate_consumed_nutrition;
+        ALTER TABLE nutrition.consumed DISABLE TRIGGER trg_restore_dish_weight_on_delete;
+        ALTER TABLE nutrition.consumed ENABLE TRIGGER trg_calculate_consumed_nutrition_ledger;
+        ALTER TABLE nutrition.consumed ENABLE TRIGGER trg_restore_dish_weight_ledger;
+    ELSIF p_mode = 'row' THEN
+        ALTER TABLE nutrition.consumed DISABLE TRIGGER trg_calculate_consumed_nutrition_ledger;
+        ALTER TABLE nutrition.consumed DISABLE TRIGGER trg_restore_dish_weight_ledger;
+        ALTER TABLE nutrition.consumed ENABLE TRIGGER trg_calculate_consumed_nutrition;
+        ALTER TABLE nutrition.consumed ENABLE TRIGGER trg_restore_dish_weight_on_delete;
+        PERFORM nutrition.compact_dish_weight_ledger();
+    ELSE
+        RAISE EXCEPTION 'Неизвестный режим учета остатка блюд: % (ожидается row или ledger).', p_mode;
+    END IF;
+END;
+$$;
+
+
+-- 12. compact_dish_weight_ledger() — свертка журнала остатков в cooked_dishes.remaining_weight
+-- Одним оператором удаляет зафиксированные строки журнала и прибавляет их суммы к остатку блюд:
+-- сумма remaining_weight + журнал не меняется, поэтому параллельные порции не требуют блокировок.
+-- Строки незавершенных транзакций остаются до следующей свертки. Возвращает число обновленных блюд.
+-- Вызывается API периодически (DISH_WEIGHT_LEDGER_COMPACT_INTERVAL); можно повесить на pg_cron.
+CREATE OR REPLACE FUNCTION nutrition.compact_dish_weight_ledger()
+RETURNS INT
+LANGUAGE sql
+AS $$
+    WITH moved AS (
+        DELETE FROM nutrition.dish_weight_ledger
+        RETURNING cooked_dish_id, delta
+    ),
+    totals AS (
+        SELECT cooked_dish_id, SUM(delta) AS delta
+        FROM moved
+        GROUP BY cooked_dish_id
+    ),
+    updated AS (
+        UPDATE nutrition.cooked_dishes cd
+        SET remaining_weight = cd.remaining_weight + t.delta
+        FROM totals t
+        WHERE cd.id = t.cooked_dish_id
+        RETURNING cd.id
+    )
+    SELECT COUNT(*)::INT FROM updated;
+$$;
+
+
+-- 13. lock_cooked_dishes(BIGINT[]) — блокировка блюд перед пакетной записью порций
+-- Берет те же блокировки, что и триггер текущего режима (строки cooked_dishes или advisory по id),
+-- в порядке id, чтобы параллельные пакеты не ждали друг друга по кругу.
+CREATE OR REPLACE FUNCTION nutrition.lock_cooked_dishes(p_cooked_dish_ids BIGINT[])
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_id BIGINT;
+BEGIN
+    IF nutrition.dish_weight_mode() = 'ledger' THEN
+        FOR v_id IN SELECT DISTINCT unnest(p_cooked_dish_ids) ORDER BY 1 LOOP
+            PERFORM pg_advisory_xact_lock(v_id);
+        END LOOP;
+    ELSE
+        PERFORM 1 FROM nutrition.cooked_dishes
+        WHERE id = ANY(p_cooked_dish_ids)
+        ORDER BY id
+        FOR UPDATE;
+    END IF;
+END;
+$$;
@@ -1,79 +1,304 @@
+import asyncio
+import logging
 import os
-import requests
-from dotenv import load_dotenv
+import time
 from datetime import date
+from types import ModuleType
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 API_URL = os.getenv("NUTRITION_API_URL")
+# "http" sends requests to API_URL; "embedded" runs the API's service layer in this process (embedded.py)
+API_MODE = os.getenv("NUTRITION_API_MODE", "http")
+# Seconds per call; lists and summaries should answer fast, writes may wait for locks
+READ_TIMEOUT = float(os.getenv("NUTRITION_API_READ_TIMEOUT", "5"))
+WRITE_TIMEOUT = float(os.getenv("NUTRITION_API_WRITE_TIMEOUT", "10"))
+# Keep-alive connections shared by all chats
+MAX_CONNECTIONS = int(os.getenv("NUTRITION_API_MAX_CONNECTIONS", "20"))
+# After this many failed calls in a row the API is not called for BREAKER_RESET_TIMEOUT seconds
+BREAKER_FAILURES = int(os.getenv("NUTRITION_API_BREAKER_FAILURES", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("NUTRITION_API_BREAKER_RESET_TIMEOUT", "30"))
+# Seconds the recipe and remaining dish lists are reused for; 0 turns the cache off
+CACHE_TTL = float(os.getenv("BOT_CACHE_TTL", "60"))
+# Recipes per call while get_recipes() reads all pages
+RECIPE_PAGE_SIZE = int(os.getenv("BOT_RECIPE_PAGE_SIZE", "100"))
+# Most recently cooked dishes with remaining portions that are offered (/dishes/remaining/brief has no pages)
+MAX_REMAINING_DISHES = int(os.getenv("BOT_MAX_REMAINING_DISHES", "100"))
 
-def search_recipes(query: str):
-    """Search for recipes in the Nutrition API."""
-    try:
-        response = requests.get(f"{API_URL}/recipes/", params={"search": query, "limit": 5}, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-    except requests.exceptions.RequestException:
-        pass
-    return []
-
-def get_recipes():
-    """Get a list of all recipes."""
-    try:
-        response = requests.get(f"{API_URL}/recipes/", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-    except requests.exceptions.RequestException:
-        pass
-    return []
-
-def get_remaining_dishes():
-    """Get a list of dishes with remaining portions."""
+
+class CircuitBreaker:
+    """
+    Counts failed calls (network errors, timeouts, 5xx) in a row. Once there are
+    `failures` of them the circuit opens: calls fail at once instead of waiting
+    for their timeouts. After `reset_timeout` seconds one call is let through;
+    its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failures: int, reset_timeout: float):
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.failed = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.trial or time.monotonic() - self.opened_at < self.reset_timeout:
+            return False
+        self.trial = True
+        return True
+
+    def record_success(self) -> None:
+        self.failed = 0
+        self.opened_at = None
+        self.trial = False
+
+    def release_trial(self) -> None:
+        """
+        Frees the slot of a trial call that was cancelled before it had an outcome.
+        """
+        self.trial = False
+
+    def record_failure(self) -> None:
+        self.failed += 1
+        self.trial = False
+        if self.failed >= self.failures:
+            if self.opened_at is None:
+                logger.warning("Nutrition API failed %d times in a row, pausing calls for %.0f s", self.failed, self.reset_timeout)
+            self.opened_at = time.monotonic()
+
+
+class TTLCache:
+    """
+    Per-process cache of read responses. Entries expire after `ttl` seconds;
+    writes made through this module drop the entries they change at once, so
+    the chat that logged a dish or a portion sees it in its next keyboard.
+    Changes made elsewhere (other processes, the API directly) show up after at
+    most `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.entries: Dict[Hashable, Tuple[float, Any]] = {}
+        # Bumped by invalidate(), so that a read started before a write does not put its result back
+        self.generation = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() >= entry[0]:
+            return None
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        if self.ttl > 0 and generation == self.generation:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, kind: str) -> None:
+        self.generation += 1
+        for key in [key for key in self.entries if key[0] == kind]:
+            del self.entries[key]
+
+
+class InFlightCalls:
+    """
+    Shares one call among the callers that ask for the same key while it runs,
+    e.g. the same inline query typed in several chats. The call is cancelled
+    once every caller waiting for it has been cancelled.
+    """
+
+    def __init__(self):
+        self.calls: Dict[Hashable, asyncio.Task] = {}
+        self.waiters: Dict[Hashable, int] = {}
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self.calls.get(key) is task:
+            del self.calls[key]
+            del self.waiters[key]
+
+    async def run(self, key: Hashable, make_call: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(make_call())
+            self.calls[key] = task
+            self.waiters[key] = 0
+            task.add_done_callback(lambda _: self._forget(key, task))
+        self.waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if not task.done():
+                self.waiters[key] -= 1
+                if self.waiters[key] == 0:
+                    task.cancel()
+
+
+breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_TIMEOUT)
+cache = TTLCache(CACHE_TTL)
+in_flight = InFlightCalls()
+_client: Optional[httpx.AsyncClient] = None
+_embedded: Optional[ModuleType] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Returns the client shared by all handlers, creating it on first use (inside the bot's event loop).
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=API_URL or "",
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        )
+    return _client
+
+
+def get_embedded() -> ModuleType:
+    """
+    Returns embedded.py, importing it on first use: the HTTP mode does not need the API's packages.
+    """
+    global _embedded
+    if _embedded is None:
+        import embedded
+        _embedded = embedded
+    return _embedded
+
+
+async def close() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _embedded is not None:
+        await _embedded.close()
+
+
+async def _request(method: str, path: str, expected_status: int, timeout: float, **kwargs: Any) -> Tuple[int, Any, Mapping[str, str]]:
+    """
+    Status code of a call in the current API_MODE, its decoded JSON body when the status is `expected_status`, and its headers.
+    """
+    if API_MODE == "embedded":
+        return await asyncio.wait_for(get_embedded().request(method, path, **kwargs), timeout)
+    response = await get_client().request(method, path, timeout=timeout, **kwargs)
+    return response.status_code, (response.json() if response.status_code == expected_status else None), response.headers
+
+
+async def _call_with_headers(method: str, path: str, expected_status: int, fallback: Any, timeout: float, **kwargs: Any) -> Tuple[Any, Mapping[str, str]]:
+    """
+    Returns the decoded JSON body and the headers of a response with `expected_status`, otherwise `fallback` and no headers.
+    """
+    if not breaker.allow():
+        return fallback, {}
+    trial = breaker.trial
     try:
-        response = requests.get(f"{API_URL}/dishes/remaining", timeout=10)
-        if response.status_code == 200:
-            return response.json()
-    except requests.exceptions.RequestException:
-        pass
-    return []
-
-def create_cooked_dish(recipe_id: int, initial_weight: float, final_weight: float):
+        status_code, body, headers = await _request(method, path, expected_status, timeout, **kwargs)
+    except (httpx.HTTPError, asyncio.TimeoutError) as e:
+        logger.warning("%s %s failed: %r", method, path, e)
+        breaker.record_failure()
+        return fallback, {}
+    except BaseException:
+        # Cancelled (a newer inline query, a shared call nobody waits for): neither a success nor a failure
+        if trial:
+            breaker.release_trial()
+        raise
+    if status_code >= 500:
+        breaker.record_failure()
+        return fallback, {}
+    breaker.record_success()
+    if status_code == expected_status:
+        return body, headers
+    return fallback, {}
+
+
+async def _call(method: str, path: str, expected_status: int, fallback: Any, timeout: float, **kwargs: Any) -> Any:
+    """
+    Returns the decoded JSON body of a response with `expected_status`, otherwise `fallback`.
+    """
+    body, _ = await _call_with_headers(method, path, expected_status, fallback, timeout, **kwargs)
+    return body
+
+
+async def _get_all_pages(path: str, params: Dict[str, Any]) -> Optional[list]:
+    """
+    Items of every page of a list, following X-Next-Cursor (passed back as `after_id`); None if a call fails.
+    """
+    items, cursor = [], None
+    while True:
+        page_params = {**params, "after_id": cursor} if cursor else params
+        page, headers = await _call_with_headers("GET", path, 200, None, READ_TIMEOUT, params=page_params)
+        if page is None:
+            return None
+        items += page
+        cursor = headers.get("X-Next-Cursor")
+        if not cursor:
+            return items
+
+
+async def _cached_list(key: Tuple[Any, ...], path: str, all_pages: bool = False, **kwargs: Any) -> list:
+    """
+    GET of a list (of all its pages with `all_pages`) through the cache; concurrent misses of one key share a call.
+    Failed calls are not cached.
+    """
+    items = cache.get(key)
+    if items is None:
+        generation = cache.generation
+        if all_pages:
+            items = await in_flight.run(key, lambda: _get_all_pages(path, kwargs["params"]))
+        else:
+            items = await in_flight.run(key, lambda: _call("GET", path, 200, None, READ_TIMEOUT, **kwargs))
+        if items is None:
+            return []
+        cache.put(key, items, generation)
+    return items
+
+async def search_recipes(query: str, limit: int = 5):
+    """Search for recipes (ids and names) in the Nutrition API."""
+    text = query.casefold()
+    # Names are matched as substrings, so while the query grows a cached
+    # result for its prefix that was not cut by `limit` holds every match
+    for end in range(len(text) - 1, 0, -1):
+        shorter = cache.get(("recipes", text[:end], limit))
+        if shorter is not None and len(shorter) < limit:
+            return [recipe for recipe in shorter if text in recipe["name"].casefold()]
+    return await _cached_list(("recipes", text, limit), "/recipes/brief", params={"search": query, "limit": limit})
+
+async def get_recipes():
+    """Get ids and names of all recipes, RECIPE_PAGE_SIZE per call."""
+    return await _cached_list(("recipes",), "/recipes/brief", all_pages=True, params={"limit": RECIPE_PAGE_SIZE})
+
+async def get_remaining_dishes():
+    """Get ids, recipe names and remaining weights of the MAX_REMAINING_DISHES most recently cooked dishes with remaining portions."""
+    return await _cached_list(("dishes",), "/dishes/remaining/brief", params={"limit": MAX_REMAINING_DISHES})
+
+async def create_cooked_dish(recipe_id: int, initial_weight: float, final_weight: float):
     """Create a new cooked dish."""
     data = {
         "recipe_id": recipe_id,
         "initial_weight": initial_weight,
         "final_weight": final_weight
     }
-    try:
-        response = requests.post(f"{API_URL}/dishes/", json=data, timeout=10)
-        if response.status_code == 201:
-            return response.json()
-    except requests.exceptions.RequestException:
-        pass
-    return None
-
-def get_today_summary():
+    dish = await _call("POST", "/dishes/", 201, None, WRITE_TIMEOUT, json=data)
+    cache.invalidate("dishes")
+    return dish
+
+async def get_today_summary():
     """Get the daily summary for today."""
-    try:
-        today = date.today().isoformat()
-        response = requests.get(f"{API_URL}/stats/daily_summary", params={"summary_date": today}, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-    except requests.exceptions.RequestException:
-        pass
-    return None
-
-def create_consumed_item(cooked_dish_id: int, weight_grams: float, meal_type: str):
+    today = date.today().isoformat()
+    return await _call("GET", "/stats/daily_summary", 200, None, READ_TIMEOUT, params={"summary_date": today})
+
+async def create_consumed_item(cooked_dish_id: int, weight_grams: float, meal_type: str):
     """Create a new consumed item."""
     data = {
         "cooked_dish_id": cooked_dish_id,
         "weight_grams": weight_grams,
         "meal_type": meal_type
     }
-    try:
-        response = requests.post(f"{API_URL}/consumed/", json=data, timeout=10)
-        if response.status_code == 201:
-            return response.json()
-    except requests.exceptions.RequestException:
-        pass
-    return None
+    item = await _call("POST", "/consumed/", 201, None, WRITE_TIMEOUT, json=data)
+    cache.invalidate("dishes")
+    return item
@@ -7,11 +7,16 @@ from telegram.ext import (
     CommandHandler,
     ContextTypes,
     ConversationHandler,
+    InlineQueryHandler,
     MessageHandler,
     filters,
 )
 
+import api
 from api import get_recipes, get_remaining_dishes, create_cooked_dish, create_consumed_item, get_today_summary
+from inline import inline_search
+from persistence import SharedConversationHandler, SharedStateUpdateProcessor, make_persistence
+from updates import ChatOrderedUpdateProcessor
 
 # Enable logging
 logging.basicConfig(
@@ -19,6 +24,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Updates handled at the same time, one per chat; API calls of one chat no longer hold up the others
+CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "64"))
+# Conversation states and user_data: sqlite:///bot.db or postgresql://...; kept in memory when unset
+PERSISTENCE_URL = os.getenv("BOT_PERSISTENCE_URL")
+# Public URL Telegram sends updates to; the bot polls when it is unset
+WEBHOOK_URL = os.getenv("BOT_WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("BOT_WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("BOT_WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("BOT_WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("BOT_WEBHOOK_SECRET")
+# Bot API server, e.g. the fake one of fake_telegram.py; api.telegram.org when unset
+BOT_API_URL = os.getenv("TELEGRAM_BOT_API_URL")
+
 # Conversation states
 SELECT_RECIPE, ENTER_WEIGHTS = range(2)
 SELECT_DISH, ENTER_PORTION, SELECT_MEAL_TYPE = range(3, 6)
@@ -34,7 +52,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 async def today(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Shows the nutritional summary for the current day."""
-    summary = get_today_summary()
+    summary = await get_today_summary()
     if not summary:
         await update.message.reply_text("I couldn't retrieve your summary for today. Have you logged any meals?")
         return
@@ -61,12 +79,12 @@ async def cooked_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     query = " ".join(context.args) if context.args else None
     
     if query:
-        recipes = search_recipes(query)
+        recipes = await search_recipes(query)
         if not recipes:
             await update.message.reply_text("I couldn't find any recipes matching that name. Please try again or type /cancel.")
             return ConversationHandler.END
     else:
-        recipes = get_recipes()
+        recipes = await get_recipes()
         if not recipes:
             await update.message.reply_text("I couldn't find any recipes. Please add some recipes to the database first.", reply_markup=ReplyKeyboardRemove())
             return ConversationHandler.END
@@ -103,7 +121,7 @@ async def enter_weights(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         return ENTER_WEIGHTS
 
     recipe_id = context.user_data.get('selected_recipe_id')
-    cooked_dish = create_cooked_dish(recipe_id, initial_weight, final_weight)
+    cooked_dish = await create_cooked_dish(recipe_id, initial_weight, final_weight)
 
     if cooked_dish:
         await update.message.reply_text("I've successfully logged your cooked dish!")
@@ -121,7 +139,7 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 async def ate_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Starts the 'I ate' conversation."""
-    remaining_dishes = get_remaining_dishes()
+    remaining_dishes = await get_remaining_dishes()
     if not remaining_dishes:
         await update.message.reply_text("There are no cooked dishes with remaining portions. Use /cooked to log a new dish.", reply_markup=ReplyKeyboardRemove())
         return ConversationHandler.END
@@ -176,7 +194,7 @@ async def select_meal_type(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     dish_id = context.user_data.get('selected_dish_id')
     weight = context.user_data.get('portion_weight')
 
-    consumed_item = create_consumed_item(dish_id, weight, meal_type)
+    consumed_item = await create_consumed_item(dish_id, weight, meal_type)
 
     if consumed_item:
         await update.message.reply_text("I've successfully logged what you ate!", reply_markup=ReplyKeyboardRemove())
@@ -188,7 +206,7 @@ async def select_meal_type(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
 async def left(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Shows the remaining portions of all cooked dishes."""
-    remaining_dishes = get_remaining_dishes()
+    remaining_dishes = await get_remaining_dishes()
     if not remaining_dishes:
         await update.message.reply_text("There are no cooked dishes with remaining portions.")
         return
@@ -211,6 +229,10 @@ async def set_commands(application: Application):
     ]
     await application.bot.set_my_commands(commands)
 
+async def close_api_client(application: Application):
+    """Closes the keep-alive connections to the Nutrition API."""
+    await api.close()
+
 def main() -> None:
     """Start the bot."""
     load_dotenv()
@@ -219,22 +241,34 @@ def main() -> None:
         logger.error("TELEGRAM_BOT_TOKEN not found in .env file")
         return
         
-    application = Application.builder().token(token).build()
+    builder = Application.builder().token(token)
+    if BOT_API_URL:
+        builder = builder.base_url(f"{BOT_API_URL}/bot").base_file_url(f"{BOT_API_URL}/file/bot")
+    persistence = make_persistence(PERSISTENCE_URL)
+    if persistence:
+        processor = SharedStateUpdateProcessor(CONCURRENT_UPDATES, persistence)
+        application = builder.persistence(persistence).concurrent_updates(processor).build()
+        processor.application = application
+    else:
+        application = builder.concurrent_updates(ChatOrderedUpdateProcessor(CONCURRENT_UPDATES)).build()
 
     # Set the command palette
     application.post_init = set_commands
+    application.post_shutdown = close_api_client
 
 
-    cooked_conv_handler = ConversationHandler(
+    cooked_conv_handler = SharedConversationHandler(
         entry_points=[CommandHandler("cooked", cooked_start)],
         states={
             SELECT_RECIPE: [MessageHandler(filters.TEXT & ~filters.COMMAND, select_recipe)],
             ENTER_WEIGHTS: [MessageHandler(filters.TEXT & ~filters.COMMAND, enter_weights)],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        name="cooked",
+        persistent=persistence is not None,
     )
 
-    ate_conv_handler = ConversationHandler(
+    ate_conv_handler = SharedConversationHandler(
         entry_points=[CommandHandler("ate", ate_start)],
         states={
             SELECT_DISH: [MessageHandler(filters.TEXT & ~filters.COMMAND, select_dish)],
@@ -242,6 +276,8 @@ def main() -> None:
             SELECT_MEAL_TYPE: [MessageHandler(filters.TEXT & ~filters.COMMAND, select_meal_type)],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        name="ate",
+        persistent=persistence is not None,
     )
 
     application.add_handler(CommandHandler("start", start))
@@ -249,9 +285,19 @@ def main() -> None:
     application.add_handler(CommandHandler("today", today))
     application.add_handler(cooked_conv_handler)
     application.add_handler(ate_conv_handler)
+    application.add_handler(InlineQueryHandler(inline_search))
 
     # Run the bot until the user presses Ctrl-C
-    application.run_polling()
+    if WEBHOOK_URL:
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+        )
+    else:
+        application.run_polling()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+"""
+Embedded mode of the Nutrition API client (NUTRITION_API_MODE=embedded).
+
+The bot runs the API's service layer (fastapi_app/app/services/aio) in its own
+process on the API's asyncio connection pool, instead of sending HTTP requests
+that the API would turn into the same service calls. Only the endpoints used
+by api.py are served. Each one answers with the status code, the JSON value
+and the X-Next-Cursor header the HTTP endpoint would have returned, so api.py
+treats both modes alike.
+
+The fastapi_app directory (NUTRITION_APP_PATH, by default next to this one)
+and its requirements must be available, and the bot's environment needs the
+POSTGRES_* (and optional DB_POOL_*, APP_TIMEZONE) variables of the API.
+"""
+import os
+import sys
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+APP_PATH = os.getenv("NUTRITION_APP_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fastapi_app"))
+sys.path.insert(0, APP_PATH)
+
+import psycopg  # noqa: E402
+from psycopg.pq import TransactionStatus  # noqa: E402
+from psycopg_pool import PoolTimeout  # noqa: E402
+
+from app.database.async_session import close_async_pool, open_async_pool  # noqa: E402
+from app.schemas.schemas import (  # noqa: E402
+    Consumed, ConsumedCreate, CookedDish, CookedDishCreate, DailySummary, RecipeBrief, RemainingDishBrief,
+)
+from app.services import serialization  # noqa: E402
+from app.services.aio import consumed, dishes, recipes, stats  # noqa: E402
+
+Result = Tuple[int, Any, Dict[str, str]]
+Handler = Callable[..., Awaitable[Result]]
+
+
+async def recipe_briefs(conn: psycopg.AsyncConnection, params: Dict[str, Any], json: Any) -> Result:
+    limit = int(params.get("limit", 100))
+    after_id = int(params["after_id"]) if params.get("after_id") else None
+    rows = await recipes.get_recipe_briefs(conn, params.get("search"), limit, after_id)
+    headers = {"X-Next-Cursor": str(rows[-1]["id"])} if limit > 0 and len(rows) == limit else {}
+    return 200, serialization.jsonable(rows, List[RecipeBrief]), headers
+
+
+async def remaining_dish_briefs(conn: psycopg.AsyncConnection, params: Dict[str, Any], json: Any) -> Result:
+    rows = await dishes.get_remaining_dish_briefs(conn, int(params.get("limit", 100)))
+    return 200, serialization.jsonable(rows, List[RemainingDishBrief]), {}
+
+
+async def daily_summary(conn: psycopg.AsyncConnection, params: Dict[str, Any], json: Any) -> Result:
+    summary = await stats.get_daily_summary(conn, date.fromisoformat(params["summary_date"]))
+    if summary and summary.get("meals"):
+        return 200, serialization.jsonable(summary, DailySummary), {}
+    return 404, None, {}
+
+
+async def create_cooked_dish(conn: psycopg.AsyncConnection, params: Dict[str, Any], json: Any) -> Result:
+    dish = await dishes.create_cooked_dish(conn, CookedDishCreate(**json))
+    await conn.commit()
+    return 201, serialization.jsonable(dish, CookedDish), {}
+
+
+async def create_consumed_item(conn: psycopg.AsyncConnection, params: Dict[str, Any], json: Any) -> Result:
+    item = await consumed.create_consumed_item(conn, ConsumedCreate(**json))
+    await conn.commit()
+    return 201, serialization.jsonable(item, Consumed), {}
+
+
+ROUTES: Dict[Tuple[str, str], Handler] = {
+    ("GET", "/recipes/brief"): recipe_briefs,
+    ("GET", "/dishes/remaining/brief"): remaining_dish_briefs,
+    ("GET", "/stats/daily_summary"): daily_summary,
+    ("POST", "/dishes/"): create_cooked_dish,
+    ("POST", "/consumed/"): create_consumed_item,
+}
+
+
+async def request(method: str, path: str, params: Optional[Dict[str, Any]] = None, json: Any = None) -> Result:
+    """
+    Status code, JSON value and headers of the endpoint, with the API's error mapping:
+    invalid input is 422, a database error is 400 for writes and 500 for
+    reads, and a lost connection or a pool that has none to give is 503.
+    """
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        return 404, None, {}
+    pool = await open_async_pool()
+    try:
+        conn = await pool.getconn()
+    except PoolTimeout:
+        return 503, None, {}
+    try:
+        return await handler(conn, params or {}, json)
+    except ValueError:
+        # pydantic's ValidationError included
+        return 422, None, {}
+    except psycopg.OperationalError:
+        return 503, None, {}
+    except psycopg.Error:
+        return (400 if method == "POST" else 500), None, {}
+    finally:
+        if not conn.closed and conn.info.transaction_status != TransactionStatus.IDLE:
+            await conn.rollback()
+        await pool.putconn(conn)
+
+
+async def close() -> None:
+    await close_async_pool()
@@ -0,0 +1,156 @@
+"""
+Local stand-in for Telegram to try the webhook runner without a real bot.
+
+It serves a fake Bot API that answers every method and records the messages
+the bot sends, waits until the bot's webhook accepts connections, then posts
+the given texts one by one as updates of one chat and prints each reply. With
+several --webhook URLs the updates go round-robin to them, which shows
+whether replicas share the conversation state.
+
+A text starting with "@" is an inline query ("@омл" asks for "омл"). A run of
+them is sent as keystrokes, --keystroke seconds apart, and the answers that
+come back are printed; queries replaced by a newer keystroke get none.
+
+Start it first, then the bot (or its replicas) pointed at it:
+
+    python fake_telegram.py --api-port 8081 --secret s \\
+        --webhook http://127.0.0.1:8443/telegram --webhook http://127.0.0.1:8444/telegram \\
+        /cooked "Омлет" "300, 250"
+
+    TELEGRAM_BOT_TOKEN=1:fake TELEGRAM_BOT_API_URL=http://127.0.0.1:8081 \\
+    BOT_WEBHOOK_URL=http://127.0.0.1:8443/telegram BOT_WEBHOOK_SECRET=s \\
+    BOT_PERSISTENCE_URL=sqlite:///bot.db python bot.py
+"""
+import argparse
+import itertools
+import json
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Nutrition", "username": "nutrition_bot"}
+USER = {"id": 1001, "is_bot": False, "first_name": "Test"}
+CHAT = {"id": 1001, "type": "private", "first_name": "Test"}
+
+sent_messages: "queue.Queue[str]" = queue.Queue()
+message_ids = itertools.count(1)
+
+
+class BotAPIHandler(BaseHTTPRequestHandler):
+    """
+    POST /bot<token>/<method>: getMe returns BOT_USER, sendMessage records the
+    text and returns a message, any other method returns true.
+    """
+
+    def do_POST(self):
+        method = self.path.rsplit("/", 1)[-1]
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            params = json.loads(body or "{}")
+        else:
+            params = dict(parse_qsl(body))
+
+        if method == "getMe":
+            result = BOT_USER
+        elif method == "sendMessage":
+            sent_messages.put(params["text"])
+            result = {"message_id": next(message_ids), "date": int(time.time()), "chat": CHAT, "text": params["text"]}
+        elif method == "answerInlineQuery":
+            results = params["results"]
+            titles = [item["title"] for item in (json.loads(results) if isinstance(results, str) else results)]
+            sent_messages.put(f"answer to query {params['inline_query_id']}: " + " | ".join(titles))
+            result = True
+        else:
+            result = True
+        payload = json.dumps({"ok": True, "result": result}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_inline_query(update_id, text):
+    return {"update_id": update_id, "inline_query": {"id": str(update_id), "from": USER, "query": text, "offset": ""}}
+
+
+def make_update(update_id, text):
+    message = {"message_id": next(message_ids), "date": int(time.time()), "chat": CHAT, "from": USER, "text": text}
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def post_update(webhook, secret, update):
+    request = urllib.request.Request(
+        webhook,
+        data=json.dumps(update).encode(),
+        headers={"Content-Type": "application/json", "X-Telegram-Bot-Api-Secret-Token": secret or ""},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status
+
+
+def wait_for(webhook, secret, timeout):
+    # An update with no message is accepted by the webhook and ignored by the handlers
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            post_update(webhook, secret, {"update_id": 0})
+            return
+        except (urllib.error.URLError, ConnectionError):
+            if time.monotonic() > deadline:
+                raise SystemExit(f"{webhook} did not come up in {timeout:.0f} s")
+            time.sleep(0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-port", type=int, default=8081, help="Port of the fake Bot API")
+    parser.add_argument("--webhook", action="append", required=True, help="Webhook URL of a bot replica")
+    parser.add_argument("--secret", help="BOT_WEBHOOK_SECRET of the bot")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--reply-timeout", type=float, default=10)
+    parser.add_argument("--keystroke", type=float, default=0.1, help="Seconds between inline queries in a row")
+    parser.add_argument("texts", nargs="+", help="Messages of the test user, in order")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.api_port), BotAPIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for webhook in args.webhook:
+        wait_for(webhook, args.secret, args.startup_timeout)
+
+    webhooks = itertools.cycle(args.webhook)
+    texts = list(enumerate(args.texts, start=1))
+    while texts:
+        webhook = next(webhooks)
+        if texts[0][1].startswith("@"):
+            # The whole run goes to one webhook: a replica cancels only its own stale queries
+            while texts and texts[0][1].startswith("@"):
+                update_id, text = texts.pop(0)
+                print(f"> inline query {update_id}: {text[1:]!r}    [{webhook}]")
+                post_update(webhook, args.secret, make_inline_query(update_id, text[1:]))
+                time.sleep(args.keystroke)
+        else:
+            update_id, text = texts.pop(0)
+            print(f"> {text}    [{webhook}]")
+            post_update(webhook, args.secret, make_update(update_id, text))
+        # The next message follows the reply at once, while the bot may still be storing the new state
+        try:
+            print("< " + sent_messages.get(timeout=args.reply_timeout).replace("\n", "\n  "))
+        except queue.Empty:
+            raise SystemExit(f"No reply within {args.reply_timeout:.0f} s")
+        while not sent_messages.empty():
+            print("< " + sent_messages.get().replace("\n", "\n  "))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Inline mode: `@bot <text>` lists the recipes and the remaining dishes whose
+names contain the text, updating as the user types. Choosing a recipe sends
+`/cooked <name>`, choosing a dish sends `/ate`.
+
+Telegram sends an inline query for nearly every keystroke. A query waits
+BOT_INLINE_DEBOUNCE seconds before it searches, and a newer query of the same
+user cancels the older one, whether it is still waiting or already calling the
+API. The calls themselves go through api.py, which shares identical calls
+that are in flight and answers a longer query from the cached result of its
+prefix. Remaining dishes are filtered from the cached list.
+"""
+import asyncio
+import os
+from typing import Dict, List
+
+from telegram import InlineQueryResultArticle, InputTextMessageContent, Update
+from telegram.ext import ContextTypes
+
+import api
+
+# Seconds a query waits for the next keystroke before it searches
+DEBOUNCE = float(os.getenv("BOT_INLINE_DEBOUNCE", "0.3"))
+# Recipes per answer (Telegram shows up to 50 results)
+MAX_RECIPES = int(os.getenv("BOT_INLINE_RECIPES", "20"))
+# Seconds Telegram may reuse an answer for the same text
+CACHE_TIME = int(os.getenv("BOT_INLINE_CACHE_TIME", "30"))
+
+# The running search of each user
+searches: Dict[int, asyncio.Task] = {}
+
+
+async def find(text: str) -> List[InlineQueryResultArticle]:
+    await asyncio.sleep(DEBOUNCE)
+    if text:
+        recipes, dishes = await asyncio.gather(api.search_recipes(text, MAX_RECIPES), api.get_remaining_dishes())
+    else:
+        recipes, dishes = await asyncio.gather(api.get_recipes(), api.get_remaining_dishes())
+    needle = text.casefold()
+
+    results = [
+        InlineQueryResultArticle(
+            id=f"dish-{dish['cooked_dish_id']}",
+            title=f"{dish['recipe_name']} ({dish['remaining_weight']}g left)",
+            description="Log a portion you've eaten",
+            input_message_content=InputTextMessageContent("/ate"),
+        )
+        for dish in dishes
+        if needle in dish["recipe_name"].casefold()
+    ]
+    results += [
+        InlineQueryResultArticle(
+            id=f"recipe-{recipe['id']}",
+            title=recipe["name"],
+            description="Log a dish you've cooked",
+            input_message_content=InputTextMessageContent(f"/cooked {recipe['name']}"),
+        )
+        for recipe in recipes[:MAX_RECIPES]
+    ]
+    return results[:50]
+
+
+async def inline_search(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Answers an inline query unless a newer one of the same user replaces it."""
+    query = update.inline_query
+    user_id = query.from_user.id
+    previous = searches.get(user_id)
+    if previous is not None:
+        previous.cancel()
+    search = asyncio.ensure_future(find(query.query.strip()))
+    searches[user_id] = search
+    try:
+        results = await search
+    except asyncio.CancelledError:
+        if search.cancelled() and searches.get(user_id) is not search:
+            # Replaced by a newer keystroke; its query has no answer
+            return
+        raise
+    finally:
+        if searches.get(user_id) is search:
+            del searches[user_id]
+    await query.answer(results, cache_time=CACHE_TIME)
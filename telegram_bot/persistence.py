@@ -0,0 +1,281 @@
+"""
+Conversation states and user_data of the bot kept in SQLite or PostgreSQL
+(BOT_PERSISTENCE_URL), so that a restart or a second replica behind the same
+webhook does not lose half-finished /cooked and /ate conversations.
+
+python-telegram-bot reads persisted conversation states only at startup and
+writes changes every `update_interval` seconds. With several replicas the next
+update of a chat may reach another process, so SharedStateUpdateProcessor
+reads the chat's conversation states again before each update and writes the
+changes right after it. user_data is read again through refresh_user_data().
+The updates of a chat are handled one at a time from reading the state to
+writing it: in each process by ChatOrderedUpdateProcessor, across replicas by
+an advisory lock of the chat in PostgreSQL.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional
+from urllib.parse import urlsplit
+
+from telegram import Update
+from telegram.ext import Application, BasePersistence, ConversationHandler, PersistenceInput
+
+from updates import ChatOrderedUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Connections of the PostgreSQL store; each chat handled at a time holds one while it is locked
+POOL_SIZE = int(os.getenv("BOT_PERSISTENCE_POOL_SIZE", "10"))
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS bot_state (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (kind, key)
+)
+"""
+SELECT_ONE = "SELECT value FROM bot_state WHERE kind = %s AND key = %s"
+SELECT_ALL = "SELECT key, value FROM bot_state WHERE kind = %s"
+UPSERT = "INSERT INTO bot_state (kind, key, value) VALUES (%s, %s, %s) ON CONFLICT (kind, key) DO UPDATE SET value = excluded.value"
+DELETE = "DELETE FROM bot_state WHERE kind = %s AND key = %s"
+LOCK = "SELECT pg_advisory_lock(hashtextextended(%s, 0))"
+UNLOCK = "SELECT pg_advisory_unlock(hashtextextended(%s, 0))"
+
+# The connection that holds the lock of the chat being handled; its queries use it too
+_locked_connection: ContextVar[Optional[Any]] = ContextVar("locked_connection", default=None)
+
+
+class SQLiteStore:
+    """
+    bot_state in a SQLite file; for a single bot process. Queries run in a
+    worker thread, one at a time. Replicas sharing the file would not wait for
+    each other's updates of a chat: use PostgresStore for them.
+    """
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.execute(CREATE_TABLE)
+        self.lock = threading.Lock()
+
+    def _execute(self, query: str, params: tuple) -> list:
+        with self.lock:
+            return self.conn.execute(query.replace("%s", "?"), params).fetchall()
+
+    async def execute(self, query: str, *params: Any) -> list:
+        return await asyncio.to_thread(self._execute, query, params)
+
+    @asynccontextmanager
+    async def locked(self, key: str) -> AsyncIterator[None]:
+        # One process: ChatOrderedUpdateProcessor already handles a chat at a time
+        yield
+
+    async def close(self) -> None:
+        self.conn.close()
+
+
+class PostgresStore:
+    """
+    bot_state in PostgreSQL (the search_path of the URL's user, public by default);
+    for replicas on several hosts.
+    """
+
+    def __init__(self, url: str):
+        # Not a requirement of the polling / SQLite setups
+        from psycopg_pool import AsyncConnectionPool
+        self.pool = AsyncConnectionPool(url, min_size=1, max_size=POOL_SIZE, kwargs={"autocommit": True}, open=False)
+        self.opened = False
+
+    async def _open(self) -> None:
+        if not self.opened:
+            await self.pool.open()
+            async with self.pool.connection() as conn:
+                await conn.execute(CREATE_TABLE)
+            self.opened = True
+
+    async def execute(self, query: str, *params: Any) -> list:
+        locked = _locked_connection.get()
+        if locked is not None:
+            cursor = await locked.execute(query, params)
+            return await cursor.fetchall() if cursor.description else []
+        await self._open()
+        async with self.pool.connection() as conn:
+            cursor = await conn.execute(query, params)
+            return await cursor.fetchall() if cursor.description else []
+
+    @asynccontextmanager
+    async def locked(self, key: str) -> AsyncIterator[None]:
+        """
+        Holds the session advisory lock of `key` on one connection, which the
+        queries of the block use as well (they do not wait for a second one).
+        """
+        await self._open()
+        async with self.pool.connection() as conn:
+            await conn.execute(LOCK, (key,))
+            token = _locked_connection.set(conn)
+            try:
+                yield
+            finally:
+                _locked_connection.reset(token)
+                await conn.execute(UNLOCK, (key,))
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+
+class SQLPersistence(BasePersistence):
+    """
+    Keeps user_data and conversation states as JSON rows of bot_state. Chat,
+    bot and callback data are not used by the bot and are not stored.
+
+    User ids and conversation keys are converted back to ints and tuples on
+    load; inside user_data only JSON values with string keys survive the trip.
+    """
+
+    def __init__(self, store: Any, update_interval: float = 60):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.store = store
+
+    async def _put(self, kind: str, key: Any, value: Any) -> None:
+        if value is None:
+            await self.store.execute(DELETE, kind, json.dumps(key))
+        else:
+            await self.store.execute(UPSERT, kind, json.dumps(key), json.dumps(value))
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        rows = await self.store.execute(SELECT_ALL, "user_data")
+        return {json.loads(key): json.loads(value) for key, value in rows}
+
+    async def get_user_data_of(self, user_id: int) -> Dict[Any, Any]:
+        rows = await self.store.execute(SELECT_ONE, "user_data", json.dumps(user_id))
+        return json.loads(rows[0][0]) if rows else {}
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        await self._put("user_data", user_id, data or None)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        await self._put("user_data", user_id, None)
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        # Another replica may have changed it since this process last saw the user
+        stored = await self.get_user_data_of(user_id)
+        user_data.clear()
+        user_data.update(stored)
+
+    async def get_conversations(self, name: str) -> Dict[tuple, object]:
+        rows = await self.store.execute(SELECT_ALL, f"conversation:{name}")
+        return {tuple(json.loads(key)): json.loads(value) for key, value in rows}
+
+    async def get_conversation(self, name: str, key: tuple) -> Optional[object]:
+        rows = await self.store.execute(SELECT_ONE, f"conversation:{name}", json.dumps(key))
+        return json.loads(rows[0][0]) if rows else None
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]) -> None:
+        await self._put(f"conversation:{name}", key, new_state)
+
+    async def get_chat_data(self) -> Dict[int, Any]:
+        return {}
+
+    async def update_chat_data(self, chat_id: int, data: Any) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any) -> None:
+        pass
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return {}
+
+    async def update_bot_data(self, data: Any) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        pass
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def flush(self) -> None:
+        await self.store.close()
+
+
+def make_persistence(url: Optional[str]) -> Optional[SQLPersistence]:
+    """
+    SQLPersistence for `sqlite:///relative.db`, `sqlite:////absolute.db` or
+    `postgresql://...`; None (state in memory only) for an empty URL.
+    """
+    if not url:
+        return None
+    scheme = urlsplit(url).scheme
+    if scheme == "sqlite":
+        return SQLPersistence(SQLiteStore(url[len("sqlite:///"):]))
+    if scheme in ("postgresql", "postgres"):
+        return SQLPersistence(PostgresStore(url))
+    raise ValueError(f"Unsupported BOT_PERSISTENCE_URL scheme: {scheme!r}")
+
+
+class SharedConversationHandler(ConversationHandler):
+    """
+    ConversationHandler whose state for the chat of an update can be read again from the persistence.
+    Uses private attributes of ConversationHandler (_get_key, _conversations), hence the
+    python-telegram-bot version range in requirements.txt.
+    """
+
+    async def refresh_state(self, update: Update, persistence: SQLPersistence) -> None:
+        if not (update.effective_chat and update.effective_user):
+            return
+        key = self._get_key(update)
+        state = await persistence.get_conversation(self.name, key)
+        # Untracked, so that the loaded state is not written back
+        if state is None:
+            self._conversations.data.pop(key, None)
+        else:
+            self._conversations.update_no_track({key: state})
+
+
+class SharedStateUpdateProcessor(ChatOrderedUpdateProcessor):
+    """
+    Processes each update on the conversation states and user_data stored by
+    other replicas, and stores the changes as soon as the update is handled.
+    No other update of the chat, in this process or another, is handled in
+    between. `application` is set once the Application is built.
+    """
+
+    def __init__(self, max_concurrent_updates: int, persistence: SQLPersistence):
+        super().__init__(max_concurrent_updates)
+        self.persistence = persistence
+        self.application: Optional[Application] = None
+
+    async def handle(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat_id = self.chat_id(update)
+        if chat_id is None:
+            # Inline queries: no conversation state to read
+            await super().handle(update, coroutine)
+            await self.application.update_persistence()
+            return
+        async with self.persistence.store.locked(f"chat:{chat_id}"):
+            try:
+                for handlers in self.application.handlers.values():
+                    for handler in handlers:
+                        if isinstance(handler, SharedConversationHandler):
+                            await handler.refresh_state(update, self.persistence)
+            except Exception:
+                logger.exception("Could not load the stored conversation state, using the one in memory")
+            await super().handle(update, coroutine)
+            await self.application.update_persistence()
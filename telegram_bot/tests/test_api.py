@@ -0,0 +1,207 @@
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import api  # noqa: E402
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+@pytest.fixture
+def calls(monkeypatch):
+    """
+    Replaces api._request: each call is recorded and answered by the next item
+    of `calls.responses`, either a (status, body, headers) tuple, an exception
+    to raise or a coroutine function to await.
+    """
+    class Calls(list):
+        def __init__(self):
+            super().__init__()
+            self.responses = []
+
+    recorded = Calls()
+
+    async def request(method, path, expected_status, timeout, **kwargs):
+        recorded.append((method, path, timeout, kwargs))
+        response = recorded.responses.pop(0)
+        if isinstance(response, BaseException):
+            raise response
+        if callable(response):
+            return await response()
+        return response
+
+    monkeypatch.setattr(api, "_request", request)
+    monkeypatch.setattr(api, "breaker", api.CircuitBreaker(2, 30))
+    monkeypatch.setattr(api, "cache", api.TTLCache(60))
+    monkeypatch.setattr(api, "in_flight", api.InFlightCalls())
+    return recorded
+
+def test_breaker_releases_a_cancelled_trial_call(calls, monkeypatch):
+    calls.responses = [httpx.ConnectError("down"), httpx.ConnectError("down")]
+    for _ in range(2):
+        assert run(api._call("GET", "/recipes/brief", 200, None, 1)) is None
+    assert not api.breaker.allow()
+
+    # The reset timeout has passed: the trial call is cancelled, e.g. by a newer inline query
+    monkeypatch.setattr(api.breaker, "opened_at", api.breaker.opened_at - 30)
+    async def hang():
+        await asyncio.sleep(10)
+    calls.responses = [hang]
+
+    async def cancel_trial():
+        call = asyncio.ensure_future(api._call("GET", "/recipes/brief", 200, None, 1))
+        await asyncio.sleep(0)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+    run(cancel_trial())
+    assert (api.breaker.trial, api.breaker.failed) == (False, 2)
+
+    # The next call is the trial instead, and its success closes the circuit
+    calls.responses = [(200, [], {})]
+    assert run(api._call("GET", "/recipes/brief", 200, None, 1)) == []
+    assert api.breaker.opened_at is None
+
+def test_breaker_opens_lets_one_trial_through_and_closes(calls, monkeypatch):
+    calls.responses = [(503, None, {}), httpx.ConnectError("down")]
+    for _ in range(2):
+        assert run(api._call("GET", "/recipes/brief", 200, [], 1)) == []
+    assert api.breaker.opened_at is not None
+
+    # Open: fails at once without calling the API
+    assert run(api._call("GET", "/recipes/brief", 200, [], 1)) == []
+    assert len(calls) == 2
+
+    # After the reset timeout one trial call goes through; its failure opens the circuit again
+    monkeypatch.setattr(api.breaker, "opened_at", api.breaker.opened_at - 30)
+    assert api.breaker.allow() and not api.breaker.allow()
+    api.breaker.release_trial()
+    calls.responses = [asyncio.TimeoutError()]
+    assert run(api._call("GET", "/recipes/brief", 200, [], 1)) == []
+    assert len(calls) == 3 and not api.breaker.allow()
+
+    # A successful trial closes it
+    monkeypatch.setattr(api.breaker, "opened_at", api.breaker.opened_at - 30)
+    calls.responses = [(200, [{"id": 1, "name": "Омлет"}], {})]
+    assert run(api._call("GET", "/recipes/brief", 200, [], 1)) == [{"id": 1, "name": "Омлет"}]
+    assert (api.breaker.opened_at, api.breaker.failed, api.breaker.trial) == (None, 0, False)
+
+def test_reads_and_writes_have_their_own_timeouts(calls):
+    calls.responses = [(200, {"date": "2030-01-01"}, {}), (201, {"id": 7}, {})]
+    run(api.get_today_summary())
+    assert run(api.create_cooked_dish(1, 500, 450)) == {"id": 7}
+    assert [(method, timeout) for method, _, timeout, _ in calls] == [("GET", api.READ_TIMEOUT), ("POST", api.WRITE_TIMEOUT)]
+
+def test_failed_calls_return_the_fallback(calls):
+    # A timed out call counts as a failure of the API, a 4xx answer does not
+    calls.responses = [asyncio.TimeoutError(), (404, None, {}), (500, None, {})]
+    assert run(api.get_today_summary()) is None
+    assert api.breaker.failed == 1
+    assert run(api.create_consumed_item(1, 100, "lunch")) is None
+    assert api.breaker.failed == 0
+    assert run(api.get_remaining_dishes()) == []
+    assert api.breaker.failed == 1
+    # Failed lists are not cached
+    calls.responses = [(200, [{"cooked_dish_id": 1}], {})]
+    assert run(api.get_remaining_dishes()) == [{"cooked_dish_id": 1}]
+    assert run(api.get_remaining_dishes()) == [{"cooked_dish_id": 1}]
+    assert len(calls) == 4
+
+def test_a_read_started_before_a_write_is_not_cached(calls):
+    async def read_during_write():
+        read_started, write_done = asyncio.Event(), asyncio.Event()
+
+        async def slow_list():
+            read_started.set()
+            await write_done.wait()
+            return 200, [{"cooked_dish_id": 1, "remaining_weight": 500}], {}
+
+        calls.responses = [slow_list, (201, {"id": 1}, {})]
+        read = asyncio.ensure_future(api.get_remaining_dishes())
+        await read_started.wait()
+        await api.create_consumed_item(1, 100, "lunch")
+        write_done.set()
+        return await read
+
+    assert run(read_during_write())[0]["remaining_weight"] == 500
+    # The list read before the portion was logged is not reused
+    calls.responses = [(200, [{"cooked_dish_id": 1, "remaining_weight": 400}], {})]
+    assert run(api.get_remaining_dishes())[0]["remaining_weight"] == 400
+    assert len(calls) == 3
+
+def test_get_recipes_follows_the_cursor(calls):
+    calls.responses = [
+        (200, [{"id": 1}, {"id": 2}], {"X-Next-Cursor": "2"}),
+        (200, [{"id": 3}], {}),
+    ]
+    assert run(api.get_recipes()) == [{"id": 1}, {"id": 2}, {"id": 3}]
+    assert [kwargs["params"] for _, _, _, kwargs in calls] == [
+        {"limit": api.RECIPE_PAGE_SIZE},
+        {"limit": api.RECIPE_PAGE_SIZE, "after_id": "2"},
+    ]
+    # Cached as a whole
+    assert run(api.get_recipes()) == [{"id": 1}, {"id": 2}, {"id": 3}]
+    assert len(calls) == 2
+
+def test_get_recipes_fails_as_a_whole(calls):
+    calls.responses = [(200, [{"id": 1}], {"X-Next-Cursor": "1"}), (503, None, {})]
+    assert run(api.get_recipes()) == []
+    assert api.cache.get(("recipes",)) is None
+
+def test_in_flight_calls_are_shared_until_nobody_waits(calls):
+    cancelled = []
+
+    async def share_and_abandon():
+        release = asyncio.Event()
+
+        async def slow_search():
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return 200, [{"id": 1, "name": "Омлет"}], {}
+
+        calls.responses = [slow_search, slow_search]
+        first = asyncio.ensure_future(api.search_recipes("Омлет"))
+        second = asyncio.ensure_future(api.search_recipes("Омлет"))
+        await asyncio.sleep(0.01)
+        # One of the callers goes away: the call goes on for the other
+        first.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        shared = await second
+        assert len(calls) == 1 and not cancelled
+
+        # Once every caller is cancelled, so is the call
+        release.clear()
+        waiters = [asyncio.ensure_future(api.search_recipes("Суп")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.sleep(0.01)
+        return shared
+
+    assert run(share_and_abandon()) == [{"id": 1, "name": "Омлет"}]
+    assert len(calls) == 2 and cancelled == [True]
+    assert api.in_flight.calls == {} and api.in_flight.waiters == {}
+
+def test_search_recipes_answers_longer_queries_from_a_cached_prefix(calls):
+    calls.responses = [(200, [{"id": 1, "name": "Омлет"}, {"id": 2, "name": "Ом-суп"}], {})]
+    assert len(run(api.search_recipes("Ом", limit=5))) == 2
+    assert run(api.search_recipes("омл", limit=5)) == [{"id": 1, "name": "Омлет"}]
+    assert len(calls) == 1
+
+    # A prefix result cut by the limit may miss matches: the API is asked
+    calls.responses = [
+        (200, [{"id": 1, "name": "Омлет"}, {"id": 2, "name": "Ом-суп"}], {}),
+        (200, [{"id": 1, "name": "Омлет"}, {"id": 3, "name": "Омлет с сыром"}], {}),
+    ]
+    assert len(run(api.search_recipes("Ом", limit=2))) == 2
+    assert len(run(api.search_recipes("Омл", limit=2))) == 2
+    assert len(calls) == 3 and calls[-1][3]["params"] == {"search": "Омл", "limit": 2}
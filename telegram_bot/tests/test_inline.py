@@ -0,0 +1,45 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import inline  # noqa: E402
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_a_newer_query_cancels_the_older_one(monkeypatch):
+    searched, answers = [], []
+
+    async def search_recipes(text, limit):
+        searched.append(text)
+        await asyncio.sleep(0.05)
+        return [{"id": 1, "name": "Омлет"}]
+
+    async def get_remaining_dishes():
+        return [{"cooked_dish_id": 2, "recipe_name": "Омлет", "remaining_weight": 300}]
+
+    monkeypatch.setattr(inline, "DEBOUNCE", 0.02)
+    monkeypatch.setattr(inline.api, "search_recipes", search_recipes)
+    monkeypatch.setattr(inline.api, "get_remaining_dishes", get_remaining_dishes)
+
+    def update(text):
+        async def answer(results, cache_time):
+            answers.append((text, [result.title for result in results]))
+        return SimpleNamespace(inline_query=SimpleNamespace(query=text, from_user=SimpleNamespace(id=1001), answer=answer))
+
+    async def type_query():
+        # "О" is replaced while it waits, "Ом" while it calls the API
+        first = asyncio.ensure_future(inline.inline_search(update("О"), None))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(inline.inline_search(update("Ом"), None))
+        await asyncio.sleep(0.04)
+        third = asyncio.ensure_future(inline.inline_search(update("Омл"), None))
+        await asyncio.gather(first, second, third)
+
+    run(type_query())
+    assert searched == ["Ом", "Омл"]
+    assert answers == [("Омл", ["Омлет (300g left)", "Омлет"])]
+    assert inline.searches == {}
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from telegram import Update, User  # noqa: E402
+from telegram.ext import Application, CommandHandler, ConversationHandler, ExtBot, MessageHandler, filters  # noqa: E402
+
+from persistence import SharedConversationHandler, SharedStateUpdateProcessor, SQLiteStore, SQLPersistence, make_persistence  # noqa: E402
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_user_data_round_trip(tmp_path):
+    persistence = SQLPersistence(SQLiteStore(str(tmp_path / "bot.db")))
+    user_data = {"recipes": [{"id": 3, "name": "Омлет"}], "selected_recipe": {"id": 3, "name": "Омлет"}, "weight": 300.0}
+    run(persistence.update_user_data(1001, user_data))
+    run(persistence.update_user_data(1002, {"weight": 250.0}))
+
+    # User ids are stored as JSON text and come back as ints
+    assert run(persistence.get_user_data()) == {1001: user_data, 1002: {"weight": 250.0}}
+    assert run(persistence.get_user_data_of(1001)) == user_data
+
+    in_memory = {"stale": True}
+    run(persistence.refresh_user_data(1001, in_memory))
+    assert in_memory == user_data
+
+    # Empty user_data is not kept
+    run(persistence.update_user_data(1002, {}))
+    run(persistence.drop_user_data(1001))
+    assert run(persistence.get_user_data()) == {}
+    run(persistence.flush())
+
+def test_conversation_round_trip(tmp_path):
+    path = str(tmp_path / "bot.db")
+    persistence = make_persistence(f"sqlite:///{path}")
+    run(persistence.update_conversation("cooked", (1001, 1001), 1))
+    run(persistence.update_conversation("cooked", (1002, 1002), 2))
+    run(persistence.update_conversation("ate", (1001, 1001), 0))
+    run(persistence.flush())
+
+    # Another process (here: a new persistence on the same file) sees tuple keys, not JSON lists
+    persistence = make_persistence(f"sqlite:///{path}")
+    assert run(persistence.get_conversations("cooked")) == {(1001, 1001): 1, (1002, 1002): 2}
+    assert run(persistence.get_conversation("cooked", (1001, 1001))) == 1
+    assert run(persistence.get_conversation("ate", (1001, 1001))) == 0
+
+    # A finished conversation (state None) is removed
+    run(persistence.update_conversation("cooked", (1001, 1001), None))
+    assert run(persistence.get_conversation("cooked", (1001, 1001))) is None
+    assert run(persistence.get_conversations("cooked")) == {(1002, 1002): 2}
+    run(persistence.flush())
+
+def test_back_to_back_messages_of_a_chat(tmp_path, monkeypatch):
+    persistence = make_persistence(f"sqlite:///{tmp_path / 'bot.db'}")
+    processor = SharedStateUpdateProcessor(8, persistence)
+    application = Application.builder().token("1:fake").updater(None).persistence(persistence).concurrent_updates(processor).build()
+    processor.application = application
+    handled = []
+
+    async def start(update, context):
+        # Replies (and lets the next message in) before the state is stored
+        await asyncio.sleep(0.05)
+        handled.append(("start", update.message.text))
+        return 1
+
+    async def weight(update, context):
+        handled.append(("weight", update.message.text))
+        return ConversationHandler.END
+
+    application.add_handler(SharedConversationHandler(
+        entry_points=[CommandHandler("cooked", start)],
+        states={1: [MessageHandler(filters.TEXT & ~filters.COMMAND, weight)]},
+        fallbacks=[],
+        name="cooked",
+        persistent=True,
+    ))
+
+    async def get_me(self, *args, **kwargs):
+        # Bot.initialize() keeps the user that get_me() stores
+        self._bot_user = User(id=1, first_name="Nutrition", is_bot=True, username="nutrition_bot")
+        return self._bot_user
+    monkeypatch.setattr(ExtBot, "get_me", get_me)
+
+    def message(update_id, text):
+        data = {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id, "date": 0, "text": text,
+                "chat": {"id": 1001, "type": "private"}, "from": {"id": 1001, "is_bot": False, "first_name": "Test"},
+            },
+        }
+        if text.startswith("/"):
+            data["message"]["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+        return Update.de_json(data, application.bot)
+
+    async def send_both():
+        await application.initialize()
+        try:
+            updates = [message(1, "/cooked"), message(2, "300")]
+            await asyncio.gather(*(processor.process_update(update, application.process_update(update)) for update in updates))
+        finally:
+            await application.shutdown()
+
+    run(send_both())
+    # The weight waited for the state that /cooked stored
+    assert handled == [("start", "/cooked"), ("weight", "300")]
+    assert run(make_persistence(f"sqlite:///{tmp_path / 'bot.db'}").get_conversations("cooked")) == {}
@@ -0,0 +1,47 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from telegram import Chat, InlineQuery, Message, Update, User  # noqa: E402
+
+from updates import ChatOrderedUpdateProcessor  # noqa: E402
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def message(update_id, chat_id):
+    user = User(id=chat_id, first_name="Test", is_bot=False)
+    chat = Chat(id=chat_id, type=Chat.PRIVATE)
+    return Update(update_id, message=Message(update_id, datetime.now(timezone.utc), chat, from_user=user, text=str(update_id)))
+
+def inline_query(update_id, user_id):
+    user = User(id=user_id, first_name="Test", is_bot=False)
+    return Update(update_id, inline_query=InlineQuery(str(update_id), user, str(update_id), ""))
+
+def test_updates_of_one_chat_are_handled_in_order():
+    processor = ChatOrderedUpdateProcessor(8)
+    events = []
+
+    async def handle(name, delay):
+        events.append(f"{name} start")
+        await asyncio.sleep(delay)
+        events.append(f"{name} end")
+
+    async def process_all():
+        updates = [
+            (message(1, 1001), handle("1001 first", 0.05)),
+            (message(2, 1001), handle("1001 second", 0)),
+            (message(3, 1002), handle("1002", 0)),
+            (inline_query(4, 1001), handle("inline", 0)),
+        ]
+        await asyncio.gather(*(processor.process_update(update, coroutine) for update, coroutine in updates))
+
+    run(process_all())
+    # The second message of 1001 waits for the first; the other chat and the inline query do not
+    assert events.index("1001 second start") > events.index("1001 first end")
+    assert events.index("1002 end") < events.index("1001 first end")
+    assert events.index("inline end") < events.index("1001 first end")
+    assert processor.locks == {} and processor.waiting == {}
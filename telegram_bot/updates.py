@@ -0,0 +1,65 @@
+"""
+Concurrent handling of updates that keeps the order within a chat.
+
+With `concurrent_updates(n)` python-telegram-bot handles any n updates at the
+same time. A ConversationHandler reads the state of a chat when an update
+starts and sets it when the update is handled, so two quick messages of one
+chat (a weight typed right after choosing the recipe) would both be handled in
+the state before the first one. ChatOrderedUpdateProcessor handles the
+updates of different chats concurrently and the updates of one chat one after
+another, in the order they arrive.
+"""
+import asyncio
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Handles at most `max_concurrent_updates` updates at a time and one update
+    per chat. Updates without a chat (inline queries) are not ordered: a newer
+    inline query cancels the search of the older one (inline.py) instead of
+    waiting for it.
+
+    Subclasses extend handle(), which for an update with a chat runs while no
+    other update of the chat is handled.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self.locks: Dict[int, asyncio.Lock] = {}
+        # Updates of each chat that hold or wait for its lock; the lock is dropped with the last one
+        self.waiting: Dict[int, int] = {}
+
+    @staticmethod
+    def chat_id(update: object) -> Optional[int]:
+        if isinstance(update, Update) and update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+    async def handle(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat_id = self.chat_id(update)
+        if chat_id is None:
+            await self.handle(update, coroutine)
+            return
+        lock = self.locks.setdefault(chat_id, asyncio.Lock())
+        self.waiting[chat_id] = self.waiting.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                await self.handle(update, coroutine)
+        finally:
+            self.waiting[chat_id] -= 1
+            if not self.waiting[chat_id]:
+                del self.waiting[chat_id]
+                del self.locks[chat_id]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
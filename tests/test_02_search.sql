@@ -39,5 +39,32 @@ SELECT * FROM nutrition.search_ingredients('консервы из тунца', 1
 SELECT * FROM nutrition.search_ingredients('масло', 3);
 
 
+-- 6. Поиск по только что добавленному синониму
+-- Поисковый документ пересобирается триггером, должен найти "Огурец"
+\echo '--- 6. Поиск по новому синониму "корнишон" ---'
+INSERT INTO ingredient_synonyms (ingredient_id, synonym, synonym_normalized)
+VALUES ((SELECT id FROM ingredients WHERE name = 'Огурец'), 'Корнишон', '');
+SELECT search_document FROM ingredients WHERE name = 'Огурец';
+SELECT * FROM nutrition.search_ingredients('корнишон', 1);
+
+
+-- 7. После удаления синонима он пропадает из поискового документа
+\echo '--- 7. Удаление синонима "корнишон" ---'
+DELETE FROM ingredient_synonyms WHERE synonym = 'Корнишон';
+SELECT search_document FROM ingredients WHERE name = 'Огурец';
+
+
+-- 8. Мягко удаленные ингредиенты не попадают в выдачу
+\echo '--- 8. Поиск по мягко удаленному ингредиенту "банан" (пусто) ---'
+UPDATE ingredients SET deleted_at = NOW() WHERE name = 'Банан';
+SELECT * FROM nutrition.search_ingredients('банан', 1) WHERE name = 'Банан';
+
+
+-- 9. Пакетный поиск
+-- Для каждого запроса — свои лучшие совпадения, в порядке запросов; "ёжик" ничего не находит
+\echo '--- 9. Пакетный поиск "огурец", "ёжик", "гречкаа" ---'
+SELECT * FROM nutrition.search_ingredients_batch(ARRAY['огурец', 'ёжик', 'гречкаа'], 2);
+
+
 ROLLBACK;
 \echo 'Тесты поиска завершены. Все изменения отменены.'
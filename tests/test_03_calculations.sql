@@ -99,5 +99,69 @@ WHERE id = (SELECT currval(pg_get_serial_sequence('cooked_dishes','id')));
 SELECT * FROM daily_stats WHERE consumption_date = CURRENT_DATE;
 
 
+-- 9. Сутки считаются в часовом поясе nutrition.timezone
+--    2025-03-01 22:30 UTC — это уже 2 марта по Москве (UTC+3)
+\echo '--- 6. get_daily_summary и nutrition.timezone ---'
+SET LOCAL nutrition.timezone = 'Europe/Moscow';
+INSERT INTO consumed (cooked_dish_id, consumed_at, meal_type, weight_grams)
+VALUES ((SELECT currval(pg_get_serial_sequence('cooked_dishes','id'))), '2025-03-01 22:30+00', 'snack', 10);
+
+SELECT
+    get_daily_summary('2025-03-01')->'total_nutrition'->>'calories' AS moscow_march_1,
+    get_daily_summary('2025-03-02')->'total_nutrition'->>'calories' AS moscow_march_2;
+
+-- После смены часового пояса daily_meal_rollup пересчитывается
+SET LOCAL nutrition.timezone = 'UTC';
+SELECT rebuild_daily_meal_rollup('2025-03-01', '2025-03-02') AS rebuilt_rows;
+SELECT
+    get_daily_summary('2025-03-01')->'total_nutrition'->>'calories' AS utc_march_1,
+    get_daily_summary('2025-03-02')->'total_nutrition'->>'calories' AS utc_march_2;
+
+
+-- 10. Перенос строк из consumed_default в новую месячную секцию
+--     Перенос не должен менять остаток блюда (триггеры consumed_default отключены на время переноса)
+\echo '--- 7. ensure_consumed_partitions: перенос из consumed_default ---'
+DO $$
+DECLARE
+    v_dish_id BIGINT := currval(pg_get_serial_sequence('nutrition.cooked_dishes', 'id'));
+    v_remaining NUMERIC;
+    v_partition TEXT;
+BEGIN
+    SELECT tableoid::regclass::text INTO v_partition FROM nutrition.consumed WHERE consumed_at = '2025-03-01 22:30+00';
+    IF v_partition <> 'consumed_default' THEN
+        RAISE EXCEPTION 'Expected the row in consumed_default, got %', v_partition;
+    END IF;
+    SELECT remaining_weight INTO v_remaining FROM nutrition.cooked_dishes WHERE id = v_dish_id;
+
+    IF nutrition.ensure_consumed_partitions('2025-03-15', 1) <> 1 THEN
+        RAISE EXCEPTION 'Partition consumed_2025_03 was not created';
+    END IF;
+    IF nutrition.ensure_consumed_partitions('2025-03-15', 1) <> 0 THEN
+        RAISE EXCEPTION 'Partition consumed_2025_03 was created twice';
+    END IF;
+
+    SELECT tableoid::regclass::text INTO v_partition FROM nutrition.consumed WHERE consumed_at = '2025-03-01 22:30+00';
+    IF v_partition <> 'consumed_2025_03' THEN
+        RAISE EXCEPTION 'Expected the row in consumed_2025_03, got %', v_partition;
+    END IF;
+    IF (SELECT remaining_weight FROM nutrition.cooked_dishes WHERE id = v_dish_id) <> v_remaining THEN
+        RAISE EXCEPTION 'Moving the row changed the remaining weight of the dish';
+    END IF;
+    IF nutrition.dish_weight_mode() <> 'row' OR EXISTS (
+        SELECT 1 FROM pg_trigger
+        WHERE tgrelid = 'nutrition.consumed_default'::regclass
+          AND tgname = 'trg_calculate_consumed_nutrition_ledger' AND tgenabled <> 'D'
+    ) THEN
+        RAISE EXCEPTION 'Moving the row enabled the triggers of the ledger mode';
+    END IF;
+END;
+$$;
+
+-- Фильтр по дню отсекает остальные секции
+EXPLAIN (COSTS OFF)
+SELECT * FROM consumed
+WHERE consumed_at >= local_day_start('2025-03-02') AND consumed_at < local_day_start('2025-03-03');
+
+
 ROLLBACK;
 \echo 'Тесты расчетов завершены. Все изменения отменены.'
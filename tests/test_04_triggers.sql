@@ -53,5 +53,202 @@ VALUES ((SELECT id FROM recipes WHERE name = 'Гречка с курицей'),
 -- SELECT times_cooked > :old_times_cooked AS updated_stat FROM recipes WHERE name = 'Гречка с курицей';
 
 
+
+-- 5. Тест кэша КБЖУ рецептов (trg_refresh_recipe_nutrition_*)
+\echo '--- 5. Тест кэша КБЖУ рецептов ---'
+-- Кэш совпадает с прямым расчетом по составу (ожидается 0 расхождений)
+CREATE TEMP VIEW recipe_nutrition_check AS
+SELECT COUNT(*) AS mismatches
+FROM recipes r
+LEFT JOIN recipe_nutrition_totals rnt ON rnt.recipe_id = r.id
+LEFT JOIN (
+    SELECT ri.recipe_id, ROUND(SUM(ri.weight_grams * i.calories / 100), 2) AS total_calories, SUM(ri.weight_grams) AS total_weight
+    FROM recipe_ingredients ri
+    JOIN ingredients i ON ri.ingredient_id = i.id
+    GROUP BY ri.recipe_id
+) live ON live.recipe_id = r.id
+WHERE (rnt.total_calories, rnt.total_weight) IS DISTINCT FROM (live.total_calories, live.total_weight);
+
+SELECT * FROM recipe_nutrition_check;
+
+-- Изменение калорийности ингредиента пересчитывает рецепты с ним
+UPDATE ingredients SET calories = calories + 100 WHERE name = 'Яйцо куриное';
+SELECT * FROM recipe_nutrition_check;
+
+-- Изменение и удаление строк состава
+UPDATE recipe_ingredients SET weight_grams = weight_grams * 2 WHERE recipe_id = (SELECT id FROM recipes WHERE name = 'Омлет');
+SELECT * FROM recipe_nutrition_check;
+DELETE FROM recipe_ingredients WHERE recipe_id = (SELECT id FROM recipes WHERE name = 'Омлет');
+SELECT * FROM recipe_nutrition_check;
+
+-- Без ингредиентов строки в кэше нет (ожидается 0)
+SELECT COUNT(*) FROM recipe_nutrition WHERE recipe_name = 'Омлет';
+
+-- 6. Тест пересчета КБЖУ блюда (trg_recalculate_dish_nutrition_*)
+\echo '--- 6. Тест пересчета КБЖУ блюда при изменении состава ---'
+INSERT INTO cooked_dishes (recipe_id, initial_weight, final_weight, remaining_weight, total_calories, total_proteins, total_fats, total_carbs)
+VALUES ((SELECT id FROM recipes WHERE name = 'Гречка с курицей'), 0, 250, 250, 0, 0, 0, 0);
+INSERT INTO cooked_dish_ingredients (cooked_dish_id, ingredient_id, weight_grams, calories, proteins, fats, carbs)
+SELECT currval(pg_get_serial_sequence('cooked_dishes', 'id')), ri.ingredient_id, ri.weight_grams, i.calories, i.proteins, i.fats, i.carbs
+FROM recipe_ingredients ri
+JOIN ingredients i ON ri.ingredient_id = i.id
+WHERE ri.recipe_id = (SELECT id FROM recipes WHERE name = 'Гречка с курицей');
+-- Ожидается 255 г (сумма состава)
+SELECT initial_weight, total_calories FROM cooked_dishes WHERE id = currval(pg_get_serial_sequence('cooked_dishes', 'id'));
+
+-- Двойной вес одного ингредиента, затем удаление всего состава (ожидаются нули)
+UPDATE cooked_dish_ingredients SET weight_grams = weight_grams * 2
+WHERE cooked_dish_id = currval(pg_get_serial_sequence('cooked_dishes', 'id'))
+  AND ingredient_id = (SELECT MIN(ingredient_id) FROM cooked_dish_ingredients WHERE cooked_dish_id = currval(pg_get_serial_sequence('cooked_dishes', 'id')));
+SELECT initial_weight, total_calories FROM cooked_dishes WHERE id = currval(pg_get_serial_sequence('cooked_dishes', 'id'));
+DELETE FROM cooked_dish_ingredients WHERE cooked_dish_id = currval(pg_get_serial_sequence('cooked_dishes', 'id'));
+SELECT initial_weight, total_calories FROM cooked_dishes WHERE id = currval(pg_get_serial_sequence('cooked_dishes', 'id'));
+
+-- 7. Тест дневной статистики (trg_apply_daily_meal_rollup_*)
+\echo '--- 7. Тест daily_meal_rollup: вставка, изменение и удаление порций ---'
+INSERT INTO cooked_dishes (recipe_id, initial_weight, final_weight, remaining_weight, total_calories, total_proteins, total_fats, total_carbs)
+VALUES ((SELECT id FROM recipes WHERE name = 'Гречка с курицей'), 0, 500, 500, 0, 0, 0, 0);
+INSERT INTO cooked_dish_ingredients (cooked_dish_id, ingredient_id, weight_grams, calories, proteins, fats, carbs)
+SELECT currval(pg_get_serial_sequence('cooked_dishes', 'id')), ri.ingredient_id, ri.weight_grams, i.calories, i.proteins, i.fats, i.carbs
+FROM recipe_ingredients ri
+JOIN ingredients i ON ri.ingredient_id = i.id
+WHERE ri.recipe_id = (SELECT id FROM recipes WHERE name = 'Гречка с курицей');
+
+CREATE TEMP VIEW rollup_mismatches AS
+SELECT COUNT(*) AS mismatches
+FROM (
+    SELECT consumption_date, meal_type,
+           SUM(calories) AS total_calories, SUM(proteins) AS total_proteins,
+           SUM(fats) AS total_fats, SUM(carbs) AS total_carbs, COUNT(*)::INT AS portions_count
+    FROM consumed
+    GROUP BY 1, 2
+) raw
+FULL JOIN daily_meal_rollup r USING (consumption_date, meal_type)
+WHERE (raw.total_calories, raw.total_proteins, raw.total_fats, raw.total_carbs, raw.portions_count)
+      IS DISTINCT FROM (r.total_calories, r.total_proteins, r.total_fats, r.total_carbs, r.portions_count);
+
+-- Три порции одним оператором: две на обед, одна на ужин (ожидается 2 строки, 0 расхождений)
+INSERT INTO consumed (cooked_dish_id, consumed_at, meal_type, weight_grams)
+SELECT currval(pg_get_serial_sequence('cooked_dishes', 'id')), '2030-06-15 12:00+00', meal_type, 100
+FROM unnest(ARRAY['lunch', 'lunch', 'dinner']) AS meal_type;
+SELECT meal_type, total_calories, portions_count FROM daily_meal_rollup WHERE consumption_date = '2030-06-15' ORDER BY meal_type;
+SELECT mismatches FROM rollup_mismatches;
+
+-- Порция с обеда переносится на ужин с другим весом (ожидается lunch 1, dinner 2)
+UPDATE consumed SET meal_type = 'dinner', weight_grams = 50
+WHERE id = (SELECT MIN(id) FROM consumed WHERE consumed_at = '2030-06-15 12:00+00' AND meal_type = 'lunch');
+SELECT meal_type, total_calories, portions_count FROM daily_meal_rollup WHERE consumption_date = '2030-06-15' ORDER BY meal_type;
+SELECT mismatches FROM rollup_mismatches;
+
+-- Удаление всех порций дня (ожидается 0 строк)
+DELETE FROM consumed WHERE consumed_at = '2030-06-15 12:00+00';
+SELECT COUNT(*) AS rollup_rows FROM daily_meal_rollup WHERE consumption_date = '2030-06-15';
+SELECT mismatches FROM rollup_mismatches;
+
+-- Порция вставлена в поясе Asia/Tokyo (16 июня), удалена в поясе UTC (15 июня):
+-- удаление вычитает ее из того же дня (ожидается 2030-06-16, затем 0 строк и 0 расхождений)
+SELECT COALESCE(current_setting('nutrition.timezone', true), '') AS saved_timezone \gset
+SET LOCAL nutrition.timezone = 'Asia/Tokyo';
+INSERT INTO consumed (cooked_dish_id, consumed_at, meal_type, weight_grams)
+VALUES (currval(pg_get_serial_sequence('cooked_dishes', 'id')), '2030-06-15 20:00+00', 'snack', 10);
+SELECT consumption_date FROM consumed WHERE consumed_at = '2030-06-15 20:00+00';
+SET LOCAL nutrition.timezone = 'UTC';
+DELETE FROM consumed WHERE consumed_at = '2030-06-15 20:00+00';
+SELECT COUNT(*) AS rollup_rows FROM daily_meal_rollup WHERE consumption_date BETWEEN '2030-06-15' AND '2030-06-16';
+SELECT mismatches FROM rollup_mismatches;
+SELECT set_config('nutrition.timezone', :'saved_timezone', true) IS NOT NULL AS timezone_restored;
+
+
+-- 8. Тест режима ledger (trg_calculate_consumed_nutrition_ledger, trg_restore_dish_weight_ledger)
+\echo '--- 8. Тест режима ledger: журнал остатка блюда и свертка ---'
+SELECT set_dish_weight_mode('ledger');
+SELECT dish_weight_mode();
+
+INSERT INTO cooked_dishes (recipe_id, initial_weight, final_weight, remaining_weight, total_calories, total_proteins, total_fats, total_carbs)
+VALUES ((SELECT id FROM recipes WHERE name = 'Гречка с курицей'), 300, 300, 300, 600, 30, 15, 90);
+
+-- Две порции по 100г: строка блюда не меняется, остаток в представлении 100 (ожидается 300 | 100 | 2)
+INSERT INTO consumed (cooked_dish_id, meal_type, weight_grams)
+SELECT currval(pg_get_serial_sequence('cooked_dishes', 'id')), meal_type, 100
+FROM unnest(ARRAY['breakfast', 'lunch']) AS meal_type;
+SELECT
+    cd.remaining_weight AS stored_weight,
+    cda.remaining_weight,
+    (SELECT COUNT(*) FROM dish_weight_ledger l WHERE l.cooked_dish_id = cd.id) AS ledger_rows
+FROM cooked_dishes cd
+JOIN cooked_dishes_active cda ON cda.id = cd.id
+WHERE cd.id = currval(pg_get_serial_sequence('cooked_dishes', 'id'));
+
+-- Порция больше остатка урезается до 100г, КБЖУ считается как в режиме row (ожидается 100 | 199.98)
+INSERT INTO consumed (cooked_dish_id, meal_type, weight_grams)
+VALUES (currval(pg_get_serial_sequence('cooked_dishes', 'id')), 'dinner', 150);
+SELECT weight_grams, calories FROM consumed WHERE id = currval(pg_get_serial_sequence('consumed', 'id'));
+
+-- Блюдо съедено: следующая порция отклоняется
+DO $$
+BEGIN
+    INSERT INTO nutrition.consumed (cooked_dish_id, meal_type, weight_grams)
+    VALUES (currval(pg_get_serial_sequence('nutrition.cooked_dishes', 'id')), 'snack', 10);
+    RAISE EXCEPTION 'Ledger mode allowed consuming an eaten dish';
+EXCEPTION WHEN raise_exception THEN
+    IF SQLERRM NOT LIKE 'Нечего потреблять%' THEN
+        RAISE;
+    END IF;
+    RAISE NOTICE '✓ LEDGER: порция сверх остатка отклонена';
+END;
+$$;
+
+-- Изменение и удаление порций возвращают вес, свертка переносит журнал в cooked_dishes
+-- (ожидается 150 после изменения и удаления; после свертки 150 | 150 | 0)
+UPDATE consumed SET weight_grams = 50
+WHERE cooked_dish_id = currval(pg_get_serial_sequence('cooked_dishes', 'id')) AND meal_type = 'dinner';
+DELETE FROM consumed WHERE cooked_dish_id = currval(pg_get_serial_sequence('cooked_dishes', 'id')) AND meal_type = 'breakfast';
+SELECT remaining_weight FROM cooked_dishes_active WHERE id = currval(pg_get_serial_sequence('cooked_dishes', 'id'));
+SELECT compact_dish_weight_ledger() > 0 AS compacted;
+SELECT
+    cd.remaining_weight AS stored_weight,
+    cda.remaining_weight,
+    (SELECT COUNT(*) FROM dish_weight_ledger l WHERE l.cooked_dish_id = cd.id) AS ledger_rows
+FROM cooked_dishes cd
+JOIN cooked_dishes_active cda ON cda.id = cd.id
+WHERE cd.id = currval(pg_get_serial_sequence('cooked_dishes', 'id'));
+
+-- Возврат в режим row: следующая порция снова списывается со строки блюда (ожидается row | 100)
+SELECT set_dish_weight_mode('row');
+SELECT dish_weight_mode();
+INSERT INTO consumed (cooked_dish_id, meal_type, weight_grams)
+VALUES (currval(pg_get_serial_sequence('cooked_dishes', 'id')), 'snack', 50);
+SELECT remaining_weight FROM cooked_dishes WHERE id = currval(pg_get_serial_sequence('cooked_dishes', 'id'));
+
+-- 9. Тест версий изменений (trg_change_version_*)
+\echo '--- 9. Тест change_versions: одно увеличение за транзакцию ---'
+-- Отложенные триггеры срабатывают при фиксации; здесь их вызывает SET CONSTRAINTS ALL IMMEDIATE
+SET CONSTRAINTS ALL IMMEDIATE;
+CREATE TEMP TABLE versions_before ON COMMIT DROP AS
+SELECT entity, SUM(version) AS version FROM change_versions GROUP BY entity;
+-- Флаги прошлых срабатываний в этой транзакции сбрасываются, как в новой транзакции
+SELECT set_config('nutrition.changed_' || entity, '', true) FROM versions_before;
+
+-- Две порции и изменение блюда: dishes и stats +1, recipes без изменений (ожидается dishes 1 | recipes 0 | stats 1)
+INSERT INTO consumed (cooked_dish_id, meal_type, weight_grams)
+VALUES
+    (currval(pg_get_serial_sequence('cooked_dishes', 'id')), 'snack', 10),
+    (currval(pg_get_serial_sequence('cooked_dishes', 'id')), 'snack', 10);
+UPDATE cooked_dishes SET final_weight = final_weight WHERE id = currval(pg_get_serial_sequence('cooked_dishes', 'id'));
+SELECT v.entity, SUM(v.version) - b.version AS bumps
+FROM change_versions v
+JOIN versions_before b ON b.entity = v.entity
+GROUP BY v.entity, b.version
+ORDER BY v.entity;
+
+DO $$
+BEGIN
+    IF (SELECT SUM(version) FROM change_versions WHERE entity = 'dishes')
+        - (SELECT version FROM versions_before WHERE entity = 'dishes') <> 1 THEN
+        RAISE EXCEPTION 'Version of dishes was not increased exactly once';
+    END IF;
+END;
+$$;
+
 ROLLBACK;
 \echo 'Тесты триггеров завершены. Все изменения отменены.'